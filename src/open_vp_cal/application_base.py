@@ -20,6 +20,7 @@ CLI classes which implement the methods to display the results to the user.
 import json
 import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Any
 
 from open_vp_cal.core import constants, utils
@@ -205,17 +206,27 @@ class OpenVPCalBase:
             return False
 
         led_walls = utils.led_wall_reference_wall_sort(led_walls)
+        processing_walls = [Processing(led_wall) for led_wall in led_walls]
 
-        # We have to do these sequentially encase we are using a reference wall
+        # The sampling of each wall only reads its own sequence, so we sample all the walls concurrently
         # if the separation fails inform the user to try again or that they have an issue
-        for led_wall in led_walls:
-            try:
-                processing = Processing(led_wall)
-                processing.run_sampling()
-                processing.analyse()
-            except SeparationException as e:
-                self.error_message(f"{led_wall.name}\n{e}")
-                return False
+        max_workers = min(len(processing_walls), constants.ANALYSIS_MAX_WORKERS)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="OpenVPCalSampling") as executor:
+            futures = [
+                executor.submit(processing.run_sampling, generate_swatches=False) for processing in processing_walls
+            ]
+            for led_wall, future in zip(led_walls, futures):
+                try:
+                    future.result()
+                except SeparationException as e:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self.error_message(f"{led_wall.name}\n{e}")
+                    return False
+
+        # We have to do these sequentially encase we are using a reference wall
+        for processing in processing_walls:
+            processing.generate_sample_swatches()
+            processing.analyse()
         return True
 
     def calibrate(self, led_walls: List[LedWallSettings]) -> bool:
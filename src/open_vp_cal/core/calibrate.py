@@ -18,15 +18,49 @@ The main module of the core which deals with the calculation of the calibration
 from typing import Union, List, Dict, Tuple
 
 import json
+import threading
 import colour
 import colour.algebra as ca
 import numpy as np
+import PyOpenColorIO as ocio
 from colour import RGB_Colourspace
 from colour.models import eotf_inverse_BT2100_PQ
 
 from open_vp_cal.core import constants
-from open_vp_cal.core.constants import ColourSpace, Measurements, Results, CAT, EOTF, CalculationOrder
-from open_vp_cal.core import utils
+from open_vp_cal.core.constants import ColourSpace, Measurements, Results, CAT, EOTF, CalculationOrder, CalibrationStage
+from open_vp_cal.core import ocio_utils, utils
+from open_vp_cal.core.structures import PreparedSamples
+
+
+class CalibrationCache:
+    """
+    Holds the intermediates of the calibration which only depend on the colour spaces and the reference samples, so
+    they can be shared between calls to run which calibrate the same samples with different parameters. The colour
+    space matrices are shared by the whole process through utils.ColourSpaceCache
+    """
+    def __init__(self):
+        """ Initializes a CalibrationCache instance.
+        """
+        self._ictcp = {}
+        self._lock = threading.Lock()
+
+    def RGB_to_ICtCp(self, rgb: Union[List, np.ndarray]) -> np.ndarray:
+        """ Returns the ICtCp values of the given Rec.2100 RGB values, computing them on first use
+
+        Args:
+            rgb: The RGB values to convert
+
+        Returns: A copy of the ICtCp values
+        """
+        rgb = np.asarray(rgb, dtype=np.float64)
+        key = (rgb.shape, rgb.tobytes())
+        with self._lock:
+            ictcp = self._ictcp.get(key)
+        if ictcp is None:
+            ictcp = colour.RGB_to_ICtCp(rgb, 'Dolby 2016')
+            with self._lock:
+                ictcp = self._ictcp.setdefault(key, ictcp)
+        return ictcp.copy()
 
 
 def saturate_RGB(samples, factor):
@@ -109,21 +143,16 @@ def eotf_correction_calculation(
     assert len(grey_signal_value_rgb) == num_steps
     assert len(deltaE_grey_ramp) == num_steps
 
-    grey_ramp_screen = np.maximum(0, grey_ramp_screen)
-
-    lut_r, lut_g, lut_b = [[0.0, 0.0]], [[0.0, 0.0]], [[0.0, 0.0]]
-
-    for idx, grey_ramp_screen_value in enumerate(grey_ramp_screen):
-        if deltaE_grey_ramp[idx] > deltaE_threshold:
-            continue
+    grey_ramp_screen = np.maximum(0, np.asarray(grey_ramp_screen, dtype=np.float64))
+    grey_signal_value_rgb = np.asarray(grey_signal_value_rgb, dtype=np.float64)
 
-        lut_r.append([grey_ramp_screen_value[0], grey_signal_value_rgb[idx][0]])
-        lut_g.append([grey_ramp_screen_value[1], grey_signal_value_rgb[idx][1]])
-        lut_b.append([grey_ramp_screen_value[2], grey_signal_value_rgb[idx][2]])
-
-    lut_r = np.array(lut_r)
-    lut_g = np.array(lut_g)
-    lut_b = np.array(lut_b)
+    # Every lut starts at the origin, followed by the (y,x) pairs of the patches within the deltaE threshold
+    keep = ~(np.asarray(deltaE_grey_ramp) > deltaE_threshold)
+    lut_r, lut_g, lut_b = [
+        np.vstack(([0.0, 0.0], np.stack((grey_ramp_screen[keep, channel], grey_signal_value_rgb[keep, channel]),
+                                        axis=1)))
+        for channel in range(3)
+    ]
 
     if avoid_clipping:
         if not peak_lum:
@@ -143,25 +172,6 @@ def eotf_correction_calculation(
     return lut_r, lut_g, lut_b
 
 
-def resample_lut(lut, values):
-    """Resample the provided LUT at the given values.
-
-    Uses piecewise linear interpolation
-
-    Args:
-        lut (array-like): list of (y,x) pairs in ascending order
-        values (array-like): list of new sample values
-
-    Returns:
-        1D LUT: list of (y,x) pairs
-    """
-    lut = np.array(lut)
-    x_values = lut[:, 1]
-    y_values = lut[:, 0]
-    y_interp = np.interp(values, x_values, y_values)
-    return np.stack((y_interp, values), axis=1)
-
-
 def colourspace_max_distances(
         source_cs: RGB_Colourspace, destination_cs: RGB_Colourspace, cat: str, shadow_rolloff: float):
     """Compute the maximum distances between two colour spaces, with a shadow rolloff.
@@ -181,9 +191,12 @@ def colourspace_max_distances(
         output_colourspace=destination_cs,
         chromatic_adaptation_transform=cat,
     )
-    achromatic_values = np.apply_along_axis(
-        lambda rgb: achromatic(rgb, shadow_rolloff), 1, primaries
+    # The achromatic values of all the primaries at once, matching achromatic() for each row
+    values = np.max(primaries, axis=1, keepdims=True)
+    values = np.where(
+        values <= shadow_rolloff, shadow_rolloff * (1 - np.tanh((shadow_rolloff - values) / shadow_rolloff)), values
     )
+    achromatic_values = np.repeat(values, 3, axis=1)
     distances = (achromatic_values - primaries) / achromatic_values
     return np.amax(distances, axis=0)
 
@@ -224,20 +237,18 @@ def extract_screen_cs(
     primaries_measurements = np.reshape(primaries_measurements, (-1, 3))
     white_point_measurements = np.reshape(white_point_measurements, -1)
 
-    primaries_measurements_target = colour.RGB_to_RGB(
-        primaries_measurements, native_camera_gamut_cs, target_cs, None
+    primaries_measurements_target = ca.vector_dot(
+        utils.ColourSpaceCache.matrix_RGB_to_RGB(native_camera_gamut_cs, target_cs, None), primaries_measurements
     )
 
     # We re-saturate the primaries in the same target space they where desaturated in
     saturated_primaries_target = saturate_RGB(primaries_measurements_target, 1.0 / primaries_saturation)
 
-    saturated_primaries = colour.RGB_to_RGB(
-        saturated_primaries_target, target_cs, native_camera_gamut_cs, None
+    saturated_primaries = ca.vector_dot(
+        utils.ColourSpaceCache.matrix_RGB_to_RGB(target_cs, native_camera_gamut_cs, None), saturated_primaries_target
     )
 
-    primaries_XYZ = np.apply_along_axis(
-        lambda rgb: camera_native_cs.matrix_RGB_to_XYZ.dot(rgb), 1, saturated_primaries
-    )
+    primaries_XYZ = ca.vector_dot(camera_native_cs.matrix_RGB_to_XYZ, saturated_primaries)
 
     primaries_xy = colour.XYZ_to_xy(primaries_XYZ)
 
@@ -265,17 +276,14 @@ def extract_screen_cs(
         if max_value > 1:
             target_to_screen_matrix = target_to_screen_matrix / max_value
 
-    saturated_primaries_input_plate_gamut = colour.RGB_to_RGB(
-        saturated_primaries, native_camera_gamut_cs, input_plate_cs, camera_conversion_cat
+    native_to_input_plate_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(
+        native_camera_gamut_cs, input_plate_cs, camera_conversion_cat
     )
+    saturated_primaries_input_plate_gamut = ca.vector_dot(native_to_input_plate_matrix, saturated_primaries)
 
-    saturated_primaries_target_gamut = [
-        ca.vector_dot(reference_to_target_matrix, m) for m in saturated_primaries_input_plate_gamut
-    ]
+    saturated_primaries_target_gamut = ca.vector_dot(reference_to_target_matrix, saturated_primaries_input_plate_gamut)
 
-    calibrated_saturated_primaries_target = [
-        ca.vector_dot(target_to_screen_matrix, m) for m in saturated_primaries_target_gamut
-    ]
+    calibrated_saturated_primaries_target = ca.vector_dot(target_to_screen_matrix, saturated_primaries_target_gamut)
 
     primaries_XYZ_calibrated = colour.RGB_to_XYZ(
         calibrated_saturated_primaries_target,
@@ -285,9 +293,7 @@ def extract_screen_cs(
     )
 
     # White Point
-    white_measurements_input_plate_gamut = colour.RGB_to_RGB(
-        white_point_measurements, native_camera_gamut_cs, input_plate_cs, camera_conversion_cat
-    )
+    white_measurements_input_plate_gamut = ca.vector_dot(native_to_input_plate_matrix, white_point_measurements)
 
     white_point_measurements_target_gamut = ca.vector_dot(
         reference_to_target_matrix, white_measurements_input_plate_gamut)
@@ -371,25 +377,17 @@ def get_ocio_reference_to_target_matrix(
     if cs_cat is None:
         cs_cat = CAT.CAT_BRADFORD
 
-    reference_to_target_matrix = colour.matrix_RGB_to_RGB(
-        input_colourspace=ocio_reference_cs,
-        output_colourspace=target_cs,
-        chromatic_adaptation_transform=cs_cat,
-    )
+    reference_to_target_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(ocio_reference_cs, target_cs, cs_cat)
 
     target_to_XYZ_matrix = target_cs.matrix_RGB_to_XYZ
     reference_to_XYZ_matrix = ocio_reference_cs.matrix_RGB_to_XYZ
-    reference_to_input_matrix = colour.matrix_RGB_to_RGB(
-        input_colourspace=ocio_reference_cs,
-        output_colourspace=input_plate_cs,
-        chromatic_adaptation_transform=cs_cat,
-    )
+    reference_to_input_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(ocio_reference_cs, input_plate_cs, cs_cat)
 
     return (reference_to_target_matrix, ocio_reference_cs,
             target_to_XYZ_matrix, reference_to_XYZ_matrix, reference_to_input_matrix)
 
 
-def scale_to_absolute_nits(input_array: Union[List, np.ndarray]) -> List:
+def scale_to_absolute_nits(input_array: Union[List, np.ndarray]) -> np.ndarray:
     """ For an array of RGB values, scale them to nits
 
     Args:
@@ -398,17 +396,16 @@ def scale_to_absolute_nits(input_array: Union[List, np.ndarray]) -> List:
     Returns: (array-like) RGB values scaled to absolute nits
 
     """
-    return [
-        [item[0] * 100, item[1] * 100, item[2] * 100] for item in input_array
-    ]
+    return np.asarray(input_array, dtype=np.float64) * 100
 
 
 def deltaE_ICtCp(
         rgbw_reference_samples, macbeth_reference_samples, eotf_ramp_reference_samples,
         rgbw_measurements_camera_native_gamut: np.ndarray,
-        eotf_ramp_camera_native_gamut: List[np.ndarray],
-        macbeth_measurements_camera_native_gamut: List[np.ndarray],
-        target_cs: RGB_Colourspace, native_camera_gamut_cs: RGB_Colourspace
+        eotf_ramp_camera_native_gamut: np.ndarray,
+        macbeth_measurements_camera_native_gamut: np.ndarray,
+        target_cs: RGB_Colourspace, native_camera_gamut_cs: RGB_Colourspace,
+        cache: Union[CalibrationCache, None] = None
 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """ Calculates the deltaE between the reference samples and the measured samples for RGBW, eotf ramp, and macbeth
         chart
@@ -422,40 +419,40 @@ def deltaE_ICtCp(
         macbeth_measurements_camera_native_gamut: The macbeth measurements in the camera native gamut
         target_cs: The target colour space
         native_camera_gamut_cs: The native camera gamut colour space
+        cache: The cache of the matrices and reference ICtCp values to use, if not provided they are computed
 
     Returns: The deltaE values for RGBW, eotf ramp, and macbeth chart
 
     """
+    if cache is None:
+        cache = CalibrationCache()
+
+    target_to_native_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(target_cs, native_camera_gamut_cs, None)
+
     eotf_ramp_camera_native_gamut = scale_to_absolute_nits(eotf_ramp_camera_native_gamut)
     rgbw_measurements_camera_native_gamut = scale_to_absolute_nits(rgbw_measurements_camera_native_gamut)
     macbeth_measurements_camera_native_gamut = scale_to_absolute_nits(macbeth_measurements_camera_native_gamut)
 
     rgbw_reference_samples = scale_to_absolute_nits(rgbw_reference_samples)
-    rgbw_reference_samples_native_camera_gamut = colour.RGB_to_RGB(
-        rgbw_reference_samples, target_cs, native_camera_gamut_cs, None)
+    rgbw_reference_samples_native_camera_gamut = ca.vector_dot(
+        target_to_native_matrix, rgbw_reference_samples)
 
     macbeth_reference_samples = scale_to_absolute_nits(macbeth_reference_samples)
-    macbeth_reference_samples_native_camera_gamut = colour.RGB_to_RGB(
-        macbeth_reference_samples, target_cs, native_camera_gamut_cs, None)
+    macbeth_reference_samples_native_camera_gamut = ca.vector_dot(
+        target_to_native_matrix, macbeth_reference_samples)
 
     # Convert The Grey Ramp Reference Samples From The Target Colour Space To Rec 2020
     eotf_ramp_reference_samples = scale_to_absolute_nits(eotf_ramp_reference_samples)
-    eotf_ramp_reference_samples_native_camera_gamut = colour.RGB_to_RGB(
-        eotf_ramp_reference_samples, target_cs, native_camera_gamut_cs, None)
+    eotf_ramp_reference_samples_native_camera_gamut = ca.vector_dot(
+        target_to_native_matrix, eotf_ramp_reference_samples)
 
     rgbw_samples_ICtCp = colour.RGB_to_ICtCp(rgbw_measurements_camera_native_gamut, 'Dolby 2016')
     eotf_ramp_samples_ICtCp = colour.RGB_to_ICtCp(eotf_ramp_camera_native_gamut, 'Dolby 2016')
     macbeth_samples_ICtCp = colour.RGB_to_ICtCp(macbeth_measurements_camera_native_gamut, 'Dolby 2016')
 
-    rgbw_reference_samples_ICtCp = colour.RGB_to_ICtCp(
-        rgbw_reference_samples_native_camera_gamut, 'Dolby 2016',
-    )
-    eotf_ramp_reference_samples_ICtCp = colour.RGB_to_ICtCp(
-        eotf_ramp_reference_samples_native_camera_gamut, 'Dolby 2016',
-    )
-    macbeth_reference_samples_ICtCp = colour.RGB_to_ICtCp(
-        macbeth_reference_samples_native_camera_gamut, 'Dolby 2016',
-    )
+    rgbw_reference_samples_ICtCp = cache.RGB_to_ICtCp(rgbw_reference_samples_native_camera_gamut)
+    eotf_ramp_reference_samples_ICtCp = cache.RGB_to_ICtCp(eotf_ramp_reference_samples_native_camera_gamut)
+    macbeth_reference_samples_ICtCp = cache.RGB_to_ICtCp(macbeth_reference_samples_native_camera_gamut)
 
     delta_e_rgbw = colour.difference.delta_E_ITP(rgbw_samples_ICtCp, rgbw_reference_samples_ICtCp)
     delta_e_eotf_ramp = colour.difference.delta_E_ITP(eotf_ramp_samples_ICtCp, eotf_ramp_reference_samples_ICtCp)
@@ -477,18 +474,12 @@ def calculate_eotf_linearity(eotf_signal_values: List, eotf_ramp_camera_native_g
     Returns: The difference between the eotf signal values and the eotf ramp values, for each channel
 
     """
-    eotf_linearity = []
-    for idx, eotf_value in enumerate(eotf_ramp_camera_native_gamut):
-        eotf_signal_value = eotf_signal_values[idx]
-        red, green, blue = eotf_value
-
-        red_result = red / eotf_signal_value if eotf_signal_value != 0 else red
-        green_result = green / eotf_signal_value if eotf_signal_value != 0 else green
-        blue_result = blue / eotf_signal_value if eotf_signal_value != 0 else blue
-
-        eotf_linearity.append([red_result, green_result, blue_result])
+    eotf_ramp_camera_native_gamut = np.asarray(eotf_ramp_camera_native_gamut, dtype=np.float64)
+    eotf_signal_values = np.asarray(eotf_signal_values, dtype=np.float64)[:len(eotf_ramp_camera_native_gamut), None]
 
-    return eotf_linearity
+    # Where the signal is zero we keep the ramp value rather than dividing by zero
+    divisor = np.where(eotf_signal_values != 0, eotf_signal_values, 1.0)
+    return (eotf_ramp_camera_native_gamut / divisor).tolist()
 
 
 def create_decoupling_white_balance_matrix(
@@ -513,6 +504,201 @@ def create_decoupling_white_balance_matrix(
     return decoupling_white_balance_matrix
 
 
+def prepare_samples(
+        measured_samples: Dict, reference_samples: Dict,
+        input_plate_cs: RGB_Colourspace, native_camera_gamut_cs: RGB_Colourspace,
+        camera_conversion_cat: Union[str, constants.CAT], peak_lum: float,
+        enable_plate_white_balance: bool = True,
+        reference_wall_external_white_balance_matrix: Union[None, List] = None,
+        decoupled_lens_white_samples: Union[None, List] = None) -> PreparedSamples:
+    """ Converts the measured samples to the camera native colour space, white balances them, and scales them by the
+        exposure of the led wall, ready to be calibrated
+
+    Args:
+        measured_samples: a dictionary containing the measured values sampled from the input plate
+        reference_samples: a dictionary containing the reference values for the calibration process displayed on
+        the led wall
+        input_plate_cs: The colour space of the input plate we measured the samples from
+        native_camera_gamut_cs: The native colour space of the camera, used to capture the input plate
+        camera_conversion_cat: The chromatic adaptation transform used to convert to the camera colour space
+        peak_lum: The peak luminance of the led wall, where 1 is 100 nits
+        enable_plate_white_balance: Applies the white balance matrix calculated for the input plate
+        reference_wall_external_white_balance_matrix: A precomputed white balance matrix to apply to the input plate
+        samples
+        decoupled_lens_white_samples: An additional sample of the decoupled white
+
+    Returns: The prepared samples, along with the reference samples, the white balance matrix, the exposure scaling
+        factor, the max white delta and the measured 18 percent sample
+
+    """
+    # 3) We take our measured samples and convert them to camera space
+    (
+        eotf_ramp_camera_native_gamut, grey_measurements_native_camera_gamut,
+        macbeth_measurements_camera_native_gamut, max_white_camera_native_gamut,
+        rgbw_measurements_camera_native_gamut,
+        eotf_signal_values, decoupled_lens_white_samples_camera_native_gamut,
+        rgbw_reference_samples, macbeth_reference_samples, eotf_ramp_reference_samples
+    ) = convert_samples_to_required_cs(
+        camera_conversion_cat, input_plate_cs, measured_samples, reference_samples, native_camera_gamut_cs,
+        decoupled_lens_white_samples, peak_lum
+    )
+
+    # 4) We Calculate a decoupled white balance matrix if we have a decoupled lens white samples
+    white_balance_matrix = np.identity(3)
+    if decoupled_lens_white_samples_camera_native_gamut is not None:
+        white_balance_matrix = create_decoupling_white_balance_matrix(
+            grey_measurements_native_camera_gamut, decoupled_lens_white_samples_camera_native_gamut)
+
+    # 4) We Calculate The White Balance Matrix By Balancing The Grey Samples Against The Green Channel Or Use The One
+    if reference_wall_external_white_balance_matrix is None and enable_plate_white_balance:
+        white_balance_matrix = utils.create_white_balance_matrix(grey_measurements_native_camera_gamut)
+
+    if reference_wall_external_white_balance_matrix:
+        white_balance_matrix = np.array(reference_wall_external_white_balance_matrix)
+
+    # 5) We Apply The White Balance Matrix To All The Samples
+    (
+        eotf_ramp_camera_native_gamut, grey_measurements_native_camera_gamut,
+        macbeth_measurements_camera_native_gamut, max_white_camera_native_gamut,
+        rgbw_measurements_camera_native_gamut
+    ) = apply_matrix_to_samples(
+        white_balance_matrix, eotf_ramp_camera_native_gamut,
+        grey_measurements_native_camera_gamut,
+        macbeth_measurements_camera_native_gamut, max_white_camera_native_gamut,
+        rgbw_measurements_camera_native_gamut
+    )
+
+    # 6) We Get The Green Value From The 18% Grey Patch, Scale This So It Equals 18% Of Peak Luminance
+    # Apply This Scaling To RGBW & Grey Ramp Samples
+    grey_measurements_white_balanced_native_gamut = rgbw_measurements_camera_native_gamut[3]
+    grey_measurements_white_balanced_native_gamut_green = grey_measurements_white_balanced_native_gamut[1]
+
+    green_value_for_last_eotf_patch = eotf_ramp_camera_native_gamut[-1][1]
+    target_over_white = 1 / green_value_for_last_eotf_patch
+    exposure_scaling_factor = 1.0 / (peak_lum * target_over_white)
+
+    max_white_delta = max_white_camera_native_gamut[1] / eotf_ramp_camera_native_gamut[-1][1]
+
+    prepared = PreparedSamples()
+    prepared.rgbw_measurements_camera_native_gamut = rgbw_measurements_camera_native_gamut / exposure_scaling_factor
+    prepared.eotf_ramp_camera_native_gamut = eotf_ramp_camera_native_gamut / exposure_scaling_factor
+    prepared.macbeth_measurements_camera_native_gamut = (
+        macbeth_measurements_camera_native_gamut / exposure_scaling_factor
+    )
+    prepared.grey_measurements_native_camera_gamut = grey_measurements_native_camera_gamut
+    prepared.max_white_camera_native_gamut = max_white_camera_native_gamut
+    prepared.eotf_signal_values = eotf_signal_values
+    prepared.rgbw_reference_samples = rgbw_reference_samples
+    prepared.macbeth_reference_samples = macbeth_reference_samples
+    prepared.eotf_ramp_reference_samples = eotf_ramp_reference_samples
+    prepared.white_balance_matrix = white_balance_matrix
+    prepared.exposure_scaling_factor = exposure_scaling_factor
+    prepared.max_white_delta = max_white_delta
+    prepared.grey_measurements_white_balanced_native_gamut_green = grey_measurements_white_balanced_native_gamut_green
+    return prepared
+
+
+def apply_calibration_to_samples(
+        samples_target: np.ndarray,
+        target_to_screen_matrix: Union[np.ndarray, List],
+        lut_r: Union[np.ndarray, List], lut_g: Union[np.ndarray, List], lut_b: Union[np.ndarray, List],
+        calculation_order: Union[str, CalculationOrder],
+        enable_EOTF_correction: bool,
+        enable_gamut_compression: bool,
+        max_distances: Union[np.ndarray, List]) -> np.ndarray:
+    """ Applies the calibration to the given samples in the target colour space, correcting them as the calibration
+        was calculated: the target to screen matrix and the EOTF correction LUTs in the calculation order, followed
+        by the gamut compression of the exported calibration
+
+    Args:
+        samples_target: The samples in the target colour space
+        target_to_screen_matrix: The target to screen calibration matrix
+        lut_r: The values for the red channel of the EOTF correction LUT
+        lut_g: The values for the green channel of the EOTF correction LUT
+        lut_b: The values for the blue channel of the EOTF correction LUT
+        calculation_order: The order each step of the calibration is calculated and applied
+        enable_EOTF_correction: Whether the EOTF correction is applied
+        enable_gamut_compression: Whether the gamut compression is applied
+        max_distances: The maximum distances of the gamut compression
+
+    Returns: The calibrated samples in the target colour space
+
+    """
+    samples_target = np.asarray(samples_target, dtype=np.float64)
+    luts = [np.asarray(lut, dtype=np.float64) for lut in (lut_r, lut_g, lut_b)]
+
+    if enable_EOTF_correction and calculation_order == CalculationOrder.CO_EOTF_CS:
+        samples_target = apply_luts(samples_target, *luts, inverse=False)
+
+    samples_target = ca.vector_dot(np.asarray(target_to_screen_matrix), samples_target)
+
+    if enable_EOTF_correction and calculation_order == CalculationOrder.CO_CS_EOTF:
+        samples_target = apply_luts(samples_target, *luts, inverse=False)
+
+    if enable_gamut_compression:
+        # The gamut compression is applied by the same OCIO transform as the exported calibration
+        gamut_compression = ocio_utils.create_gamut_compression({Results.MAX_DISTANCES: max_distances})
+        processor = ocio.Config.CreateRaw().getProcessor(gamut_compression).getDefaultCPUProcessor()
+        compressed_samples = np.ascontiguousarray(samples_target, dtype=np.float32)
+        processor.applyRGB(compressed_samples)
+        samples_target = compressed_samples.astype(np.float64)
+
+    return samples_target
+
+
+def post_calibration_deltaE_ICtCp(
+        rgbw_reference_samples, macbeth_reference_samples, eotf_ramp_reference_samples,
+        rgbw_measurements_camera_native_gamut: np.ndarray,
+        eotf_ramp_camera_native_gamut: np.ndarray,
+        macbeth_measurements_camera_native_gamut: np.ndarray,
+        target_cs: RGB_Colourspace, native_camera_gamut_cs: RGB_Colourspace,
+        results: Dict,
+        cache: Union[CalibrationCache, None] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Calculates the deltaE between the reference samples and the measured samples with the calibration of the
+        given results applied, for RGBW, eotf ramp, and macbeth chart
+
+    Args:
+        rgbw_reference_samples: The RGBW reference samples
+        macbeth_reference_samples: The macbeth reference samples
+        eotf_ramp_reference_samples: The eotf ramp reference samples
+        rgbw_measurements_camera_native_gamut: The RGBW measurements in the camera native gamut, before calibration
+        eotf_ramp_camera_native_gamut: The eotf ramp measurements in the camera native gamut, before calibration
+        macbeth_measurements_camera_native_gamut: The macbeth measurements in the camera native gamut, before
+        calibration
+        target_cs: The target colour space
+        native_camera_gamut_cs: The native camera gamut colour space
+        results: The results of the calibration, holding the matrix, LUTs and gamut compression to apply
+        cache: The cache of the matrices and reference ICtCp values to use, if not provided they are computed
+
+    Returns: The deltaE values for RGBW, eotf ramp, and macbeth chart with the calibration applied
+
+    """
+    if cache is None:
+        cache = CalibrationCache()
+    native_to_target_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(native_camera_gamut_cs, target_cs, None)
+    target_to_native_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(target_cs, native_camera_gamut_cs, None)
+
+    calibrated_samples = []
+    for samples in (
+            rgbw_measurements_camera_native_gamut, eotf_ramp_camera_native_gamut,
+            macbeth_measurements_camera_native_gamut):
+        samples_target = apply_calibration_to_samples(
+            ca.vector_dot(native_to_target_matrix, samples),
+            results[Results.TARGET_TO_SCREEN_MATRIX],
+            results[Results.EOTF_LUT_R], results[Results.EOTF_LUT_G], results[Results.EOTF_LUT_B],
+            results[Results.CALCULATION_ORDER],
+            results[Results.ENABLE_EOTF_CORRECTION],
+            results[Results.ENABLE_GAMUT_COMPRESSION],
+            results[Results.MAX_DISTANCES]
+        )
+        calibrated_samples.append(ca.vector_dot(target_to_native_matrix, samples_target))
+
+    return deltaE_ICtCp(
+        rgbw_reference_samples, macbeth_reference_samples, eotf_ramp_reference_samples,
+        *calibrated_samples, target_cs, native_camera_gamut_cs, cache=cache
+    )
+
+
 def run(
         measured_samples: Dict,
         reference_samples: Dict,
@@ -530,7 +716,8 @@ def run(
         gamut_compression_shadow_rolloff: float = constants.GAMUT_COMPRESSION_SHADOW_ROLLOFF,
         reference_wall_external_white_balance_matrix: Union[None, List] = None,
         decoupled_lens_white_samples: Union[None, List] = None,
-        avoid_clipping: bool = True):
+        avoid_clipping: bool = True,
+        cache: Union[CalibrationCache, None] = None):
     """ Run the entire calibration process.
 
     Args:
@@ -552,6 +739,8 @@ def run(
         reference_wall_external_white_balance_matrix: A precomputed white balance matrix to apply to the input plate
         samples, used when matching other led walls. By default, the white balance matrix is independently
         calculated for each wall
+        cache: The cache of the intermediates shared between calibrations of the same samples, such as the reference
+        ICtCp values, if not provided they are computed for this calibration only
 
     Returns: A dictionary containing the results of the calibration process in a json serializable format
         PRE_CALIBRATION_SCREEN_PRIMARIES: (List) The calculated screen colour space primaries CIE1931-xy,
@@ -581,6 +770,9 @@ def run(
         DELTA_E_RGBW: The IPT DeltaE of the R, G, B, W between the measured and reference samples
         DELTA_E_EOTF_RAMP: The IPT DeltaE of the EOTF Ramp between the measured and reference samples
         DELTA_E_MACBETH: The IPT DeltaE of the Macbeth chart between the measured and reference samples
+        POST_DELTA_E_RGBW: The IPT DeltaE of the R, G, B, W between the calibrated and reference samples
+        POST_DELTA_E_EOTF_RAMP: The IPT DeltaE of the EOTF Ramp between the calibrated and reference samples
+        POST_DELTA_E_MACBETH: The IPT DeltaE of the Macbeth chart between the calibrated and reference samples
         EXPOSURE_SCALING_FACTOR: Normalization scaling factor for the measured samples
         TARGET_MAX_LUM_NITS: The maximum luminance of the target led wall expressed in nits
         MEASURED_18_PERCENT_SAMPLE: The measured 18 percent sample as seen through the camera, using the green channel
@@ -616,44 +808,26 @@ def run(
     # 2) Once we have our camera native colour space we decide on the cat we want to use to convert to camera space
     camera_conversion_cat = utils.get_cat_for_camera_conversion(native_camera_gamut_cs.name)
 
-    # 3) We take our measured samples and convert them to camera space
-    (
-        eotf_ramp_camera_native_gamut, grey_measurements_native_camera_gamut,
-        macbeth_measurements_camera_native_gamut, max_white_camera_native_gamut,
-        rgbw_measurements_camera_native_gamut,
-        eotf_signal_values, decoupled_lens_white_samples_camera_native_gamut,
-        rgbw_reference_samples, macbeth_reference_samples, eotf_ramp_reference_samples
-    ) = convert_samples_to_required_cs(
-        camera_conversion_cat, input_plate_cs, measured_samples, reference_samples, native_camera_gamut_cs,
-        decoupled_lens_white_samples, peak_lum
-    )
-
-    # 4) We Calculate a decoupled white balance matrix if we have a decoupled lens white samples
-    white_balance_matrix = np.identity(3)
-    if decoupled_lens_white_samples_camera_native_gamut is not None:
-        white_balance_matrix = create_decoupling_white_balance_matrix(
-            grey_measurements_native_camera_gamut, decoupled_lens_white_samples_camera_native_gamut)
-
-    # 4) We Calculate The White Balance Matrix By Balancing The Grey Samples Against The Green Channel Or Use The One
-    if reference_wall_external_white_balance_matrix is None and enable_plate_white_balance:
-        white_balance_matrix = utils.create_white_balance_matrix(grey_measurements_native_camera_gamut)
-
-    if reference_wall_external_white_balance_matrix:
-        white_balance_matrix = np.array(reference_wall_external_white_balance_matrix)
-
-    # 5) We Apply The White Balance Matrix To All The Samples
-    (
-        eotf_ramp_camera_native_gamut, grey_measurements_native_camera_gamut,
-        macbeth_measurements_camera_native_gamut, max_white_camera_native_gamut,
-        rgbw_measurements_camera_native_gamut
-    ) = apply_matrix_to_samples(
-        white_balance_matrix, eotf_ramp_camera_native_gamut,
-        grey_measurements_native_camera_gamut,
-        macbeth_measurements_camera_native_gamut, max_white_camera_native_gamut,
-        rgbw_measurements_camera_native_gamut
+    # The samples move between the camera and target spaces repeatedly, so we build the matrices once and apply them
+    # to whole (N,3) arrays of samples
+    if cache is None:
+        cache = CalibrationCache()
+    native_to_target_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(native_camera_gamut_cs, target_cs, None)
+    target_to_native_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(target_cs, native_camera_gamut_cs, None)
+
+    # 3) - 6) We convert our measured samples to camera space, white balance them, and scale them by the exposure
+    prepared = prepare_samples(
+        measured_samples, reference_samples, input_plate_cs, native_camera_gamut_cs, camera_conversion_cat,
+        peak_lum, enable_plate_white_balance=enable_plate_white_balance,
+        reference_wall_external_white_balance_matrix=reference_wall_external_white_balance_matrix,
+        decoupled_lens_white_samples=decoupled_lens_white_samples
     )
+    eotf_ramp_camera_native_gamut = prepared.eotf_ramp_camera_native_gamut
+    macbeth_measurements_camera_native_gamut = prepared.macbeth_measurements_camera_native_gamut
+    rgbw_measurements_camera_native_gamut = prepared.rgbw_measurements_camera_native_gamut
+    eotf_signal_values = prepared.eotf_signal_values
 
-    # 6) We Get The Matrix To Convert From OCIO Reference Space To Target Space
+    # 7) We Get The Matrix To Convert From OCIO Reference Space To Target Space
     (
         reference_to_target_matrix, ocio_reference_cs,
         target_to_XYZ_matrix, reference_to_XYZ_matrix,
@@ -662,39 +836,23 @@ def run(
         input_plate_cs, target_cs, cs_cat=reference_to_target_cat
     )
 
-    # 7) We Get The Green Value From The 18% Grey Patch, Scale This So It Equals 18% Of Peak Luminance
-    # Apply This Scaling To RGBW & Grey Ramp Samples
-    grey_measurements_white_balanced_native_gamut = rgbw_measurements_camera_native_gamut[3]
-    grey_measurements_white_balanced_native_gamut_green = grey_measurements_white_balanced_native_gamut[1]
-
-    green_value_for_last_eotf_patch = eotf_ramp_camera_native_gamut[-1][1]
-    target_over_white = 1 / green_value_for_last_eotf_patch
-    exposure_scaling_factor = 1.0 / (peak_lum * target_over_white)
-
-    max_white_delta = max_white_camera_native_gamut[1] / eotf_ramp_camera_native_gamut[-1][1]
-
-    rgbw_measurements_camera_native_gamut = rgbw_measurements_camera_native_gamut / exposure_scaling_factor
-    eotf_ramp_camera_native_gamut = [
-        item / exposure_scaling_factor for item in eotf_ramp_camera_native_gamut
-    ]
-    macbeth_measurements_camera_native_gamut = [
-        item / exposure_scaling_factor for item in macbeth_measurements_camera_native_gamut
-    ]
+    # The samples before calibration, which the calibration is applied to for the post calibration deltaE analysis
+    rgbw_measurements_pre_calibration = rgbw_measurements_camera_native_gamut
+    eotf_ramp_pre_calibration = eotf_ramp_camera_native_gamut
+    macbeth_measurements_pre_calibration = macbeth_measurements_camera_native_gamut
 
     # 8) We do the deltaE analysis
     delta_e_wrgb, delta_e_eotf_ramp, delta_e_macbeth = deltaE_ICtCp(
-        rgbw_reference_samples, macbeth_reference_samples, eotf_ramp_reference_samples,
+        prepared.rgbw_reference_samples, prepared.macbeth_reference_samples, prepared.eotf_ramp_reference_samples,
         rgbw_measurements_camera_native_gamut, eotf_ramp_camera_native_gamut,
-        macbeth_measurements_camera_native_gamut, target_cs, native_camera_gamut_cs
+        macbeth_measurements_camera_native_gamut, target_cs, native_camera_gamut_cs, cache=cache
     )
 
     # 9 If we have disabled eotf correction, we have to force the operation order
     if not enable_EOTF_correction:
         calculation_order = CalculationOrder.CO_CS_EOTF
 
-    eotf_signal_value_rgb = np.array([
-        [signal, signal, signal] for signal in eotf_signal_values
-    ])
+    eotf_signal_value_rgb = np.repeat(np.asarray(eotf_signal_values, dtype=np.float64)[:, None], 3, axis=1)
 
     # 10 We calculate the difference in the linearity of the wall based on the signals and eotf ramps
     eotf_linearity = calculate_eotf_linearity(eotf_signal_values, eotf_ramp_camera_native_gamut)
@@ -723,19 +881,19 @@ def run(
         lut_r, lut_g, lut_b = np.array([]), np.array([]), np.array([])
         if enable_EOTF_correction:
             # 3: Compute LUTs for EOTF correction
-            eotf_ramp_target = colour.RGB_to_RGB(
-                eotf_ramp_camera_native_gamut, native_camera_gamut_cs, target_cs, None
+            eotf_ramp_target = ca.vector_dot(
+                native_to_target_matrix, eotf_ramp_camera_native_gamut
             )
 
-            rgbw_measurements_target = colour.RGB_to_RGB(
-                rgbw_measurements_camera_native_gamut, native_camera_gamut_cs, target_cs, None
+            rgbw_measurements_target = ca.vector_dot(
+                native_to_target_matrix, rgbw_measurements_camera_native_gamut
             )
 
-            eotf_ramp_screen_target = [ca.vector_dot(target_to_screen_matrix, m) for m in eotf_ramp_target]
+            eotf_ramp_screen_target = ca.vector_dot(target_to_screen_matrix, eotf_ramp_target)
             rgbw_measurements_target = ca.vector_dot(target_to_screen_matrix, rgbw_measurements_target)
             white_balance_offset_matrix = utils.create_white_balance_matrix(rgbw_measurements_target[3])
 
-            eotf_ramp_screen_target = [ca.vector_dot(white_balance_offset_matrix, m) for m in eotf_ramp_screen_target]
+            eotf_ramp_screen_target = ca.vector_dot(white_balance_offset_matrix, eotf_ramp_screen_target)
 
             lut_r, lut_g, lut_b = eotf_correction_calculation(
                 eotf_ramp_screen_target,
@@ -745,28 +903,28 @@ def run(
                 peak_lum=peak_lum
             )
 
-            eotf_ramp_target_calibrated = colour.RGB_to_RGB(
-                eotf_ramp_camera_native_gamut_calibrated, native_camera_gamut_cs, target_cs, None
+            eotf_ramp_target_calibrated = ca.vector_dot(
+                native_to_target_matrix, eotf_ramp_camera_native_gamut_calibrated
             )
 
             eotf_ramp_target_calibrated = ca.vector_dot(
                 target_to_screen_matrix, eotf_ramp_target_calibrated
             )
 
-            eotf_ramp_camera_native_gamut_calibrated = colour.RGB_to_RGB(
-                eotf_ramp_target_calibrated, target_cs, native_camera_gamut_cs, None
+            eotf_ramp_camera_native_gamut_calibrated = ca.vector_dot(
+                target_to_native_matrix, eotf_ramp_target_calibrated
             )
 
-            macbeth_measurements_target_calibrated = colour.RGB_to_RGB(
-                macbeth_measurements_camera_native_gamut_calibrated, native_camera_gamut_cs, target_cs, None
+            macbeth_measurements_target_calibrated = ca.vector_dot(
+                native_to_target_matrix, macbeth_measurements_camera_native_gamut_calibrated
             )
 
             macbeth_measurements_target_calibrated = ca.vector_dot(
                 target_to_screen_matrix, macbeth_measurements_target_calibrated
             )
 
-            macbeth_measurements_camera_native_gamut_calibrated = colour.RGB_to_RGB(
-                macbeth_measurements_target_calibrated, target_cs, native_camera_gamut_cs, None
+            macbeth_measurements_camera_native_gamut_calibrated = ca.vector_dot(
+                target_to_native_matrix, macbeth_measurements_target_calibrated
             )
 
             rgbw_measurements_target = apply_luts(
@@ -777,8 +935,8 @@ def run(
                 inverse=False
             )
 
-            rgbw_measurements_camera_native_gamut = colour.RGB_to_RGB(
-                rgbw_measurements_target, target_cs, native_camera_gamut_cs, None
+            rgbw_measurements_camera_native_gamut = ca.vector_dot(
+                target_to_native_matrix, rgbw_measurements_target
             )
 
             screen_cs, _, calibrated_screen_cs = extract_screen_cs(
@@ -797,16 +955,16 @@ def run(
             )
 
     elif calculation_order == CalculationOrder.CO_EOTF_CS:  # Calc 1Ds->3x3
-        eotf_ramp_target = colour.RGB_to_RGB(
-            eotf_ramp_camera_native_gamut, native_camera_gamut_cs, target_cs, None
+        eotf_ramp_target = ca.vector_dot(
+            native_to_target_matrix, eotf_ramp_camera_native_gamut
         )
 
-        rgbw_measurements_target = colour.RGB_to_RGB(
-            rgbw_measurements_camera_native_gamut, native_camera_gamut_cs, target_cs, None
+        rgbw_measurements_target = ca.vector_dot(
+            native_to_target_matrix, rgbw_measurements_camera_native_gamut
         )
 
         eotf_white_balance_matrix = utils.create_white_balance_matrix(rgbw_measurements_target[3])
-        eotf_ramp_target = [ca.vector_dot(eotf_white_balance_matrix, m) for m in eotf_ramp_target]
+        eotf_ramp_target = ca.vector_dot(eotf_white_balance_matrix, eotf_ramp_target)
 
         # 1: Compute LUTs for EOTF correction
         lut_r, lut_g, lut_b, = eotf_correction_calculation(
@@ -825,8 +983,8 @@ def run(
             inverse=False
         )
 
-        rgbw_measurements_camera_native_gamut = colour.RGB_to_RGB(
-            rgbw_measurements_target, target_cs, native_camera_gamut_cs, None
+        rgbw_measurements_camera_native_gamut = ca.vector_dot(
+            target_to_native_matrix, rgbw_measurements_target
         )
 
         # 3: Create target to screen matrix
@@ -858,12 +1016,12 @@ def run(
 
     # Just For Plotting Needs
     if enable_EOTF_correction:
-        eotf_ramp_camera_target_calibrated = colour.RGB_to_RGB(
-            eotf_ramp_camera_native_gamut_calibrated, native_camera_gamut_cs, target_cs, None
+        eotf_ramp_camera_target_calibrated = ca.vector_dot(
+            native_to_target_matrix, eotf_ramp_camera_native_gamut_calibrated
         )
         if calculation_order == CalculationOrder.CO_EOTF_CS:
-            eotf_ramp_camera_target_calibrated = [
-                ca.vector_dot(target_to_screen_matrix, m) for m in eotf_ramp_camera_target_calibrated]
+            eotf_ramp_camera_target_calibrated = ca.vector_dot(
+                target_to_screen_matrix, eotf_ramp_camera_target_calibrated)
 
         eotf_ramp_camera_target_calibrated = apply_luts(
             eotf_ramp_camera_target_calibrated,
@@ -872,39 +1030,38 @@ def run(
             lut_b,
             inverse=False
         )
-        eotf_ramp_camera_native_gamut_calibrated = colour.RGB_to_RGB(
-            eotf_ramp_camera_target_calibrated, target_cs, native_camera_gamut_cs, None
+        eotf_ramp_camera_native_gamut_calibrated = ca.vector_dot(
+            target_to_native_matrix, eotf_ramp_camera_target_calibrated
         )
 
-        macbeth_measurements_target_calibrated = colour.RGB_to_RGB(
-            macbeth_measurements_camera_native_gamut_calibrated, native_camera_gamut_cs, target_cs, None
+        macbeth_measurements_target_calibrated = ca.vector_dot(
+            native_to_target_matrix, macbeth_measurements_camera_native_gamut_calibrated
         )
 
         macbeth_measurements_target_calibrated = apply_luts(
             macbeth_measurements_target_calibrated,
             lut_r, lut_g, lut_b, inverse=False
         )
-        macbeth_measurements_camera_native_gamut_calibrated = colour.RGB_to_RGB(
-            macbeth_measurements_target_calibrated, target_cs, native_camera_gamut_cs, None
+        macbeth_measurements_camera_native_gamut_calibrated = ca.vector_dot(
+            target_to_native_matrix, macbeth_measurements_target_calibrated
         )
 
-    measured_peak_lum_nits = [item * 100 for item in eotf_ramp_camera_native_gamut[-1]]
+    measured_peak_lum_nits = scale_to_absolute_nits(eotf_ramp_camera_native_gamut[-1]).tolist()
 
-    macbeth_measurements_camera_native_gamut_XYZ = np.apply_along_axis(
-        lambda rgb: native_camera_gamut_cs.matrix_RGB_to_XYZ.dot(rgb), 1, macbeth_measurements_camera_native_gamut
+    macbeth_measurements_camera_native_gamut_XYZ = ca.vector_dot(
+        native_camera_gamut_cs.matrix_RGB_to_XYZ, macbeth_measurements_camera_native_gamut
     )
     macbeth_measurements_camera_native_gamut_xy = colour.XYZ_to_xy(macbeth_measurements_camera_native_gamut_XYZ)
 
-    macbeth_measurements_camera_native_gamut_calibrated_XYZ = np.apply_along_axis(
-        lambda rgb: native_camera_gamut_cs.matrix_RGB_to_XYZ.dot(rgb), 1,
-        macbeth_measurements_camera_native_gamut_calibrated
+    macbeth_measurements_camera_native_gamut_calibrated_XYZ = ca.vector_dot(
+        native_camera_gamut_cs.matrix_RGB_to_XYZ, macbeth_measurements_camera_native_gamut_calibrated
     )
     macbeth_measurements_camera_native_gamut_calibrated_xy = colour.XYZ_to_xy(
         macbeth_measurements_camera_native_gamut_calibrated_XYZ
     )
 
     # Return the results using simple, serializable types
-    return {
+    results = {
         Results.PRE_CALIBRATION_SCREEN_PRIMARIES: screen_cs.primaries.tolist(),
         Results.PRE_CALIBRATION_SCREEN_WHITEPOINT: screen_cs.whitepoint.tolist(),
         Results.TARGET_GAMUT: target_cs.name,
@@ -912,7 +1069,7 @@ def run(
         Results.ENABLE_GAMUT_COMPRESSION: enable_gamut_compression,
         Results.ENABLE_EOTF_CORRECTION: enable_EOTF_correction,
         Results.CALCULATION_ORDER: calculation_order,
-        Results.WHITE_BALANCE_MATRIX: white_balance_matrix.tolist(),
+        Results.WHITE_BALANCE_MATRIX: prepared.white_balance_matrix.tolist(),
         Results.TARGET_TO_SCREEN_MATRIX: target_to_screen_matrix.tolist(),
         Results.REFERENCE_TO_SCREEN_MATRIX: reference_to_target_matrix.tolist(),
         Results.REFERENCE_TO_TARGET_MATRIX: reference_to_target_matrix.tolist(),
@@ -933,19 +1090,158 @@ def run(
         Results.DELTA_E_RGBW: delta_e_wrgb.tolist(),
         Results.DELTA_E_EOTF_RAMP: delta_e_eotf_ramp.tolist(),
         Results.DELTA_E_MACBETH: delta_e_macbeth.tolist(),
-        Results.EXPOSURE_SCALING_FACTOR: exposure_scaling_factor,
+        Results.EXPOSURE_SCALING_FACTOR: prepared.exposure_scaling_factor,
         Results.TARGET_MAX_LUM_NITS: target_max_lum_nits,
-        Results.MEASURED_18_PERCENT_SAMPLE: grey_measurements_white_balanced_native_gamut_green,
+        Results.MEASURED_18_PERCENT_SAMPLE: prepared.grey_measurements_white_balanced_native_gamut_green,
         Results.MEASURED_MAX_LUM_NITS: measured_peak_lum_nits,
         Results.REFERENCE_EOTF_RAMP: eotf_signal_values,
         Results.TARGET_TO_XYZ_MATRIX: target_to_XYZ_matrix.tolist(),
         Results.REFERENCE_TO_XYZ_MATRIX: reference_to_XYZ_matrix.tolist(),
         Results.REFERENCE_TO_INPUT_MATRIX: reference_to_input_matrix.tolist(),
-        Results.MAX_WHITE_DELTA: max_white_delta,
+        Results.MAX_WHITE_DELTA: prepared.max_white_delta,
         Results.EOTF_LINEARITY: eotf_linearity,
         Results.AVOID_CLIPPING: avoid_clipping
     }
 
+    # The deltaE analysis of the samples with the calibration applied, which shares the reference ICtCp values
+    post_delta_e_wrgb, post_delta_e_eotf_ramp, post_delta_e_macbeth = post_calibration_deltaE_ICtCp(
+        prepared.rgbw_reference_samples, prepared.macbeth_reference_samples, prepared.eotf_ramp_reference_samples,
+        rgbw_measurements_pre_calibration, eotf_ramp_pre_calibration, macbeth_measurements_pre_calibration,
+        target_cs, native_camera_gamut_cs, results, cache=cache
+    )
+    results[Results.POST_DELTA_E_RGBW] = post_delta_e_wrgb.tolist()
+    results[Results.POST_DELTA_E_EOTF_RAMP] = post_delta_e_eotf_ramp.tolist()
+    results[Results.POST_DELTA_E_MACBETH] = post_delta_e_macbeth.tolist()
+    return results
+
+
+# The first stage of the calibration each keyword argument of run feeds into. Arguments which are not listed, such as
+# the samples and colour spaces, feed the white balance so changing them recomputes every stage
+CALIBRATION_PARAMETER_STAGES = {
+    "target_to_screen_cat": CalibrationStage.SCREEN_CS,
+    "enable_EOTF_correction": CalibrationStage.SCREEN_CS,
+    "calculation_order": CalibrationStage.SCREEN_CS,
+    "avoid_clipping": CalibrationStage.SCREEN_CS,
+    "gamut_compression_shadow_rolloff": CalibrationStage.MAX_DISTANCES,
+    "enable_gamut_compression": CalibrationStage.DELTA_E,
+}
+
+
+def _parameter_changed(previous_value, value) -> bool:
+    """ Whether the value of a keyword argument of run has changed, comparing array like values by their contents
+
+    Args:
+        previous_value: The value the previous calibration was run with
+        value: The value the calibration is to be run with
+
+    Returns: True if the value has changed
+    """
+    if previous_value is value:
+        return False
+    if isinstance(previous_value, np.ndarray) or isinstance(value, np.ndarray):
+        return not np.array_equal(previous_value, value)
+    return previous_value != value
+
+
+def invalidated_stages(previous_parameters: Union[Dict, None], parameters: Dict) -> List[str]:
+    """ Gets the stages of the calibration which have to be recomputed when the keyword arguments of run change from
+        the previous parameters to the given ones, being the first stage any of the changed arguments feed and all the
+        stages downstream of it
+
+    Args:
+        previous_parameters: The keyword arguments the previous calibration was run with, None if there was none
+        parameters: The keyword arguments the calibration is to be run with
+
+    Returns: The stages to recompute in the order of CalibrationStage.ALL, empty if nothing has changed
+    """
+    if previous_parameters is None:
+        return list(CalibrationStage.ALL)
+
+    first_stage = len(CalibrationStage.ALL)
+    for name in set(previous_parameters) | set(parameters):
+        if not _parameter_changed(previous_parameters.get(name), parameters.get(name)):
+            continue
+        stage = CALIBRATION_PARAMETER_STAGES.get(name, CalibrationStage.WHITE_BALANCE)
+        first_stage = min(first_stage, CalibrationStage.ALL.index(stage))
+    return CalibrationStage.ALL[first_stage:]
+
+
+def recalibrate(
+        parameters: Dict,
+        previous_parameters: Union[Dict, None] = None,
+        previous_results: Union[Dict, None] = None,
+        cache: Union[CalibrationCache, None] = None) -> Tuple[Dict, List[str]]:
+    """ Updates the results of a previous calibration for a change in its keyword arguments, only recomputing the
+        stages downstream of the changed arguments. Changing the gamut compression shadow rolloff only recomputes the
+        max distances and the post calibration deltaE, and enabling or disabling the gamut compression only
+        recomputes the post calibration deltaE, anything further upstream runs the whole calibration again.
+
+    Args:
+        parameters: The keyword arguments for run, including the measured and reference samples
+        previous_parameters: The keyword arguments the previous results were calibrated with
+        previous_results: The results of the previous calibration
+        cache: The cache of the intermediates shared between calibrations of the same samples
+
+    Returns: The results of the calibration, and the stages which were recomputed so the export of the results can
+        be limited to the artifacts which changed
+    """
+    stages = invalidated_stages(previous_parameters if previous_results is not None else None, parameters)
+    if not stages:
+        return previous_results, stages
+
+    if CalibrationStage.EOTF_LUT in stages:
+        return run(cache=cache, **parameters), stages
+
+    if cache is None:
+        cache = CalibrationCache()
+
+    results = dict(previous_results)
+    input_plate_cs, native_camera_gamut_cs, target_cs = get_calibration_colour_spaces(
+        parameters["input_plate_gamut"], parameters["native_camera_gamut"], parameters["target_gamut"]
+    )
+    if CalibrationStage.MAX_DISTANCES in stages:
+        screen_cs = colour.RGB_Colourspace(
+            name="screen",
+            primaries=np.array(previous_results[Results.PRE_CALIBRATION_SCREEN_PRIMARIES]),
+            whitepoint=np.array(previous_results[Results.PRE_CALIBRATION_SCREEN_WHITEPOINT]),
+            use_derived_matrix_XYZ_to_RGB=True,
+            use_derived_matrix_RGB_to_XYZ=True,
+        )
+        target_to_screen_cat = parameters["target_to_screen_cat"]
+        if target_to_screen_cat == constants.CAT.CAT_NONE:
+            target_to_screen_cat = None
+
+        results[Results.MAX_DISTANCES] = colourspace_max_distances(
+            source_cs=target_cs,
+            destination_cs=screen_cs,
+            cat=target_to_screen_cat,
+            shadow_rolloff=parameters.get(
+                "gamut_compression_shadow_rolloff", constants.GAMUT_COMPRESSION_SHADOW_ROLLOFF),
+        ).tolist()
+
+    results[Results.ENABLE_GAMUT_COMPRESSION] = parameters.get("enable_gamut_compression", True)
+
+    # The post calibration deltaE applies the gamut compression, so we prepare the samples as the calibration did
+    target_max_lum_nits = parameters["target_max_lum_nits"]
+    if parameters.get("target_EOTF") != constants.EOTF.EOTF_ST2084:
+        target_max_lum_nits = 100
+    prepared = prepare_samples(
+        parameters["measured_samples"], parameters["reference_samples"], input_plate_cs, native_camera_gamut_cs,
+        utils.get_cat_for_camera_conversion(native_camera_gamut_cs.name), target_max_lum_nits * 0.01,
+        enable_plate_white_balance=parameters.get("enable_plate_white_balance", True),
+        reference_wall_external_white_balance_matrix=parameters.get("reference_wall_external_white_balance_matrix"),
+        decoupled_lens_white_samples=parameters.get("decoupled_lens_white_samples")
+    )
+    post_delta_e_wrgb, post_delta_e_eotf_ramp, post_delta_e_macbeth = post_calibration_deltaE_ICtCp(
+        prepared.rgbw_reference_samples, prepared.macbeth_reference_samples, prepared.eotf_ramp_reference_samples,
+        prepared.rgbw_measurements_camera_native_gamut, prepared.eotf_ramp_camera_native_gamut,
+        prepared.macbeth_measurements_camera_native_gamut, target_cs, native_camera_gamut_cs, results, cache=cache
+    )
+    results[Results.POST_DELTA_E_RGBW] = post_delta_e_wrgb.tolist()
+    results[Results.POST_DELTA_E_EOTF_RAMP] = post_delta_e_eotf_ramp.tolist()
+    results[Results.POST_DELTA_E_MACBETH] = post_delta_e_macbeth.tolist()
+    return results, stages
+
 
 def apply_matrix_to_samples(
         input_matrix: np.ndarray,
@@ -968,18 +1264,12 @@ def apply_matrix_to_samples(
 
     """
 
-    eotf_ramp_camera_native_gamut = [ca.vector_dot(input_matrix, m) for m in
-                                     eotf_ramp_camera_native_gamut]
-    rgbw_measurements_camera_native_gamut = ca.vector_dot(input_matrix,
-                                                          rgbw_measurements_camera_native_gamut)
-    macbeth_measurements_camera_native_gamut = ca.vector_dot(input_matrix,
-                                                             macbeth_measurements_camera_native_gamut)
+    eotf_ramp_camera_native_gamut = ca.vector_dot(input_matrix, eotf_ramp_camera_native_gamut)
+    rgbw_measurements_camera_native_gamut = ca.vector_dot(input_matrix, rgbw_measurements_camera_native_gamut)
+    macbeth_measurements_camera_native_gamut = ca.vector_dot(input_matrix, macbeth_measurements_camera_native_gamut)
 
-    grey_measurements_native_camera_gamut = ca.vector_dot(input_matrix,
-                                                          grey_measurements_native_camera_gamut)
-    max_white_camera_native_gamut = ca.vector_dot(
-        input_matrix,
-        max_white_camera_native_gamut)
+    grey_measurements_native_camera_gamut = ca.vector_dot(input_matrix, grey_measurements_native_camera_gamut)
+    max_white_camera_native_gamut = ca.vector_dot(input_matrix, max_white_camera_native_gamut)
 
     return (
         eotf_ramp_camera_native_gamut, grey_measurements_native_camera_gamut,
@@ -1029,20 +1319,24 @@ def convert_samples_to_required_cs(
     Returns: Tuple containing the converted samples
 
     """
+    input_to_native_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(
+        input_plate_cs, native_camera_gamut_cs, camera_conversion_cat
+    )
+
     eotf_signal_values = list(measured_samples[Measurements.EOTF_RAMP_SIGNAL])
     closest_18_percent_index = find_closest_below(eotf_signal_values, peak_lum * 0.18)
     eotf_signal_values.insert(closest_18_percent_index, peak_lum * 0.18)
 
-    grey_measurements_native_camera_gamut = colour.RGB_to_RGB(
-        measured_samples[Measurements.GREY], input_plate_cs, native_camera_gamut_cs, camera_conversion_cat
+    grey_measurements_native_camera_gamut = ca.vector_dot(
+        input_to_native_matrix, measured_samples[Measurements.GREY]
     )
 
-    max_white_camera_native_gamut = colour.RGB_to_RGB(
-        measured_samples[Measurements.MAX_WHITE], input_plate_cs, native_camera_gamut_cs, camera_conversion_cat
+    max_white_camera_native_gamut = ca.vector_dot(
+        input_to_native_matrix, measured_samples[Measurements.MAX_WHITE]
     )
     # Get The Macbeth Samples And Convert To Camera Native
-    macbeth_measurements_camera_native_gamut = colour.RGB_to_RGB(
-        measured_samples[Measurements.MACBETH], input_plate_cs, native_camera_gamut_cs, camera_conversion_cat
+    macbeth_measurements_camera_native_gamut = ca.vector_dot(
+        input_to_native_matrix, measured_samples[Measurements.MACBETH]
     )
 
     # Combine the primaries and white samples to give us RGBW in the input plate gamut space
@@ -1050,12 +1344,12 @@ def convert_samples_to_required_cs(
         (measured_samples[Measurements.DESATURATED_RGB], [measured_samples[Measurements.GREY]])
     )
 
-    rgbw_measurements_camera_native_gamut = colour.RGB_to_RGB(
-        rgbw_measurements_input_plate_gamut, input_plate_cs, native_camera_gamut_cs, camera_conversion_cat
+    rgbw_measurements_camera_native_gamut = ca.vector_dot(
+        input_to_native_matrix, rgbw_measurements_input_plate_gamut
     )
 
-    eotf_ramp_camera_native_gamut = colour.RGB_to_RGB(
-        measured_samples[Measurements.EOTF_RAMP], input_plate_cs, native_camera_gamut_cs, camera_conversion_cat
+    eotf_ramp_camera_native_gamut = ca.vector_dot(
+        input_to_native_matrix, measured_samples[Measurements.EOTF_RAMP]
     )
 
     eotf_ramp_camera_native_gamut = np.insert(
@@ -1073,8 +1367,8 @@ def convert_samples_to_required_cs(
 
     decoupled_lens_white_samples_camera_native_gamut = None
     if decoupled_lens_white_samples:
-        decoupled_lens_white_samples_camera_native_gamut = colour.RGB_to_RGB(
-            decoupled_lens_white_samples, input_plate_cs, native_camera_gamut_cs, camera_conversion_cat
+        decoupled_lens_white_samples_camera_native_gamut = ca.vector_dot(
+            input_to_native_matrix, decoupled_lens_white_samples
         )
 
     return (
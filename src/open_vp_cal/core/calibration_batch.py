@@ -0,0 +1,90 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Module contains the functions which calibrate the same samples with several parameter sets, so different
+configurations of the calibration for a wall can be compared
+"""
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from open_vp_cal.core import calibrate, constants
+from open_vp_cal.core.constants import Results
+from open_vp_cal.core.structures import CalibrationVariantResult
+
+
+def calibration_parameter_grid(base_parameters: Dict, **variations: List) -> List[Dict]:
+    """ Builds the parameter sets for every combination of the given variations, on top of the base parameters
+
+    Args:
+        base_parameters: The keyword arguments for run which are shared by all the parameter sets
+        **variations: For each keyword argument of run we want to vary, the list of values to try
+
+    Returns: A parameter set for each combination of the variations
+    """
+    names = list(variations)
+    return [
+        {**base_parameters, **dict(zip(names, values))}
+        for values in itertools.product(*(variations[name] for name in names))
+    ]
+
+
+def run_batch(
+        measured_samples: Dict,
+        reference_samples: Dict,
+        parameter_sets: Iterable[Dict],
+        max_workers: int = constants.ANALYSIS_MAX_WORKERS,
+        rank_by: str = Results.POST_DELTA_E_MACBETH) -> List[CalibrationVariantResult]:
+    """ Runs the calibration of the same samples for each of the given parameter sets, so we can compare different
+        configurations of the calibration for a wall.
+
+        The variants are calibrated in parallel and share a CalibrationCache, so the colour space matrices and the
+        ICtCp values of the reference samples are only computed once for the whole batch.
+
+    Args:
+        measured_samples: a dictionary containing the measured values sampled from the input plate
+        reference_samples: a dictionary containing the reference values for the calibration process displayed on
+        the led wall
+        parameter_sets: The keyword arguments for run, other than the samples, for each variant
+        max_workers: The maximum number of variants calibrated at once
+        rank_by: The delta E result the variants are ranked by, using the mean of its values
+
+    Returns: The result of each variant, ordered from the lowest to the highest delta E. Variants which failed to
+        calibrate are placed last, with the error they raised
+    """
+    cache = calibrate.CalibrationCache()
+
+    def _run_variant(parameters: Dict) -> CalibrationVariantResult:
+        variant = CalibrationVariantResult(parameters)
+        try:
+            variant.results = calibrate.run(measured_samples, reference_samples, cache=cache, **parameters)
+        except (ValueError, RuntimeError) as e:
+            variant.error = e
+            return variant
+
+        variant.delta_e = float(np.mean(variant.results[rank_by]))
+        return variant
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="CalibrationBatch") as executor:
+        variants = list(executor.map(_run_variant, parameter_sets))
+
+    # Variants which failed, or whose delta E is not finite, sort after all the others and otherwise keep their order
+    return sorted(
+        variants,
+        key=lambda variant: (variant.delta_e is None or not np.isfinite(variant.delta_e),
+                             variant.delta_e if variant.delta_e is not None else 0.0)
+    )
@@ -43,6 +43,13 @@ YELLOW = (252, 186, 3)
 KELVIN_TEMPERATURES = [5003, 6000, 6504]
 
 OPEN_VP_CAL_UNIT_TESTING = "OPEN_VP_CAL_UNIT_TESTING"
+OPEN_VP_CAL_FRAME_CACHE_MB = "OPEN_VP_CAL_FRAME_CACHE_MB"
+OPEN_VP_CAL_SEQUENCE_INDEX_SIDECAR = "OPEN_VP_CAL_SEQUENCE_INDEX_SIDECAR"
+OPEN_VP_CAL_PROXY_CACHE = "OPEN_VP_CAL_PROXY_CACHE"
+OPEN_VP_CAL_PATTERN_CACHE = "OPEN_VP_CAL_PATTERN_CACHE"
+OPEN_VP_CAL_PATTERN_CACHE_MB = "OPEN_VP_CAL_PATTERN_CACHE_MB"
+OPEN_VP_CAL_SAMPLE_EXECUTOR = "OPEN_VP_CAL_SAMPLE_EXECUTOR"
+OPEN_VP_CAL_TEMPORAL_SAMPLING = "OPEN_VP_CAL_TEMPORAL_SAMPLING"
 LOG_URL = 'https://yl6ov5gen9.execute-api.eu-west-1.amazonaws.com/default/update_openvpcal_database'
 VERSION = "openvp_cal_version"
 
@@ -50,6 +57,34 @@ TARGET_MAX_LUM_NITS_NONE_PQ = 100
 
 DEFAULT_OCIO_CONFIG = "studio-config-v1.0.0_aces-v1.3_ocio-v2.1"
 
+DEFAULT_FRAME_CACHE_SIZE_MB = 4096
+DEFAULT_PREFETCH_DEPTH = 8
+PREFETCH_MAX_WORKERS = 8
+PREFETCH_MAX_STRIDE = 16
+ANALYSIS_MAX_WORKERS = 8
+SAMPLING_MAX_WORKERS = 8
+PATTERN_EXPORT_MAX_WORKERS = 8
+SAMPLE_EXECUTOR_THREAD = "thread"
+SAMPLE_EXECUTOR_PROCESS = "process"
+SAMPLE_TILE_PIXELS = 262144
+MACBETH_SWATCH_SAMPLES = 16
+MACBETH_DETECTION_TOLERANCE = 0.1
+DEFAULT_SEPARATION_COARSE_STEP = 4
+PROXY = "proxy"
+PROXY_FACTORS = [4, 16]
+PROXY_CACHE_FOLDER_NAME = ".open_vp_cal_proxies"
+OCIO_CONFIG_CACHE_SIZE = 8
+OCIO_PROCESSOR_CACHE_SIZE = 64
+COLOUR_SPACE_CACHE_SIZE = 64
+COLOUR_SPACE_MATRIX_CACHE_SIZE = 256
+SEQUENCE_INDEX_FILE_NAME = ".open_vp_cal_sequence_index.json"
+SEQUENCE_INDEX_VERSION = 3
+SEQUENCE_INDEX_MTIME_GRANULARITY_NS = 2000000000
+SEQUENCE_INDEX_FINE_MTIME_GRANULARITY_NS = 20000000
+PATTERN_CACHE_FOLDER_NAME = ".open_vp_cal_pattern_cache"
+PATTERN_CACHE_VERSION = 1
+DEFAULT_PATTERN_CACHE_SIZE_MB = 2048
+
 
 class UILayouts:
     """
@@ -233,6 +268,9 @@ class Results:
     DELTA_E_RGBW = "DELTA_E_RGBW"
     DELTA_E_EOTF_RAMP = "DELTA_E_EOTF_RAMP"
     DELTA_E_MACBETH = "DELTA_E_MACBETH"
+    POST_DELTA_E_RGBW = "POST_DELTA_E_RGBW"
+    POST_DELTA_E_EOTF_RAMP = "POST_DELTA_E_EOTF_RAMP"
+    POST_DELTA_E_MACBETH = "POST_DELTA_E_MACBETH"
     EXPOSURE_SCALING_FACTOR = "exposure_scaling_factor"
     MEASURED_18_PERCENT_SAMPLE = "measured_18_percent_sample"
     TARGET_MAX_LUM_NITS = "target_max_lum_nits"
@@ -340,6 +378,20 @@ class CalculationOrder:
     CO_EOTF_CS_STRING = "EOTF_CS"
 
 
+class CalibrationStage:
+    """
+    Class to hold the constants to describe the stages of the calibration, in the order they depend on one another,
+    so a change to a stage requires each of the stages after it to be recomputed
+    """
+    WHITE_BALANCE = "white_balance"
+    SCREEN_CS = "screen_cs"
+    EOTF_LUT = "eotf_lut"
+    MAX_DISTANCES = "max_distances"
+    DELTA_E = "delta_e"
+    EXPORT = "export"
+    ALL = [WHITE_BALANCE, SCREEN_CS, EOTF_LUT, MAX_DISTANCES, DELTA_E, EXPORT]
+
+
 class PQ:
     """
     Class to hold the constants to calculate values going to and from PQ
@@ -21,7 +21,7 @@ from typing import List
 
 import PyOpenColorIO as ocio
 from PyOpenColorIO import ColorSpace
-from colour import RGB_COLOURSPACES, matrix_RGB_to_RGB
+from colour import RGB_COLOURSPACES
 from open_vp_cal.core import constants, ocio_utils, utils
 from open_vp_cal.core.constants import EOTF, Results, CalculationOrder
 from open_vp_cal.core.ocio_utils import numpy_matrix_to_ocio_matrix
@@ -43,8 +43,16 @@ class OcioConfigWriter:
     encoding_hdr_video = "hdr-video"
     encoding_log = "log"
 
-    def __init__(self, output_folder: str):
+    def __init__(self, output_folder: str, write_eotf_luts: bool = True):
+        """ Initializes an OcioConfigWriter instance.
+
+        Args:
+            output_folder: The folder to write the CLF files to
+            write_eotf_luts: Whether to write the EOTF LUT CLF files, if False the CLF files already in the output
+                folder are referenced as they are, as the EOTF LUTs have not changed since they were written
+        """
         self._output_folder = output_folder
+        self._write_eotf_luts = write_eotf_luts
 
     def _get_view_transform(self, name: str, description: str) -> ocio.ViewTransform:
         """ Get a view transform with the given name and description
@@ -396,10 +404,8 @@ class OcioConfigWriter:
         """
         reference_colour_space = RGB_COLOURSPACES[led_wall_settings.input_plate_gamut]
         target_color_space = utils.get_target_colourspace_for_led_wall(led_wall_settings)
-        reference_to_target_matrix = matrix_RGB_to_RGB(
-            input_colourspace=reference_colour_space,
-            output_colourspace=target_color_space,
-            chromatic_adaptation_transform=str(led_wall_settings.reference_to_target_cat),
+        reference_to_target_matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(
+            reference_colour_space, target_color_space, str(led_wall_settings.reference_to_target_cat)
         )
         ref_to_target_matrix_transform = ocio.MatrixTransform(
             ocio_utils.numpy_matrix_to_ocio_matrix(reference_to_target_matrix)
@@ -555,13 +561,15 @@ class OcioConfigWriter:
 
             # matrix transform to screen colour space
             ocio_utils.populate_ocio_group_transform_for_CO_EOTF_CS(
-                "_".join([calibration_cs.getName(), EOTF_CS_string]), group, self._output_folder, results)
+                "_".join([calibration_cs.getName(), EOTF_CS_string]), group, self._output_folder, results,
+                write_lut=self._write_eotf_luts)
 
             if preview_export_filter:
                 ocio_utils.populate_ocio_group_transform_for_CO_CS_EOTF(
                     "_".join([calibration_preview_cs.getName(), CS_EOTF_string]),
                     group_preview,
-                    self._output_folder, results
+                    self._output_folder, results,
+                    write_lut=self._write_eotf_luts
                 )
 
         elif results[Results.CALCULATION_ORDER] == CalculationOrder.CO_CS_EOTF:
@@ -569,13 +577,15 @@ class OcioConfigWriter:
             ocio_utils.populate_ocio_group_transform_for_CO_CS_EOTF(
                 "_".join([calibration_cs.getName(), CS_EOTF_string]), group,
                 self._output_folder,
-                results
+                results,
+                write_lut=self._write_eotf_luts
             )
             if preview_export_filter:
                 ocio_utils.populate_ocio_group_transform_for_CO_EOTF_CS(
                     "_".join([calibration_preview_cs.getName(), EOTF_CS_string]), group_preview,
                     self._output_folder,
-                    results
+                    results,
+                    write_lut=self._write_eotf_luts
                 )
 
         else:
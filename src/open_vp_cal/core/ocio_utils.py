@@ -16,7 +16,9 @@ limitations under the License.
 Module contains utility functions specific to OpenColorIO
 """
 import os
-from typing import Any
+import threading
+from collections import OrderedDict
+from typing import Any, Tuple
 
 import PyOpenColorIO as ocio
 import pkg_resources
@@ -25,7 +27,6 @@ import numpy as np
 from colour.models import eotf_ST2084, eotf_inverse_ST2084
 
 from open_vp_cal.core import constants, utils
-from open_vp_cal.core.calibrate import resample_lut
 
 # Currently we have a hard requirement on OCIO 2.1+ to support gamut compression
 if not pkg_resources.parse_version(ocio.__version__) >= pkg_resources.parse_version(
@@ -34,6 +35,110 @@ if not pkg_resources.parse_version(ocio.__version__) >= pkg_resources.parse_vers
     raise ImportError("Requires OCIO v2.1 or greater.")
 
 
+class OcioProcessorCache:
+    """
+    A process wide cache of the OCIO configs and the CPU processors created from them, so repeated colour conversions
+    do not re-parse the config or rebuild the processors. Entries are keyed on the path and modification time of the
+    config, so an edited config is picked up, and the least recently used entries are evicted once the cache is full
+    """
+    _lock = threading.Lock()
+    _configs = OrderedDict()
+    _processors = OrderedDict()
+    max_configs = constants.OCIO_CONFIG_CACHE_SIZE
+    max_processors = constants.OCIO_PROCESSOR_CACHE_SIZE
+
+    @staticmethod
+    def _config_key(config_path: str) -> Tuple[str, int]:
+        """ Returns the key for the config at the given path, which changes whenever the config is modified
+
+        Args:
+            config_path: The path to the OCIO config
+
+        Returns: The path and modification time of the config
+        """
+        return os.path.abspath(config_path), os.stat(config_path).st_mtime_ns
+
+    @classmethod
+    def get_config(cls, config_path: str) -> ocio.Config:
+        """ Returns the OCIO config loaded from the given path
+
+        Args:
+            config_path: The path to the OCIO config
+
+        Returns: The OCIO config
+        """
+        key = cls._config_key(config_path)
+        with cls._lock:
+            return utils.get_or_create_lru(
+                cls._configs, cls.max_configs, key, lambda: ocio.Config.CreateFromFile(config_path)
+            )
+
+    @classmethod
+    def get_cpu_processor(cls, config_path: str, from_transform: str, to_transform: str) -> ocio.CPUProcessor:
+        """ Returns the CPU processor which converts between the given colour spaces of the config
+
+        Args:
+            config_path: The path to the OCIO config
+            from_transform: The colour space to convert from
+            to_transform: The colour space to convert to
+
+        Returns: The CPU processor for the conversion
+        """
+        config = cls.get_config(config_path)
+        key = cls._config_key(config_path) + ("colour_space", from_transform, to_transform)
+        with cls._lock:
+            return utils.get_or_create_lru(
+                cls._processors, cls.max_processors, key,
+                lambda: config.getProcessor(from_transform, to_transform).getDefaultCPUProcessor()
+            )
+
+    @classmethod
+    def get_display_cpu_processor(cls, config_path: str, display: str, view: str) -> ocio.CPUProcessor:
+        """ Returns the CPU processor which converts from scene linear to the given display and view of the config
+
+        Args:
+            config_path: The path to the OCIO config
+            display: The display to convert to
+            view: The view of the display to convert to
+
+        Returns: The CPU processor for the conversion
+        """
+        config = cls.get_config(config_path)
+        key = cls._config_key(config_path) + ("display", display, view)
+        with cls._lock:
+            return utils.get_or_create_lru(
+                cls._processors, cls.max_processors, key,
+                lambda: config.getProcessor(
+                    ocio.ROLE_SCENE_LINEAR, display, view, ocio.TRANSFORM_DIR_FORWARD
+                ).getDefaultCPUProcessor()
+            )
+
+    @classmethod
+    def evict(cls, config_path: str) -> None:
+        """ Removes the config at the given path, and the processors created from it, from the cache whatever their
+            modification time, for when the files the config references, such as its CLFs, are rewritten in place.
+            OCIO caches the files it has read by their path, so its caches are cleared as well
+
+        Args:
+            config_path: The path to the OCIO config
+        """
+        config_path = os.path.abspath(config_path)
+        with cls._lock:
+            for entries in (cls._configs, cls._processors):
+                for key in [key for key in entries if key[0] == config_path]:
+                    del entries[key]
+            ocio.ClearAllCaches()
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Removes all the configs and processors from the cache
+        """
+        with cls._lock:
+            cls._configs.clear()
+            cls._processors.clear()
+
+
 def write_eotf_lut_pq(lut_r, lut_g, lut_b, filename) -> None:
     """ Write a LUT to a file in CLF format using PQ
 
@@ -53,9 +158,9 @@ def write_eotf_lut_pq(lut_r, lut_g, lut_b, filename) -> None:
 
     value = eotf_ST2084(value_pq) / pq_max_scaled_1_100
 
-    lut_r_i = resample_lut(lut_r, value)
-    lut_g_i = resample_lut(lut_g, value)
-    lut_b_i = resample_lut(lut_b, value)
+    lut_r_i = utils.resample_lut(lut_r, value)
+    lut_g_i = utils.resample_lut(lut_g, value)
+    lut_b_i = utils.resample_lut(lut_b, value)
 
     lut_r_i_pq = eotf_inverse_ST2084(lut_r_i * pq_max_scaled_1_100)
     lut_g_i_pq = eotf_inverse_ST2084(lut_g_i * pq_max_scaled_1_100)
@@ -96,24 +201,26 @@ def numpy_matrix_to_ocio_matrix(np_mat: np.ndarray) -> Any:
     return ocio_matrix.flatten().tolist()
 
 
-def create_EOTF_LUT(lut_filename: str, results: dict) -> ocio.GroupTransform:
+def create_EOTF_LUT(lut_filename: str, results: dict, write_lut: bool = True) -> ocio.GroupTransform:
     """ Create an EOTF LUT
 
     Args:
         lut_filename: The filename to write the LUT too
         results: The results from the calibration
+        write_lut: Whether to write the LUT, if False an existing LUT file is kept as it is
 
     Returns: The OCIO group transform for the EOTF LUT
 
     """
     # EOTF LUT
     # must be written to a sidecar file, which is named from the config
-    write_eotf_lut_pq(
-        results[constants.Results.EOTF_LUT_R],
-        results[constants.Results.EOTF_LUT_G],
-        results[constants.Results.EOTF_LUT_B],
-        lut_filename
-    )
+    if write_lut or not os.path.exists(lut_filename):
+        write_eotf_lut_pq(
+            results[constants.Results.EOTF_LUT_R],
+            results[constants.Results.EOTF_LUT_G],
+            results[constants.Results.EOTF_LUT_B],
+            lut_filename
+        )
     eotf_lut = ocio.FileTransform(
         os.path.basename(lut_filename),
         direction=ocio.TransformDirection.TRANSFORM_DIR_INVERSE,
@@ -172,7 +279,8 @@ def create_gamut_compression(results: dict) -> ocio.GroupTransform:
 
 
 def populate_ocio_group_transform_for_CO_CS_EOTF(
-        clf_name: str, group: ocio.GroupTransform, output_folder: str, results: dict) -> None:
+        clf_name: str, group: ocio.GroupTransform, output_folder: str, results: dict,
+        write_lut: bool = True) -> None:
     """ Populate the OCIO group transform for the CO_CS_EOTF calculation order
 
     Args:
@@ -180,12 +288,13 @@ def populate_ocio_group_transform_for_CO_CS_EOTF(
         group: The OCIO group transform to add the transforms to
         output_folder: The folder to write the CLF files to
         results: The results from the calibration
+        write_lut: Whether to write the EOTF LUT, if False an existing CLF file is kept as it is
 
     """
     # EOTF LUT
     if results[constants.Results.ENABLE_EOTF_CORRECTION]:
         clf_name = os.path.join(output_folder, clf_name + ".clf")
-        eotf_lut_group = create_EOTF_LUT(clf_name, results)
+        eotf_lut_group = create_EOTF_LUT(clf_name, results, write_lut=write_lut)
         group.appendTransform(eotf_lut_group)
 
     # matrix transform to screen colour space
@@ -197,7 +306,8 @@ def populate_ocio_group_transform_for_CO_CS_EOTF(
 
 
 def populate_ocio_group_transform_for_CO_EOTF_CS(
-        clf_name: str, group: ocio.GroupTransform, output_folder: str, results: dict) -> None:
+        clf_name: str, group: ocio.GroupTransform, output_folder: str, results: dict,
+        write_lut: bool = True) -> None:
     """ Populate the OCIO group transform for the CO_EOTF_CS calculation order
 
     Args:
@@ -205,6 +315,7 @@ def populate_ocio_group_transform_for_CO_EOTF_CS(
         group: The OCIO group transform to add the transforms to
         output_folder: The folder to write the CLF files to
         results: The results from the calibration
+        write_lut: Whether to write the EOTF LUT, if False an existing CLF file is kept as it is
     """
     group.appendTransform(
         ocio.MatrixTransform(
@@ -216,7 +327,7 @@ def populate_ocio_group_transform_for_CO_EOTF_CS(
     # must be written to a sidecar file, which is named from the config
     if results[constants.Results.ENABLE_EOTF_CORRECTION]:
         lut_filename = os.path.join(output_folder, clf_name + ".clf")
-        eotf_lut_group = create_EOTF_LUT(lut_filename, results)
+        eotf_lut_group = create_EOTF_LUT(lut_filename, results, write_lut=write_lut)
         group.appendTransform(eotf_lut_group)
 
 
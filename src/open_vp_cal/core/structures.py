@@ -36,6 +36,10 @@ class ProcessingResults:
         self.calibration_results_file = None
         self.lut_output_file = None
         self.led_wall_colour_spaces = None
+        # The keyword arguments the calibration results were computed with, and the folder the preview of the
+        # calibration was exported to, so a change to the settings only recomputes and re-exports what depends on it
+        self.calibration_parameters = None
+        self.preview_export_folder = None
 
 
 class ValidationResult:
@@ -57,9 +61,56 @@ class SamplePatchResults:
         Initialize an instance of SamplePatchResults.
         """
         self.samples = []
+        # The FrameDescriptors of the frames which were sampled, rather than the frames themselves, so the
+        # decoded images are not kept alive for as long as the results
         self.frames = []
 
 
+class CalibrationVariantResult:
+    """
+    Class to store the result of calibrating the samples with one of the parameter sets of a batch
+    """
+
+    def __init__(self, parameters: dict):
+        """
+        Initialize an instance of CalibrationVariantResult.
+
+        Args:
+            parameters: The keyword arguments the calibration was run with
+        """
+        self.parameters = parameters
+        self.results = None
+        # The mean delta E the variants of the batch are ranked by, None if the calibration failed
+        self.delta_e = None
+        self.error = None
+
+
+class PreparedSamples:
+    """
+    Class to store the samples converted to the camera native colour space, white balanced and scaled by the exposure
+    of the led wall, ready to be calibrated
+    """
+
+    def __init__(self):
+        """
+        Initialize an instance of PreparedSamples.
+        """
+        self.eotf_ramp_camera_native_gamut = None
+        self.grey_measurements_native_camera_gamut = None
+        self.macbeth_measurements_camera_native_gamut = None
+        self.max_white_camera_native_gamut = None
+        self.rgbw_measurements_camera_native_gamut = None
+        self.eotf_signal_values = None
+        self.rgbw_reference_samples = None
+        self.macbeth_reference_samples = None
+        self.eotf_ramp_reference_samples = None
+        self.white_balance_matrix = None
+        self.exposure_scaling_factor = None
+        self.max_white_delta = None
+        # The green value of the white balanced 18 percent grey sample, before the exposure scaling
+        self.grey_measurements_white_balanced_native_gamut_green = None
+
+
 class ConfigurationResult:
     """ Simple class to hold the results of the configuration check
     """
@@ -16,7 +16,9 @@ limitations under the License.
 Utility functions for open_vp_cal
 """
 import re
-from typing import Tuple, Union, List
+import threading
+from collections import OrderedDict
+from typing import Tuple, Union, List, Hashable, Callable, Any
 import numpy as np
 
 import colour
@@ -172,6 +174,142 @@ def get_legal_and_extended_values(peak_lum: int,
     return minimum_legal, maximum_legal, minimum_extended, maximum_extended
 
 
+def resample_lut(lut, values):
+    """Resample the provided LUT at the given values.
+
+    Uses piecewise linear interpolation
+
+    Args:
+        lut (array-like): list of (y,x) pairs in ascending order
+        values (array-like): list of new sample values
+
+    Returns:
+        1D LUT: list of (y,x) pairs
+    """
+    lut = np.array(lut)
+    x_values = lut[:, 1]
+    y_values = lut[:, 0]
+    y_interp = np.interp(values, x_values, y_values)
+    return np.stack((y_interp, values), axis=1)
+
+
+def get_or_create_lru(entries: OrderedDict, max_entries: int, key: Hashable, create: Callable) -> Any:
+    """ Returns the entry for the key from a least recently used cache, creating it if it does not exist, and evicting
+        the least recently used entries once we have more than the maximum number of entries. The caller must hold
+        the lock which guards the entries
+
+    Args:
+        entries: The entries to get the entry from
+        max_entries: The maximum number of entries to keep
+        key: The key of the entry
+        create: The function to call to create the entry if it does not exist
+
+    Returns: The entry for the key
+    """
+    if key in entries:
+        entries.move_to_end(key)
+        return entries[key]
+
+    entry = create()
+    entries[key] = entry
+    while len(entries) > max_entries:
+        entries.popitem(last=False)
+    return entry
+
+
+class ColourSpaceCache:
+    """
+    A process wide cache of the custom colour spaces and the RGB to RGB matrices between colour spaces, so they are not
+    rebuilt for every conversion. Entries are keyed on the values which define them, the primaries, white point and
+    chromatic adaptation transform, so changed primaries never return a stale entry, and the least recently used
+    entries are evicted once the cache is full
+    """
+    _lock = threading.Lock()
+    _colour_spaces = OrderedDict()
+    _matrices = OrderedDict()
+    max_colour_spaces = constants.COLOUR_SPACE_CACHE_SIZE
+    max_matrices = constants.COLOUR_SPACE_MATRIX_CACHE_SIZE
+
+    @staticmethod
+    def _colour_space_key(colour_space: colour.RGB_Colourspace) -> Tuple:
+        """ Returns the key which identifies the colour space by the values it converts with, rather than by the object
+
+        Args:
+            colour_space: The colour space to create the key for
+
+        Returns: The key for the colour space
+        """
+        return tuple(
+            np.asarray(value, dtype=np.float64).tobytes() for value in (
+                colour_space.primaries, colour_space.whitepoint,
+                colour_space.matrix_RGB_to_XYZ, colour_space.matrix_XYZ_to_RGB
+            )
+        )
+
+    @classmethod
+    def get_custom_colour_space(cls, custom_name: str, values: List[List]) -> colour.RGB_Colourspace:
+        """ Returns the custom colour space for the given primaries and white point, the colour space is shared so
+            must not be modified
+
+        Args:
+            custom_name: The name of the custom colour space
+            values: The values of the 3 primaries followed by the white point
+
+        Returns: The custom colour space
+        """
+        key = (custom_name, np.asarray(values, dtype=np.float64).tobytes())
+        with cls._lock:
+            return get_or_create_lru(
+                cls._colour_spaces, cls.max_colour_spaces, key,
+                lambda: colour.RGB_Colourspace(custom_name, values[:3], values[-1])
+            )
+
+    @classmethod
+    def matrix_RGB_to_RGB(
+            cls, input_colourspace: colour.RGB_Colourspace, output_colourspace: colour.RGB_Colourspace,
+            chromatic_adaptation_transform: Union[str, None] = CAT.CAT_CAT02) -> np.ndarray:
+        """ Returns the matrix which converts RGB values between the two colour spaces, computing it on first use
+
+        Args:
+            input_colourspace: The colour space to convert from
+            output_colourspace: The colour space to convert to
+            chromatic_adaptation_transform: The chromatic adaptation transform to use, or None
+
+        Returns: A copy of the 3x3 conversion matrix
+        """
+        key = (
+            cls._colour_space_key(input_colourspace), cls._colour_space_key(output_colourspace),
+            None if chromatic_adaptation_transform is None else str(chromatic_adaptation_transform)
+        )
+        with cls._lock:
+            matrix = get_or_create_lru(
+                cls._matrices, cls.max_matrices, key,
+                lambda: colour.matrix_RGB_to_RGB(
+                    input_colourspace=input_colourspace,
+                    output_colourspace=output_colourspace,
+                    chromatic_adaptation_transform=chromatic_adaptation_transform,
+                )
+            )
+        return matrix.copy()
+
+    @classmethod
+    def clear_colour_spaces(cls) -> None:
+        """
+        Removes all the custom colour spaces from the cache, used when the custom primaries of a project change
+        """
+        with cls._lock:
+            cls._colour_spaces.clear()
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Removes all the colour spaces and matrices from the cache
+        """
+        with cls._lock:
+            cls._colour_spaces.clear()
+            cls._matrices.clear()
+
+
 def get_target_colourspace_for_led_wall(led_wall: "LedWallSettings") -> colour.RGB_Colourspace:
     """ Gets the target colour space for the given led wall based on the target gamut
         If its standard gamut we return this directly from colour
@@ -223,9 +361,7 @@ def get_custom_colour_space_from_primaries_and_wp(custom_name: str, values: List
     if len(values) != 4:
         raise ValueError("Must provide 4 tuples for 3 primaries and 1 white point")
 
-    white_point = values[-1]
-    primaries = values[:3]
-    return colour.RGB_Colourspace(custom_name, primaries, white_point)
+    return ColourSpaceCache.get_custom_colour_space(custom_name, values)
 
 
 def get_primaries_and_wp_for_XYZ_matrix(XYZ_matrix) -> Tuple[np.array, np.array]:
@@ -17,9 +17,11 @@ The Module has classes dedicated to identifying the region of interest within th
  which we want to extract to analyze
 """
 import sys
-from typing import List
+from typing import List, Union
+
+import numpy as np
+import OpenImageIO as Oiio
 
-from open_vp_cal.core.utils import clamp
 from open_vp_cal.led_wall_settings import LedWallSettings
 
 
@@ -144,14 +146,22 @@ class AutoROI(BaseSamplePatch):
     The main class which deals with identifying the region of interest within the image sequence which we want to
     extract
     """
-    def __init__(self, led_wall_settings: LedWallSettings, separation_results: SeparationResults):
+    pixel_buffer = 5
+    detection_threshold = 1.7
+    band_height = 256
+
+    def __init__(self, led_wall_settings: LedWallSettings, separation_results: SeparationResults,
+                 proxy_factor: int = 1):
         """ Initialize an instance of AutoROI
 
         Args:
             led_wall_settings: The LED wall we want to detect the roi for
             separation_results: The results of the separation detection for the LED wall sequence
+            proxy_factor: The factor to downscale the frame by before detecting the roi, 1 uses the full resolution
+                frame. The detected pixels are scaled back to full resolution, so are only accurate to the factor
         """
         super().__init__(led_wall_settings, separation_results, constants.PATCHES.DISTORT_AND_ROI)
+        self.proxy_factor = proxy_factor
 
     def run(self) -> AutoROIResults:
         """
@@ -166,33 +176,67 @@ class AutoROI(BaseSamplePatch):
         if first_patch_frame > self.led_wall.sequence_loader.end_frame:
             return results
 
-        frame = self.led_wall.sequence_loader.get_frame(first_patch_frame + self.trim_frames)
-        pixel_buffer = 5
-        detection_threshold = 1.7
-        for y_pos in range(frame.image_buf.spec().height):
-            for x_pos in range(frame.image_buf.spec().width):
-                pixel = frame.image_buf.getpixel(x_pos, y_pos)
-                red = clamp(pixel[0], 0, sys.float_info.max)
-                green = clamp(pixel[1], 0, sys.float_info.max)
-                blue = clamp(pixel[2], 0, sys.float_info.max)
-
-                if red > results.red_value:
-                    if red > max(green, blue) * detection_threshold:
-                        results.red_pixel = (x_pos + pixel_buffer, y_pos + pixel_buffer)
-                        results.red_value = red
-
-                if green > results.green_value:
-                    if green > max(red, blue) * detection_threshold:
-                        results.green_pixel = (x_pos - pixel_buffer, y_pos + pixel_buffer)
-                        results.green_value = green
-
-                if blue > results.blue_value:
-                    if blue > max(red, green) * detection_threshold:
-                        results.blue_pixel = (x_pos + pixel_buffer, y_pos - pixel_buffer)
-                        results.blue_value = blue
-
-                white = (red + green + blue) / 3
-                if white > results.white_value:
-                    results.white_pixel = (x_pos - pixel_buffer, y_pos - pixel_buffer)
-                    results.white_value = white
+        frame = self.led_wall.sequence_loader.get_frame(
+            first_patch_frame + self.trim_frames, proxy_factor=self.proxy_factor
+        )
+        return self.detect_roi_pixels(frame.image_buf, results, scale=frame.proxy_factor)
+
+    @classmethod
+    def detect_roi_pixels(cls, image_buf: Oiio.ImageBuf,
+                          results: Union[AutoROIResults, None] = None, scale: int = 1) -> AutoROIResults:
+        """ Finds the brightest red, green, blue and white pixels within the image, which mark the corners of the
+        region of interest. A red, green or blue pixel is only considered if the channel is greater than the other
+        two channels by the detection threshold. Where several pixels share the brightest value, the first pixel in
+        scanline order is used.
+
+        The image is processed in bands of scanlines, with each band searched as whole arrays, rather than per pixel
+
+        Args:
+            image_buf: The image we want to detect the roi pixels in
+            results: The results to store the detected pixels in, if None new results are created
+            scale: The factor the image is downscaled by from the full resolution frame, the detected pixels are
+                returned as the centre of the full resolution pixels they cover
+
+        Returns:
+            AutoROIResults: The results of the roi detection
+        """
+        if results is None:
+            results = AutoROIResults()
+
+        spec = image_buf.spec()
+        pixels = np.asarray(image_buf.get_pixels(Oiio.FLOAT)).reshape(spec.height, spec.width, spec.nchannels)
+        offsets = {
+            "red": (cls.pixel_buffer, cls.pixel_buffer),
+            "green": (-cls.pixel_buffer, cls.pixel_buffer),
+            "blue": (cls.pixel_buffer, -cls.pixel_buffer),
+            "white": (-cls.pixel_buffer, -cls.pixel_buffer),
+        }
+        for y_begin in range(0, spec.height, cls.band_height):
+            band = pixels[y_begin:y_begin + cls.band_height, :, :3].astype(np.float64)
+
+            # Matches clamping each channel to 0 - max float, where nans are treated as 0
+            band = np.clip(np.nan_to_num(band, nan=0.0, posinf=sys.float_info.max, neginf=0.0),
+                           0, sys.float_info.max)
+            red, green, blue = band[..., 0], band[..., 1], band[..., 2]
+
+            with np.errstate(over="ignore", invalid="ignore"):
+                candidates = {
+                    "red": np.where(red > np.maximum(green, blue) * cls.detection_threshold, red, -np.inf),
+                    "green": np.where(green > np.maximum(red, blue) * cls.detection_threshold, green, -np.inf),
+                    "blue": np.where(blue > np.maximum(red, green) * cls.detection_threshold, blue, -np.inf),
+                    "white": (red + green + blue) / 3,
+                }
+
+            for name, values in candidates.items():
+                index = int(np.argmax(values))
+                value = float(values.flat[index])
+                if value == -np.inf or value <= getattr(results, f"{name}_value"):
+                    continue
+
+                y_pos, x_pos = divmod(index, spec.width)
+                x_offset, y_offset = offsets[name]
+                setattr(results, f"{name}_pixel", (
+                    x_pos * scale + scale // 2 + x_offset, (y_begin + y_pos) * scale + scale // 2 + y_offset
+                ))
+                setattr(results, f"{name}_value", value)
         return results
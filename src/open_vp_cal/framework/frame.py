@@ -13,9 +13,11 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 
-Module that contains the Frame class which is used to represent a frame within the sequence loader
+Module that contains the Frame class which is used to represent a frame within the sequence loader, and the
+FrameDescriptor class which describes a sampled frame without holding its pixels
 """
-from typing import List
+import os
+from typing import List, Union
 
 from open_vp_cal.imaging import imaging_utils
 
@@ -32,6 +34,8 @@ class Frame:
         self._frame_num = None
         self._file_name = None
         self._image_buf = None
+        self._roi = None
+        self._proxy_factor = 1
         self._project_settings = project_settings
 
     @property
@@ -94,6 +98,46 @@ class Frame:
         """
         self._image_buf = value
 
+    @property
+    def roi(self) -> Union[List[int], None]:
+        """
+        Property for _roi.
+
+        Returns:
+        List[int]: The region of interest the image buffer was loaded for, or None if it holds the full frame.
+        """
+        return self._roi
+
+    @roi.setter
+    def roi(self, value: Union[List[int], None]):
+        """
+        Setter for _roi.
+
+        Parameters:
+        value (List[int]): The region of interest the image buffer holds, or None for the full frame.
+        """
+        self._roi = value
+
+    @property
+    def proxy_factor(self) -> int:
+        """
+        Property for _proxy_factor.
+
+        Returns:
+        int: The factor the image buffer is downscaled by from the full resolution frame, 1 for full resolution.
+        """
+        return self._proxy_factor
+
+    @proxy_factor.setter
+    def proxy_factor(self, value: int):
+        """
+        Setter for _proxy_factor.
+
+        Parameters:
+        value (int): The factor the image buffer is downscaled by from the full resolution frame.
+        """
+        self._proxy_factor = value
+
     def __str__(self) -> str:
         """
         Generates a string representation of this Frame instance.
@@ -110,7 +154,8 @@ class Frame:
 
     def extract_roi(self, roi: List) -> "Oiio.ImageBuf":
         """
-        Extracts a region of interest from the image buffer of this frame.
+        Extracts a region of interest from the image buffer of this frame. The region is given in full resolution
+        pixels, and is scaled to match the image buffer if this frame is a proxy.
 
         Parameters:
             roi (Oiio.ROI): The region of interest to extract from the image buffer.
@@ -118,4 +163,118 @@ class Frame:
         Returns:
             Oiio.ImageBuf: The extracted region of interest.
         """
-        return imaging_utils.extract_roi(self._image_buf, roi)
+        return imaging_utils.extract_roi(self._image_buf, imaging_utils.scale_roi(roi, self._proxy_factor))
+
+
+class FrameDescriptor:
+    """
+    A lightweight description of a frame which has been sampled, holding where the frame can be loaded from and the
+    statistics of its region of interest, rather than the decoded image buffer. The frame can be loaded again on demand.
+    """
+
+    def __init__(self, frame_num: int, file_path: str, roi: Union[List[int], None] = None,
+                 samples: Union[List[float], None] = None):
+        """
+        Initializes a FrameDescriptor instance.
+
+        Parameters:
+            frame_num (int): The frame number of the frame.
+            file_path (str): The full path of the file the frame is stored in.
+            roi (List[int]): The region of interest which was sampled from the frame, or None for the full frame.
+            samples (List[float]): The sampled RGB values of the region of interest, if sampled individually.
+        """
+        self._frame_num = frame_num
+        self._file_path = file_path
+        self._roi = list(roi) if roi else None
+        self._samples = samples
+
+    @classmethod
+    def from_frame(cls, frame: Frame, folder_path: str, roi: Union[List[int], None] = None,
+                   samples: Union[List[float], None] = None) -> "FrameDescriptor":
+        """
+        Creates a descriptor for the given frame loaded from the given folder.
+
+        Parameters:
+            frame (Frame): The frame to describe.
+            folder_path (str): The folder the frame was loaded from.
+            roi (List[int]): The region of interest which was sampled from the frame.
+            samples (List[float]): The sampled RGB values of the region of interest.
+
+        Returns:
+            FrameDescriptor: The descriptor of the frame.
+        """
+        return cls(frame.frame_num, os.path.join(folder_path, frame.file_name), roi=roi, samples=samples)
+
+    @property
+    def frame_num(self) -> int:
+        """
+        Property for _frame_num.
+        """
+        return self._frame_num
+
+    @property
+    def file_path(self) -> str:
+        """
+        Property for _file_path.
+        """
+        return self._file_path
+
+    @property
+    def file_name(self) -> str:
+        """
+        Property for the file name of the frame.
+        """
+        return os.path.basename(self._file_path)
+
+    @property
+    def roi(self) -> Union[List[int], None]:
+        """
+        Property for _roi.
+        """
+        return self._roi
+
+    @property
+    def samples(self) -> Union[List[float], None]:
+        """
+        Property for _samples.
+        """
+        return self._samples
+
+    def load(self, sequence_loader: "SequenceLoader") -> Frame:
+        """
+        Loads the frame again through the given sequence loader, so the frame is shared with its cache.
+
+        Parameters:
+            sequence_loader (SequenceLoader): The loader of the sequence the frame belongs to.
+
+        Returns:
+            Frame: The frame, holding the region of interest if one was sampled.
+        """
+        return sequence_loader.get_frame(self._frame_num, roi=self._roi)
+
+    def load_image_buf(self) -> "Oiio.ImageBuf":
+        """
+        Loads the image buffer of the frame directly from disk, decoding only the region of interest if one was
+        sampled.
+
+        Returns:
+            Oiio.ImageBuf: The image buffer of the frame.
+        """
+        if self._roi:
+            return imaging_utils.load_image_roi(self._file_path, self._roi)
+        return imaging_utils.load_image(self._file_path, read_pixels=True)
+
+    def __str__(self) -> str:
+        """
+        Generates a string representation of this FrameDescriptor instance.
+
+        Returns:
+        str: A string representation of this FrameDescriptor instance.
+        """
+        result = {
+            "frame_num": self._frame_num,
+            "file_path": self._file_path,
+            "roi": self._roi,
+            "samples": self._samples
+        }
+        return str(result)
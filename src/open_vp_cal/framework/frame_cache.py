@@ -0,0 +1,374 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Module contains the classes associated with caching decoded frames in memory, with the caches being bound to a
+maximum memory budget, so that the least recently used frames are evicted once the budget is exceeded. By default the
+budget is shared by every cache in the process, so the memory used does not grow with the number of walls
+"""
+import os
+import itertools
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Hashable, Union
+
+from open_vp_cal.core import constants
+from open_vp_cal.framework.frame import Frame
+
+
+class FrameCacheStats:
+    """
+    Class to store the statistics of the frame cache
+    """
+    def __init__(self):
+        """
+        Initialize an instance of FrameCacheStats.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def __str__(self) -> str:
+        """
+        Generates a string representation of this FrameCacheStats instance.
+
+        Returns:
+        str: A string representation of this FrameCacheStats instance.
+        """
+        result = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes
+        }
+        return str(result)
+
+
+class FrameCacheBudget:
+    """
+    A memory budget shared between frame caches. The frames of all the caches are tracked in a single least recently
+    used order, so once the frames of all the caches exceed the budget, the least recently used frames are evicted
+    from whichever cache holds them. All the caches of a budget share its lock
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_bytes: Union[int, None] = None):
+        """ Initializes a FrameCacheBudget instance.
+
+        Args:
+            max_bytes: The maximum number of bytes the decoded frames of all the caches can take up, if None we use
+                the default cache size
+        """
+        if max_bytes is None:
+            max_bytes = self.default_max_bytes()
+
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.lock = threading.RLock()
+        # (cache id, frame key) -> frame size, in least to most recently used order across all the caches
+        self._entries = OrderedDict()
+        self._caches = weakref.WeakValueDictionary()
+
+    @staticmethod
+    def default_max_bytes() -> int:
+        """ Returns the default size of the budget in bytes, which can be overridden by setting the
+            OPEN_VP_CAL_FRAME_CACHE_MB environment variable
+
+        Returns: The default size of the budget in bytes
+
+        """
+        cache_size_mb = os.environ.get(
+            constants.OPEN_VP_CAL_FRAME_CACHE_MB, constants.DEFAULT_FRAME_CACHE_SIZE_MB
+        )
+        return int(float(cache_size_mb) * 1024 * 1024)
+
+    @classmethod
+    def shared(cls) -> "FrameCacheBudget":
+        """ Returns the budget which is shared by all the frame caches of the process, which is created on first use
+
+        Returns: The shared budget
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def register(self, cache_id: int, cache: "FrameCache") -> None:
+        """ Registers the cache with the budget, the frames of the cache are released from the budget once the cache
+            is garbage collected
+
+        Args:
+            cache_id: The unique id of the cache
+            cache: The cache to register
+        """
+        with self.lock:
+            self._caches[cache_id] = cache
+        weakref.finalize(cache, self._release_cache, cache_id)
+
+    def _release_cache(self, cache_id: int) -> None:
+        """ Releases all the frames of the cache with the given id from the budget
+
+        Args:
+            cache_id: The id of the cache
+        """
+        with self.lock:
+            for entry in [entry for entry in self._entries if entry[0] == cache_id]:
+                self.current_bytes -= self._entries.pop(entry)
+
+    def add(self, cache_id: int, key: Hashable, size: int) -> None:
+        """ Adds the frame to the budget as the most recently used. Must be called with the lock held
+
+        Args:
+            cache_id: The id of the cache holding the frame
+            key: The key of the frame within the cache
+            size: The size of the frame in bytes
+        """
+        self._entries[(cache_id, key)] = size
+        self.current_bytes += size
+
+    def remove(self, cache_id: int, key: Hashable) -> None:
+        """ Removes the frame from the budget. Must be called with the lock held
+
+        Args:
+            cache_id: The id of the cache holding the frame
+            key: The key of the frame within the cache
+        """
+        self.current_bytes -= self._entries.pop((cache_id, key), 0)
+
+    def touch(self, cache_id: int, key: Hashable) -> None:
+        """ Marks the frame as the most recently used. Must be called with the lock held
+
+        Args:
+            cache_id: The id of the cache holding the frame
+            key: The key of the frame within the cache
+        """
+        if (cache_id, key) in self._entries:
+            self._entries.move_to_end((cache_id, key))
+
+    def evict(self) -> None:
+        """
+        Evicts the least recently used frames of all the caches until we are within the memory budget, we always
+        keep the most recently used frame so the frame currently in use is never evicted. Must be called with the
+        lock held
+        """
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            cache_id, key = next(iter(self._entries))
+            cache = self._caches.get(cache_id)
+            if cache is None:
+                self.remove(cache_id, key)
+                continue
+            cache.evict_frame(key)
+
+
+class FrameCache:
+    """
+    A least recently used cache of frames, which is bound to a maximum number of bytes rather than a number of frames.
+    The size of each frame is computed from the ImageSpec of its image buffer.
+
+    The budget is shared with the other caches of the process unless the cache is given a maximum number of bytes of
+    its own
+    """
+    _cache_ids = itertools.count()
+
+    def __init__(self, max_bytes: Union[int, None] = None, budget: Union[FrameCacheBudget, None] = None):
+        """ Initializes a FrameCache instance.
+
+        Args:
+            max_bytes: The maximum number of bytes the decoded frames of this cache alone can take up, if None the
+                cache uses the given budget
+            budget: The budget the cache shares with other caches, if None and no maximum number of bytes is given
+                we use the budget shared by the whole process
+        """
+        if budget is None:
+            budget = FrameCacheBudget(max_bytes) if max_bytes is not None else FrameCacheBudget.shared()
+
+        self._budget = budget
+        self._id = next(self._cache_ids)
+        self._current_bytes = 0
+        self._frames = OrderedDict()
+        self._frame_sizes = {}
+        self._lock = budget.lock
+        self.stats = FrameCacheStats()
+        budget.register(self._id, self)
+
+    @staticmethod
+    def default_max_bytes() -> int:
+        """ Returns the default size of the cache in bytes, which can be overridden by setting the
+            OPEN_VP_CAL_FRAME_CACHE_MB environment variable
+
+        Returns: The default size of the cache in bytes
+
+        """
+        return FrameCacheBudget.default_max_bytes()
+
+    @staticmethod
+    def frame_size_bytes(frame: Union[Frame, None]) -> int:
+        """ Calculates the number of bytes the decoded image buffer of the given frame takes up
+
+        Args:
+            frame: The frame we want to get the size of
+
+        Returns: The size of the frame in bytes
+
+        """
+        if frame is None or frame.image_buf is None:
+            return 0
+        return frame.image_buf.spec().image_bytes()
+
+    @property
+    def budget(self) -> FrameCacheBudget:
+        """
+        Property for the memory budget the cache is bound to.
+        """
+        return self._budget
+
+    @property
+    def max_bytes(self) -> int:
+        """
+        Property for max_bytes, the maximum number of bytes of the budget the cache is bound to.
+        """
+        return self._budget.max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        """ Sets the maximum number of bytes of the budget the cache is bound to, evicting frames if needed
+
+        Args:
+            value: The maximum number of bytes for the budget
+        """
+        with self._lock:
+            self._budget.max_bytes = value
+            self._budget.evict()
+
+    @property
+    def current_bytes(self) -> int:
+        """
+        Property for current_bytes, the number of bytes the frames of this cache take up.
+        """
+        return self._current_bytes
+
+    def get(self, frame_num: Hashable, default: Union[Frame, None] = None) -> Union[Frame, None]:
+        """ Gets the frame from the cache, marking it as the most recently used
+
+        Args:
+            frame_num: The frame number we want to get
+            default: The value to return if the frame is not in the cache
+
+        Returns: The frame if it is in the cache, otherwise the default
+
+        """
+        with self._lock:
+            if frame_num not in self._frames:
+                self.stats.misses += 1
+                return default
+
+            self.stats.hits += 1
+            self._frames.move_to_end(frame_num)
+            self._budget.touch(self._id, frame_num)
+            return self._frames[frame_num]
+
+    def clear(self) -> None:
+        """
+        Removes all the frames from the cache, the statistics are preserved
+        """
+        with self._lock:
+            for frame_num in list(self._frames):
+                self._remove(frame_num)
+
+    def _remove(self, frame_num: Hashable) -> int:
+        """ Removes the frame from the cache if it exists and returns the number of bytes released
+
+        Args:
+            frame_num: The frame number to remove
+
+        Returns: The number of bytes released
+        """
+        if frame_num not in self._frames:
+            return 0
+
+        del self._frames[frame_num]
+        size = self._frame_sizes.pop(frame_num)
+        self._current_bytes -= size
+        self._budget.remove(self._id, frame_num)
+        return size
+
+    def evict_frame(self, frame_num: Hashable) -> None:
+        """ Evicts the frame from the cache to bring the budget back within its limit. Must be called with the lock
+            held
+
+        Args:
+            frame_num: The frame number to evict
+        """
+        self.stats.evicted_bytes += self._remove(frame_num)
+        self.stats.evictions += 1
+
+    def __setitem__(self, frame_num: Hashable, frame: Union[Frame, None]):
+        """ Adds the frame into the cache as the most recently used, evicting the least recently used frames if we
+            exceed the memory budget
+
+        Args:
+            frame_num: The frame number of the frame
+            frame: The frame to store
+        """
+        size = self.frame_size_bytes(frame)
+        with self._lock:
+            self._remove(frame_num)
+            self._frames[frame_num] = frame
+            self._frame_sizes[frame_num] = size
+            self._current_bytes += size
+            self._budget.add(self._id, frame_num, size)
+            self._budget.evict()
+
+    def __getitem__(self, frame_num: Hashable) -> Frame:
+        """ Gets the frame from the cache, raising a KeyError if it does not exist
+
+        Args:
+            frame_num: The frame number we want to get
+
+        Returns: The frame from the cache
+        """
+        with self._lock:
+            if frame_num not in self._frames:
+                self.stats.misses += 1
+                raise KeyError(frame_num)
+            return self.get(frame_num)
+
+    def __delitem__(self, frame_num: Hashable):
+        """ Removes the frame from the cache
+
+        Args:
+            frame_num: The frame number to remove
+        """
+        with self._lock:
+            if frame_num not in self._frames:
+                raise KeyError(frame_num)
+            self._remove(frame_num)
+
+    def __contains__(self, frame_num: Hashable) -> bool:
+        """ Checks if the frame is in the cache, this does not affect the order of the frames
+
+        Args:
+            frame_num: The frame number to check
+
+        Returns: True if the frame is in the cache
+        """
+        return frame_num in self._frames
+
+    def __len__(self) -> int:
+        """ Returns the number of frames in the cache
+        """
+        return len(self._frames)
@@ -19,7 +19,8 @@ the processing
 """
 import os.path
 import math
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Tuple, Union
 
 import numpy as np
 
@@ -33,8 +34,10 @@ from open_vp_cal.imaging import imaging_utils
 from open_vp_cal.imaging.macbeth import get_colour_checker_for_colour_space_and_illuminant
 from open_vp_cal.led_wall_settings import LedWallSettings
 from open_vp_cal.core import constants, utils, ocio_config
+from open_vp_cal.core.ocio_utils import OcioProcessorCache
 from open_vp_cal.core.resource_loader import ResourceLoader
 from open_vp_cal.core.calibrate import saturate_RGB
+from open_vp_cal.framework.pattern_cache import PatternCache
 
 
 class PatchGeneration:
@@ -42,17 +45,26 @@ class PatchGeneration:
     The PatchGeneration class is responsible for generating colour squares using OpenImageIO (Oiio).
     """
 
-    def __init__(self, led_wall: LedWallSettings, patch_size=(1000, 1000)):
+    # The patches whose pixel geometry and text is laid out for the 3840x2160 design raster, these are generated at
+    # the design resolution and resized to the output resolution, all others are generated at the output resolution
+    DESIGN_RASTER_PATCHES = (constants.PATCHES.SLATE, constants.PATCHES.DISTORT_AND_ROI)
+
+    def __init__(self, led_wall: LedWallSettings, patch_size=(1000, 1000), generation_resolution=(3840, 2160)):
         """
         Initializes the PatchGeneration with the LED wall settings
 
         Parameters:
             led_wall (LedWallSettings): The LED wall we want to generate patches for
+            patch_size (tuple): The width and height of the patches
+            generation_resolution (tuple): The width and height of the images the patches are generated in
         """
         self.led_wall = led_wall
         self.patch_size = patch_size
         self.base_name = None
         self.generation_ocio_config_path = None
+        self.output_generator = self
+        self.pattern_cache = None
+        self._colour_conversion_ids = []
 
         self.peak_lum = None
         self.percent_18_lum = None
@@ -67,8 +79,7 @@ class PatchGeneration:
         self.desaturated_green = np.array([])
         self.desaturated_blue = np.array([])
         self.flat_field = [0.5, 0.5, 0.5]
-        self._generation_width = 3840
-        self._generation_height = 2160
+        self._generation_width, self._generation_height = generation_resolution
 
         self.calc_constants()
 
@@ -324,8 +335,8 @@ class PatchGeneration:
 
         # Our image is in 0-1 with 1 being max white. We need to scale it to our target peak luminance.
         np_array = imaging_utils.image_buf_to_np_array(output_img_buf)
-        np_array_scaled = np_array * self.peak_lum
-        scaled_img = imaging_utils.img_buf_from_numpy_array(np_array_scaled)
+        np_array *= self.peak_lum
+        scaled_img = imaging_utils.img_buf_from_numpy_array(np_array)
 
         outer_image_buf = Oiio.ImageBuf(Oiio.ImageSpec(
             patch_width, patch_height, 3,
@@ -976,12 +987,13 @@ class PatchGeneration:
         Oiio.ImageBufAlgo.fill(full_image, (patch_values[0], patch_values[1], patch_values[2]))
         return [full_image]
 
-    def generate_patch(self, patch_name: constants.PATCHES) -> list[Oiio.ImageBuf]:
+    def generate_patch(self, patch_name: constants.PATCHES, patch_values=None) -> list[Oiio.ImageBuf]:
         """
         Generates a colour square using OpenImageIO (Oiio) for the given pattern name.
 
         Parameters:
             patch_name (str): The name of the pattern
+            patch_values: The values to generate the pattern with, defaults to the values from the patches map
 
         Returns:
             Oiio.ImageBuf: The image buffer of the generated colour square.
@@ -989,7 +1001,7 @@ class PatchGeneration:
         image_width, image_height = self._generation_width, \
             self._generation_height
 
-        patches, _ = self.find_and_generate_patch_from_map(patch_name)
+        patches, _ = self.find_and_generate_patch_from_map(patch_name, patch_values=patch_values)
 
         # Calculate the start position of the patch so that it is centered in the image
         start_x, start_y = self.get_patch_start_positions()
@@ -1011,23 +1023,97 @@ class PatchGeneration:
 
         return result
 
-    def find_and_generate_patch_from_map(self, patch_name: str) -> Tuple[List[Oiio.ImageBuf], List[float]]:
+    def find_and_generate_patch_from_map(
+            self, patch_name: str, patch_values=None) -> Tuple[List[Oiio.ImageBuf], List[float]]:
         """ Finds the patch function and values from the patches map and generates the patch
 
         Args:
             patch_name: The name of the patch to generate
+            patch_values: The values to generate the patch with, defaults to the values from the patches map
 
         Returns: The generated patches, and the values which went into generating them
 
         """
         # get the patch function and values
         if patch_name in self.patches_map:
-            patch_func, patch_values = self.patches_map[patch_name]
+            patch_func, default_patch_values = self.patches_map[patch_name]
         else:
             raise ValueError(f"Patch name {patch_name} not found in patches map")
+        if patch_values is None:
+            patch_values = default_patch_values
         patches = patch_func(patch_values)
         return patches, patch_values
 
+    def get_patch_image_values(self, patch_name: str) -> List:
+        """ Splits the values of the patch into the values for each of the images the patch generates, so each image
+            can be generated on its own, and the number of frames of the patch is known before it is generated
+
+        Args:
+            patch_name: The name of the patch
+
+        Returns: The values to generate each of the images of the patch with
+
+        """
+        if patch_name not in self.patches_map:
+            raise ValueError(f"Patch name {patch_name} not found in patches map")
+
+        patch_func, patch_values = self.patches_map[patch_name]
+        # The eotf ramps are the only patch which generates an image per value
+        if patch_func == self.generate_eotf_ramps:
+            return [[patch_value] for patch_value in patch_values]
+        return [patch_values]
+
+    def get_solid_patch_colour(self, patch_name: str, patch_values) -> Union[List[float], None]:
+        """ Gets the colour of a patch which is a single solid colour on a black frame, or fills the whole frame
+
+        Args:
+            patch_name: The name of the patch
+            patch_values: The values the image of the patch is generated with, from get_patch_image_values
+
+        Returns: The RGB colour of the patch, or None if the patch is not a single solid colour
+
+        """
+        patch_func, _ = self.patches_map[patch_name]
+        if patch_func in (self.generate_solid_patch, self.generate_solid_patch_full):
+            return list(patch_values)
+        if patch_func == self.generate_eotf_ramps and len(patch_values) == 1:
+            return [patch_values[0]] * 3
+        return None
+
+    def generate_solid_frame(self, patch_name: str, colour: List[float]) -> Oiio.ImageBuf:
+        """ Generates the frame of a solid colour patch, already converted to the output colour space. Only the colour
+            of the patch and the black around it are converted through OCIO rather than every pixel of the frame, the
+            frame is then filled with the converted colours
+
+        Args:
+            patch_name: The name of the patch
+            colour: The colour of the patch, from get_solid_patch_colour
+
+        Returns: The converted frame of the patch
+
+        """
+        colours = np.array([[colour, [0.0, 0.0, 0.0]]], dtype=np.float32)
+        if self.led_wall.project_settings.file_format != constants.FileFormats.FF_EXR:
+            colours = imaging_utils.image_buf_to_np_array(
+                self.apply_color_convert(imaging_utils.img_buf_from_numpy_array(colours))
+            )
+        patch_colour, black = colours[0]
+
+        frame = Oiio.ImageBuf(Oiio.ImageSpec(self._generation_width, self._generation_height, 3, Oiio.FLOAT))
+        patch_func, _ = self.patches_map[patch_name]
+        if patch_func == self.generate_solid_patch_full:
+            Oiio.ImageBufAlgo.fill(frame, patch_colour.tolist())
+            return frame
+
+        Oiio.ImageBufAlgo.fill(frame, black.tolist())
+        patch_width, patch_height = self.patch_size
+        start_x, start_y = self.get_patch_start_positions()
+        Oiio.ImageBufAlgo.fill(frame, patch_colour.tolist(), roi=Oiio.ROI(
+            max(start_x, 0), min(start_x + patch_width, self._generation_width),
+            max(start_y, 0), min(start_y + patch_height, self._generation_height), 0, 1, 0, 3
+        ))
+        return frame
+
     def apply_color_convert(self, img_buf):
         """
         Applies the Oiio.ImageBufAlgo colour convert method to the given image buffer.
@@ -1051,6 +1137,23 @@ class PatchGeneration:
         )
         return output_img_buf
 
+    def get_frame_file_path(self, patch_name: str) -> str:
+        """ Gets the file path of the frame with the given name, creating the folder the frames are written to
+
+        Args:
+            patch_name: The name of the frame
+
+        Returns: The file path of the frame
+
+        """
+        folder_path = os.path.join(
+            self.led_wall.project_settings.export_folder, constants.ProjectFolders.PATCHES,
+            self.base_name, self.led_wall.project_settings.file_format
+        )
+        # The patches are written concurrently, so the folders may be created by another patch at the same time
+        os.makedirs(folder_path, exist_ok=True)
+        return os.path.join(folder_path, f"{patch_name}.{self.led_wall.project_settings.file_format}")
+
     def write_to_disk(self, img_buf, patch_name) -> str:
         """ Writes the given image buffer to disk using the output folder parameter name from the project settings.
 
@@ -1058,17 +1161,11 @@ class PatchGeneration:
             img_buf (Oiio.ImageBuf): The image buffer to write to disk.
             patch_name (str): The name of the patch.
         """
-        folder_path = os.path.join(
-            self.led_wall.project_settings.export_folder, constants.ProjectFolders.PATCHES)
-
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
+        file_path = self.get_frame_file_path(patch_name)
 
-        folder_path = os.path.join(folder_path, self.base_name, self.led_wall.project_settings.file_format)
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
-
-        file_path = os.path.join(folder_path, f"{patch_name}.{self.led_wall.project_settings.file_format}")
+        # The frame may be linked to the frames of a previous export, so we remove it rather than overwrite them all
+        if os.path.lexists(file_path):
+            os.remove(file_path)
 
         bit_depth = 10
         if self.led_wall.project_settings.file_format == constants.FileFormats.FF_EXR:
@@ -1077,9 +1174,9 @@ class PatchGeneration:
         if self.led_wall.project_settings.file_format == constants.FileFormats.FF_TIF:
             bit_depth = 16
 
-        if (self.led_wall.project_settings.resolution_height != self._generation_height
-                or self.led_wall.project_settings.resolution_width !=
-                self._generation_width):
+        # Only the patches generated on the design raster need resizing, the rest are already at the output size
+        if (self.led_wall.project_settings.resolution_height != img_buf.spec().height
+                or self.led_wall.project_settings.resolution_width != img_buf.spec().width):
             img_buf = imaging_utils.resize_image(
                 img_buf, self.led_wall.project_settings.resolution_width,
                 self.led_wall.project_settings.resolution_height)
@@ -1088,7 +1185,190 @@ class PatchGeneration:
             img_buf, file_path, bit_depth, channel_mapping=None)
         return file_path
 
-    def generate_patches(self, patch_names: list[constants.PATCHES]):
+    def prepare_generation(self, generation_ocio_config_path: str = None) -> None:
+        """ Prepares the generator to generate the patches for the led wall, calculating the constants, the base name
+            of the frames and the OCIO config the patches are converted with
+
+        Args:
+            generation_ocio_config_path: The pre calibration OCIO config containing the colour spaces of the led wall,
+                if not provided the config is written for the led wall alone
+        """
+        self.calc_constants()
+        if not generation_ocio_config_path:
+            ocio_config_writer = ocio_config.OcioConfigWriter(self.led_wall.project_settings.export_folder)
+            generation_ocio_config_path = ocio_config_writer.generate_pre_calibration_ocio_config([self.led_wall])
+        self.generation_ocio_config_path = generation_ocio_config_path
+
+        led_wall_name_cleaned = utils.replace_non_alphanumeric(self.led_wall.name, "_")
+        target_gamut_cleaned = utils.replace_non_alphanumeric(str(self.led_wall.target_gamut), "_")
+        target_eotf_cleaned = utils.replace_non_alphanumeric(str(self.led_wall.target_eotf), "_")
+        self.base_name = f"OpenVPCal_{led_wall_name_cleaned}_{target_gamut_cleaned}_{target_eotf_cleaned}"
+        self.output_generator = self._create_output_generator()
+
+        self.pattern_cache = None
+        if PatternCache.enabled():
+            # The cache is kept out of the export folder, which is what gets delivered to the wall
+            self.pattern_cache = PatternCache(os.path.join(
+                self.led_wall.project_settings.output_folder, constants.PATTERN_CACHE_FOLDER_NAME
+            ))
+            self._colour_conversion_ids = self._get_colour_conversion_ids()
+
+    def _get_colour_conversion_ids(self) -> List[str]:
+        """ Gets the cache ids of the OCIO processors the patches are converted with. These identify the transforms
+            themselves rather than the config they come from, so a change to the colour spaces of another wall in the
+            config does not change them
+
+        Returns: The cache ids of the conversion to the output colour space and of the reference image conversion
+
+        """
+        target_gamut_only_cs_name, _ = ocio_config.OcioConfigWriter.target_gamut_only_cs_metadata(self.led_wall)
+        target_gamut_and_tf_cs_name, _ = ocio_config.OcioConfigWriter.target_gamut_and_transfer_function_cs_metadata(
+            self.led_wall
+        )
+        config = OcioProcessorCache.get_config(self.generation_ocio_config_path)
+        return [
+            config.getProcessor(target_gamut_only_cs_name, target_gamut_and_tf_cs_name).getCacheID(),
+            config.getProcessor("sRGB - Texture", target_gamut_only_cs_name).getCacheID()
+        ]
+
+    def get_pattern_cache_key(self, patch_name: constants.PATCHES, patch_values) -> str:
+        """ Gets the key the image of the patch is stored under in the pattern cache, from everything which affects
+            the image written to disk
+
+        Args:
+            patch_name: The name of the patch
+            patch_values: The values the image is generated with, from get_patch_image_values
+
+        Returns: The key of the image
+
+        """
+        project_settings = self.led_wall.project_settings
+        target_colour_space = utils.get_target_colourspace_for_led_wall(self.led_wall)
+        inputs = {
+            "open_vp_cal_version": open_vp_cal.__version__,
+            "patch_name": patch_name,
+            "patch_values": patch_values,
+            "target_gamut": str(self.led_wall.target_gamut),
+            "target_primaries": target_colour_space.primaries,
+            "target_whitepoint": target_colour_space.whitepoint,
+            "target_eotf": str(self.led_wall.target_eotf),
+            "target_max_lum_nits": self.led_wall.target_max_lum_nits,
+            "patch_size": self.patch_size,
+            "generation_resolution": (self._generation_width, self._generation_height),
+            "resolution": (project_settings.resolution_width, project_settings.resolution_height),
+            "file_format": project_settings.file_format,
+            "colour_conversions": self._colour_conversion_ids,
+        }
+        # The slate shows the settings of the wall and the project, so any of them change the image
+        if patch_name == constants.PATCHES.SLATE:
+            inputs["project_settings"] = project_settings.to_dict()
+            inputs["led_wall_settings"] = self.led_wall.to_dict()
+        return PatternCache.key(inputs)
+
+    def _create_output_generator(self) -> "PatchGeneration":
+        """ Creates the generator which generates the patches directly at the output resolution of the project, with
+            the size of the patches scaled from the generation resolution, so they cover the same area of the wall as
+            they would once resized, without having to generate and resample the larger image
+
+        Returns: The generator for the output resolution, this generator if it already generates at that resolution
+
+        """
+        output_width = self.led_wall.project_settings.resolution_width
+        output_height = self.led_wall.project_settings.resolution_height
+        if (output_width, output_height) == (self._generation_width, self._generation_height):
+            return self
+
+        patch_width, patch_height = self.patch_size
+        output_patch_size = (
+            max(1, int(round(patch_width * output_width / self._generation_width))),
+            max(1, int(round(patch_height * output_height / self._generation_height)))
+        )
+        output_generator = PatchGeneration(
+            self.led_wall, patch_size=output_patch_size, generation_resolution=(output_width, output_height)
+        )
+        output_generator.base_name = self.base_name
+        output_generator.generation_ocio_config_path = self.generation_ocio_config_path
+        return output_generator
+
+    def export_patch_image(self, patch_name: constants.PATCHES, patch_values, first_frame: int) -> List[str]:
+        """ Generates a single image of the patch, converts it to the output colour space and writes it to disk for
+            each of the frames of the patch. The image is converted and encoded once, the rest of its frames
+            are links to the first. Images which were exported before with the same inputs are linked from the
+            pattern cache rather than being generated again.
+
+            This is safe to call concurrently for different frames once the generator has been prepared
+
+        Args:
+            patch_name: The name of the patch
+            patch_values: The values to generate the image with, from get_patch_image_values
+            first_frame: The frame number of the first frame of the image
+
+        Returns: The file paths of the frames written for the image
+
+        """
+        frames_per_patch = self.led_wall.project_settings.frames_per_patch
+        if frames_per_patch < 1:
+            return []
+
+        file_format = self.led_wall.project_settings.file_format
+        cache_key = None
+        if self.pattern_cache:
+            cache_key = self.get_pattern_cache_key(patch_name, patch_values)
+            cached_file_path = self.pattern_cache.get(cache_key, file_format)
+            if cached_file_path:
+                return self._link_frames(cached_file_path, first_frame, frames_per_patch)
+
+        generator = self if patch_name in self.DESIGN_RASTER_PATCHES else self.output_generator
+        solid_colour = generator.get_solid_patch_colour(patch_name, patch_values)
+        if solid_colour is not None:
+            img_buf = generator.generate_solid_frame(patch_name, solid_colour)
+        else:
+            img_buffers = generator.generate_patch(patch_name, patch_values=patch_values)
+            if len(img_buffers) != 1:
+                raise ValueError(
+                    f"Patch {patch_name} generated {len(img_buffers)} images for a single set of values"
+                )
+
+            img_buf = img_buffers[0]
+            if file_format != constants.FileFormats.FF_EXR:
+                img_buf = self.apply_color_convert(img_buf)
+
+        file_path = self.write_to_disk(img_buf, self.get_frame_name(first_frame))
+        if cache_key:
+            self.pattern_cache.store(cache_key, file_path, file_format)
+        return [file_path] + self._link_frames(file_path, first_frame + 1, frames_per_patch - 1)
+
+    def get_frame_name(self, frame: int) -> str:
+        """ Gets the name of the given frame of the patches, without the file extension
+
+        Args:
+            frame: The frame number
+
+        Returns: The name of the frame
+
+        """
+        return f"{self.base_name}.{str(frame).zfill(6)}"
+
+    def _link_frames(self, source_file_path: str, first_frame: int, num_frames: int) -> List[str]:
+        """ Links the given number of frames, starting at the first frame, to an image which has already been written
+
+        Args:
+            source_file_path: The image the frames are linked to
+            first_frame: The frame number of the first frame to link
+            num_frames: The number of frames to link
+
+        Returns: The file paths of the linked frames
+
+        """
+        return [
+            imaging_utils.link_image(source_file_path, self.get_frame_file_path(self.get_frame_name(frame)))
+            for frame in range(first_frame, first_frame + num_frames)
+        ]
+
+    def generate_patches(
+            self, patch_names: list[constants.PATCHES],
+            max_workers: int = constants.PATTERN_EXPORT_MAX_WORKERS,
+            progress_callback: Callable[[int, int], None] = None):
         """
         Generates colour squares for the given patch names, applies colour convert, and writes them to disk.
 
@@ -1103,27 +1383,82 @@ class PatchGeneration:
 
         Parameters:
             patch_names (list[str]): The list of patch names.
+            max_workers (int): The maximum number of patch images generated at once
+            progress_callback (Callable): Called with the number of images exported so far and the total
 
         """
-        self.calc_constants()
-        ocio_config_writer = ocio_config.OcioConfigWriter(self.led_wall.project_settings.export_folder)
-        self.generation_ocio_config_path = ocio_config_writer.generate_pre_calibration_ocio_config([self.led_wall])
-        led_wall_name_cleaned = utils.replace_non_alphanumeric(self.led_wall.name, "_")
-        target_gamut_cleaned = utils.replace_non_alphanumeric(str(self.led_wall.target_gamut), "_")
-        target_eotf_cleaned = utils.replace_non_alphanumeric(str(self.led_wall.target_eotf), "_")
-        self.base_name = f"OpenVPCal_{led_wall_name_cleaned}_{target_gamut_cleaned}_{target_eotf_cleaned}"
+        self.prepare_generation()
+        return export_patterns([self], patch_names, max_workers=max_workers, progress_callback=progress_callback)[0]
+
+
+def export_patterns(
+        patch_generators: List[PatchGeneration], patch_names: List[constants.PATCHES],
+        max_workers: int = constants.PATTERN_EXPORT_MAX_WORKERS,
+        progress_callback: Callable[[int, int], None] = None) -> List[List[str]]:
+    """ Exports the given patches for each of the prepared patch generators, generating the images of all the patches
+        of all the walls on a bounded pool of threads.
 
-        count = 0
-        file_paths = []
+        The frame numbers of each image are assigned up front in the order of the patch names, so the frames written
+        are the same regardless of the order the images finish in
+
+    Args:
+        patch_generators: The patch generators for each wall, which have had prepare_generation called
+        patch_names: The names of the patches to export, in the order of their frames
+        max_workers: The maximum number of patch images generated at once
+        progress_callback: Called with the number of images exported so far and the total number of images
+
+    Returns: The file paths of the frames written for each of the patch generators, in frame order
+
+    """
+    tasks = []
+    for generator_index, patch_generator in enumerate(patch_generators):
+        frame = 0
         for patch_name in patch_names:
-            img_buffers = self.generate_patch(patch_name)
-            for img_buf in img_buffers:
-                if self.led_wall.project_settings.file_format != constants.FileFormats.FF_EXR:
-                    img_buf = self.apply_color_convert(img_buf)
-                for _ in range(self.led_wall.project_settings.frames_per_patch):
-                    file_name = f"{self.base_name}.{str(count).zfill(6)}"
-                    file_paths.append(
-                        self.write_to_disk(img_buf, str(file_name))
-                    )
-                    count += 1
-        return file_paths
+            for patch_values in patch_generator.get_patch_image_values(patch_name):
+                tasks.append((generator_index, patch_generator, patch_name, patch_values, frame))
+                frame += patch_generator.led_wall.project_settings.frames_per_patch
+
+    results = [[] for _ in patch_generators]
+    if not tasks:
+        return results
+
+    with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(tasks)), thread_name_prefix="OpenVPCalPatternExport") as executor:
+        futures = {
+            executor.submit(patch_generator.export_patch_image, patch_name, patch_values, frame): task_index
+            for task_index, (_, patch_generator, patch_name, patch_values, frame) in enumerate(tasks)
+        }
+        task_file_paths = [None] * len(tasks)
+        try:
+            for completed, future in enumerate(as_completed(futures), start=1):
+                task_file_paths[futures[future]] = future.result()
+                if progress_callback:
+                    progress_callback(completed, len(tasks))
+        except Exception:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    for (generator_index, *_), file_paths in zip(tasks, task_file_paths):
+        results[generator_index].extend(file_paths)
+
+    _prune_pattern_caches(tasks)
+    return results
+
+
+def _prune_pattern_caches(tasks: List[tuple]) -> None:
+    """ Prunes the pattern caches of the generators of the export, keeping the images referenced by the export
+
+    Args:
+        tasks: The export tasks of the form (generator_index, patch_generator, patch_name, patch_values, frame)
+    """
+    pattern_caches = {}
+    for _, patch_generator, patch_name, patch_values, _ in tasks:
+        if not patch_generator.pattern_cache:
+            continue
+        pattern_cache, referenced_keys = pattern_caches.setdefault(
+            patch_generator.pattern_cache.folder_path, (patch_generator.pattern_cache, set())
+        )
+        referenced_keys.add(patch_generator.get_pattern_cache_key(patch_name, patch_values))
+
+    for pattern_cache, referenced_keys in pattern_caches.values():
+        pattern_cache.prune(referenced_keys)
@@ -16,11 +16,10 @@ limitations under the License.
 Module which has classes dedicated to identifying the separation between the images within the sequence, which
 is done through identifying the first red frame and first green frame in the image sequence
 """
-from typing import List
-
-import numpy as np
-from scipy.signal import find_peaks
+from typing import List, Iterable, Union
 
+from open_vp_cal.core import constants
+from open_vp_cal.framework.frame import Frame
 from open_vp_cal.imaging import imaging_utils
 from open_vp_cal.led_wall_settings import LedWallSettings
 
@@ -67,19 +66,71 @@ class SeparationResults:
         return self.first_green_frame.frame_num - self.first_red_frame.frame_num
 
 
+class PeakDetector:
+    """
+    Detects the peaks within a series of values as each value is added, giving the same peaks as
+    scipy.signal.find_peaks over all the values added so far, without having to search the whole series each time
+    """
+
+    def __init__(self, height: float = 1):
+        """
+        Initialize an instance of PeakDetector.
+
+        Args:
+            height (float): The minimum height a peak must have
+        """
+        self.height = height
+        self.peaks = []
+        self._count = 0
+        self._previous_value = None
+        self._plateau_start = None
+
+    def add(self, value: float) -> List[int]:
+        """ Adds the next value to the series, a peak is confirmed once the values after it drop below it, with the
+        peak of a flat top being the middle of the flat section
+
+        Args:
+            value: The next value in the series
+
+        Returns: The indices of the peaks found so far
+        """
+        index = self._count
+        self._count += 1
+        previous_value = self._previous_value
+        self._previous_value = value
+        if previous_value is None or value == previous_value:
+            return self.peaks
+
+        if value > previous_value:
+            self._plateau_start = index
+        else:
+            if self._plateau_start is not None and previous_value >= self.height:
+                self.peaks.append((self._plateau_start + index - 1) // 2)
+            self._plateau_start = None
+        return self.peaks
+
+
 class IdentifySeparation:
     """
     The main class which deals with identifying the separation of the patches within the image sequence
     """
 
-    def __init__(self, led_wall_settings: LedWallSettings):
+    def __init__(self, led_wall_settings: LedWallSettings,
+                 coarse_step: int = constants.DEFAULT_SEPARATION_COARSE_STEP, proxy_factor: int = 1):
         """
         Initialize an instance of IdentifySeparation.
 
         Args:
             led_wall_settings (LedWallSettings): The LED wall settings we want to identify the separation
+            coarse_step (int): The number of frames between the frames we sample when locating the first red or green
+                frame, before searching the frames around it one by one. A step of 1 or less searches every frame from
+                the start of the sequence. The step needs to be shorter than a patch so no patch is stepped over
+            proxy_factor (int): The factor to downscale the frames by when computing their mean colours, 1 uses the
+                full resolution frames
         """
         self.led_wall = led_wall_settings
+        self.coarse_step = coarse_step
+        self.proxy_factor = proxy_factor
         self.separation_results = SeparationResults()
 
     def run(self):
@@ -118,21 +169,80 @@ class IdentifySeparation:
 
     def _find_first_red_and_green_frames(self) -> None:
         """
-        Iterates over all frames in the sequence loader, computes the mean colour of each frame, and finds the first
-        frame that is red and the first frame that is green.
+        Finds the first frame that is red and the first frame that is green. We first sample every coarse_step frames
+        to find roughly where the red and green patches begin, and then search the frames from just before that point
+        one by one. If this does not give valid results, we search every frame from the start of the sequence.
+
+        The results are stored in the separation_results attribute.
+        """
+        if self.coarse_step > 1:
+            start_frame = self._find_coarse_start_frame()
+            if start_frame is not None:
+                self._search_frames(self._frames_from(start_frame))
+                if self.separation_results.is_valid:
+                    return
+                self.separation_results = SeparationResults()
+
+        self._search_frames(self.led_wall.sequence_loader)
+
+    def _mean_colour(self, frame: Frame) -> List[float]:
+        """ Computes the mean colour of the roi of the frame, for all the values which are above the initial average
+
+        Args:
+            frame: The frame to compute the mean colour for
+
+        Returns: The mean colour of the frame
+        """
+        image = frame.extract_roi(self.led_wall.roi)
+        mean_color, _ = imaging_utils.get_average_value_above_average(image)
+        return mean_color
+
+    def _frames_from(self, start_frame: int) -> Iterable[Frame]:
+        """ Iterates over the frames of the sequence from the given frame, only loading the roi of each frame, or the
+        proxy of each frame if we have a proxy factor
+
+        Args:
+            start_frame: The first frame to return
+
+        Returns: The frames from the start frame to the end of the sequence
+        """
+        sequence_loader = self.led_wall.sequence_loader
+        for frame_num in range(start_frame, sequence_loader.end_frame + 1):
+            yield sequence_loader.get_frame(frame_num, roi=self.led_wall.roi, proxy_factor=self.proxy_factor)
+
+    def _find_coarse_start_frame(self) -> Union[int, None]:
+        """ Samples every coarse_step frames until we find a red or green frame, and returns the frame we sampled before
+        it, which is the frame we start searching from one frame at a time
+
+        Returns: The frame number to start the search from, or None if no red or green frame was found
+        """
+        sequence_loader = self.led_wall.sequence_loader
+        previous_frame_num = sequence_loader.start_frame
+        for frame_num in range(sequence_loader.start_frame, sequence_loader.end_frame + 1, self.coarse_step):
+            frame = sequence_loader.get_frame(frame_num, roi=self.led_wall.roi, proxy_factor=self.proxy_factor)
+            mean_color = self._mean_colour(frame)
+            if self.check_red(mean_color) or self.check_green(mean_color):
+                return previous_frame_num
+            previous_frame_num = frame_num
+        return None
+
+    def _search_frames(self, frames: Iterable[Frame]) -> None:
+        """
+        Iterates over the given frames, computes the mean colour of each frame, and finds the first frame that is red
+        and the first frame that is green.
 
         The results are stored in the separation_results attribute.
+
+        Args:
+            frames: The frames to search
         """
         frame_numbers = []
-        distances = []
+        peak_detector = PeakDetector(height=1)
 
         previous_mean_frame = None
-        for frame in self.led_wall.sequence_loader:
-            # Load the image from the frame
-            image = frame.extract_roi(self.led_wall.roi)
-
+        for frame in frames:
             # Compute the average for all the values which are above the initial average
-            mean_color, _ = imaging_utils.get_average_value_above_average(image)
+            mean_color = self._mean_colour(frame)
             distance = 0
             if previous_mean_frame:
                 distance = imaging_utils.calculate_distance(
@@ -140,7 +250,7 @@ class IdentifySeparation:
 
             # Store the frame number and distance
             frame_numbers.append(frame.frame_num)
-            distances.append(distance)
+            peaks = peak_detector.add(distance)
             previous_mean_frame = mean_color
 
             # Check if the image is red or we detect a significant change in the mean
@@ -156,8 +266,6 @@ class IdentifySeparation:
                     self.separation_results.first_green_frame = frame
                     continue
 
-            distances_array = np.array(distances)
-            peaks, _ = find_peaks(distances_array, height=1)
             if len(peaks) >= 4:
 
                 first_peak_frame_num = frame_numbers[peaks[0]]
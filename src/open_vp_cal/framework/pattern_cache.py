@@ -0,0 +1,172 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Module contains the classes associated with caching the encoded images of the calibration patterns on disk, keyed on
+a hash of everything which goes into generating each image, so patterns which have not changed are reused when the
+patterns are exported again rather than being generated from scratch
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Iterable, Union
+
+from open_vp_cal.core import constants
+from open_vp_cal.imaging import imaging_utils
+
+
+class PatternCache:
+    """
+    A persistent, content addressed cache of the encoded pattern images. Each image is stored under the hash of the
+    inputs it was generated from, so a change to any of those inputs simply results in a different key, and entries
+    never need to be invalidated. Entries which are no longer part of the export are pruned once the cache exceeds
+    its size budget, least recently used first
+    """
+
+    def __init__(self, folder_path: str, max_bytes: Union[int, None] = None):
+        """ Initializes a PatternCache instance.
+
+        Args:
+            folder_path: The folder the cached images are stored in
+            max_bytes: The maximum number of bytes the cached images can take up, if None we use the default
+                cache size
+        """
+        if max_bytes is None:
+            max_bytes = self.default_max_bytes()
+
+        self.folder_path = folder_path
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def default_max_bytes() -> int:
+        """ Returns the default size of the cache in bytes, which can be overridden by setting the
+            OPEN_VP_CAL_PATTERN_CACHE_MB environment variable
+
+        Returns: The default size of the cache in bytes
+
+        """
+        cache_size_mb = os.environ.get(
+            constants.OPEN_VP_CAL_PATTERN_CACHE_MB, constants.DEFAULT_PATTERN_CACHE_SIZE_MB
+        )
+        return int(float(cache_size_mb) * 1024 * 1024)
+
+    @staticmethod
+    def enabled() -> bool:
+        """ Returns whether the pattern images are cached, which can be disabled by setting the
+            OPEN_VP_CAL_PATTERN_CACHE environment variable to 0
+
+        Returns: True if the pattern images should be read from and written to the cache
+        """
+        return os.environ.get(constants.OPEN_VP_CAL_PATTERN_CACHE, "1") != "0"
+
+    @staticmethod
+    def key(inputs: dict) -> str:
+        """ Returns the key for the image generated from the given inputs
+
+        Args:
+            inputs: Everything which affects the encoded image, which must be serializable to JSON
+
+        Returns: The hash of the inputs
+        """
+        inputs = dict(inputs, cache_version=constants.PATTERN_CACHE_VERSION)
+        serialized = json.dumps(inputs, sort_keys=True, default=PatternCache._serialize_value)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _serialize_value(value):
+        """ Serializes the values JSON does not support natively, such as numpy arrays and scalars, exactly
+
+        Args:
+            value: The value to serialize
+
+        Returns: The value converted to a type JSON supports
+        """
+        if hasattr(value, "tolist"):
+            return value.tolist()
+        return str(value)
+
+    def file_path(self, key: str, file_format: str) -> str:
+        """ Returns the path the image with the given key is cached at
+
+        Args:
+            key: The key of the image
+            file_format: The file format of the image
+
+        Returns: The path of the cached image
+        """
+        return os.path.join(self.folder_path, f"{key}.{file_format}")
+
+    def get(self, key: str, file_format: str) -> Union[str, None]:
+        """ Returns the path of the cached image with the given key
+
+        Args:
+            key: The key of the image
+            file_format: The file format of the image
+
+        Returns: The path of the cached image, or None if the image is not cached
+        """
+        file_path = self.file_path(key, file_format)
+        try:
+            # Mark the entry as recently used, so it is the last to be pruned
+            os.utime(file_path)
+        except OSError:
+            return None
+        return file_path
+
+    def store(self, key: str, file_path: str, file_format: str) -> None:
+        """ Stores the written image in the cache, linking it rather than copying it where possible. Failing to store
+            the image, for example on a read only share, is not an error
+
+        Args:
+            key: The key of the image
+            file_path: The path of the written image
+            file_format: The file format of the image
+        """
+        cache_file_path = self.file_path(key, file_format)
+        temp_file_path = f"{cache_file_path}.{threading.get_ident()}.tmp.{file_format}"
+        try:
+            os.makedirs(self.folder_path, exist_ok=True)
+            imaging_utils.link_image(file_path, temp_file_path)
+            os.replace(temp_file_path, cache_file_path)
+        except OSError:
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+
+    def prune(self, referenced_keys: Iterable[str]) -> None:
+        """ Removes the least recently used entries which are not referenced by the current export, until the cache
+            is within its size budget. Referenced entries are never removed, they are linked to the exported frames
+            so take up no more space than the export itself. Failing to remove an entry is not an error
+
+        Args:
+            referenced_keys: The keys of the images of the current export
+        """
+        referenced_keys = set(referenced_keys)
+        try:
+            with os.scandir(self.folder_path) as entries:
+                files = [(entry.stat(), entry.name, entry.path) for entry in entries if entry.is_file()]
+        except OSError:
+            return
+
+        total_bytes = sum(stat.st_size for stat, _, _ in files)
+        for stat, name, path in sorted(files, key=lambda file: file[0].st_mtime_ns):
+            if total_bytes <= self.max_bytes:
+                break
+            if name.split(".", 1)[0] in referenced_keys:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= stat.st_size
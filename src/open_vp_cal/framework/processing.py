@@ -27,7 +27,7 @@ from colour import RGB_Colourspace
 import open_vp_cal.framework.utils as framework_utils
 from open_vp_cal.core import calibrate, constants, utils, ocio_utils, ocio_config
 from open_vp_cal.imaging import macbeth, imaging_utils
-from open_vp_cal.core.constants import DEFAULT_PROJECT_SETTINGS_NAME, Results
+from open_vp_cal.core.constants import DEFAULT_PROJECT_SETTINGS_NAME, Results, CalibrationStage
 from open_vp_cal.core.resource_loader import ResourceLoader
 from open_vp_cal.core.structures import ProcessingResults
 from open_vp_cal.framework.generation import PatchGeneration
@@ -109,10 +109,14 @@ class Processing:
         self._reference_samples[constants.Measurements.PRIMARIES_SATURATION] = self.led_wall.primaries_saturation
         return self._samples, self._reference_samples
 
-    def run_sampling(self):
+    def run_sampling(self, generate_swatches: bool = True):
         """ Runs the sampling process to extract the samples form the image sequences,
         and generates the reference swatches from the results
 
+        Args:
+            generate_swatches: Whether to generate the sample swatches once sampled. The swatches write the
+                pre-calibration ocio config into the export folder, which is shared between the walls, so when sampling
+                walls concurrently the swatches are generated afterwards via generate_sample_swatches
         """
 
         self.identify_separation()
@@ -153,7 +157,8 @@ class Processing:
         results.sample_reference_buffers = self._reference_frames
 
         self.led_wall.processing_results = results
-        self.generate_sample_swatches()
+        if generate_swatches:
+            self.generate_sample_swatches()
 
     def analyse(self):
         """
@@ -243,7 +248,7 @@ class Processing:
             decoupled_lens_white_samples = imaging_utils.get_decoupled_white_samples_from_file(
                 self.led_wall.white_point_offset_source)
 
-        calibration_results = calibrate.run(
+        calibration_parameters = dict(
             measured_samples=self.led_wall.processing_results.samples,
             reference_samples=self.led_wall.processing_results.reference_samples,
             input_plate_gamut=self.led_wall.input_plate_gamut,
@@ -262,27 +267,45 @@ class Processing:
             avoid_clipping=self.led_wall.avoid_clipping
         )
 
-        self.led_wall.processing_results.calibration_results = calibration_results
-
-        # We export and store the results of this in a temporary location, so we can use it for previewing the results
-        temp_dir = tempfile.mkdtemp()
+        # Only the stages of the calibration downstream of the settings which changed since the last calibration of
+        # these samples are recomputed
+        processing_results = self.led_wall.processing_results
+        calibration_results, stages = calibrate.recalibrate(
+            calibration_parameters, previous_parameters=processing_results.calibration_parameters,
+            previous_results=processing_results.calibration_results
+        )
+        processing_results.calibration_results = calibration_results
+        processing_results.calibration_parameters = calibration_parameters
+
+        # We export and store the results of this in a temporary location, so we can use it for previewing the results.
+        # The location is kept between calibrations, so only the artifacts of the recomputed stages are rewritten
+        if not processing_results.preview_export_folder:
+            processing_results.preview_export_folder = tempfile.mkdtemp()
+            stages = CalibrationStage.ALL
         self._export_calibration(
-            temp_dir, [self.led_wall], ResourceLoader.ocio_config_path()
+            processing_results.preview_export_folder, [self.led_wall], ResourceLoader.ocio_config_path(),
+            stages=stages, bake_luts=False
         )
-        return self.led_wall.processing_results
+        return processing_results
 
     @staticmethod
     def _export_calibration(
             output_folder: str, led_walls: List[LedWallSettings],
             base_ocio_config: str, export_filter: bool = True,
             export_lut_for_aces_cct: bool = False,
-            export_lut_for_aces_cct_in_target_out: bool = False) -> List[LedWallSettings]:
+            export_lut_for_aces_cct_in_target_out: bool = False,
+            stages: Union[List[str], None] = None, bake_luts: bool = True) -> List[LedWallSettings]:
         """ Runs the export process to generate the OCIO configuration files, CLF and luts
 
         Args:
             output_folder: The folder to export into
             led_walls: The LED walls to export
             base_ocio_config: The base OCIO config to use for the ocio config export
+            stages: The calibration stages which were recomputed since the last export into the output folder, the
+                sample and calibration results files and the EOTF LUTs are only rewritten if the stages they depend on
+                were recomputed. By default, everything is exported
+            bake_luts: Whether to bake the 3D LUTs of the calibration, which is not needed to preview the calibration
+                through the OCIO config
 
         Returns: The LED walls with the export results stored in the wall processing results
         """
@@ -301,27 +324,33 @@ class Processing:
             calibration_folder, ocio_config.OcioConfigWriter.post_calibration_config_name
         )
 
-        ocio_config_writer = ocio_config.OcioConfigWriter(calibration_folder)
+        if stages is None:
+            stages = CalibrationStage.ALL
+
+        ocio_config_writer = ocio_config.OcioConfigWriter(
+            calibration_folder, write_eotf_luts=CalibrationStage.EOTF_LUT in stages
+        )
         for led_wall in led_walls:
             samples_output_folder = os.path.join(
                 results_folder, f"{led_wall.name}_samples.json"
             )
-            with open(samples_output_folder, "w", encoding="utf-8") as handle:
-                json.dump(led_wall.processing_results.samples, handle, indent=4)
-
             reference_samples_output_folder = os.path.join(
                 results_folder, f"{led_wall.name}_reference_samples.json"
             )
+            if CalibrationStage.WHITE_BALANCE in stages or not os.path.exists(samples_output_folder):
+                with open(samples_output_folder, "w", encoding="utf-8") as handle:
+                    json.dump(led_wall.processing_results.samples, handle, indent=4)
 
-            with open(reference_samples_output_folder, "w", encoding="utf-8") as handle:
-                json.dump(led_wall.processing_results.reference_samples, handle, indent=4)
+                with open(reference_samples_output_folder, "w", encoding="utf-8") as handle:
+                    json.dump(led_wall.processing_results.reference_samples, handle, indent=4)
 
             calibration_results_file = os.path.join(
                 results_folder,
                 led_wall.name + "_calibration_results.json"
             )
-            with open(calibration_results_file, "w", encoding="utf-8") as handle:
-                json.dump(led_wall.processing_results.calibration_results, handle, indent=4)
+            if CalibrationStage.EXPORT in stages or not os.path.exists(calibration_results_file):
+                with open(calibration_results_file, "w", encoding="utf-8") as handle:
+                    json.dump(led_wall.processing_results.calibration_results, handle, indent=4)
 
             led_wall.processing_results.calibration_results_file = calibration_results_file
 
@@ -330,12 +359,19 @@ class Processing:
             led_walls, output_file=ocio_config_output_file, base_ocio_config=base_ocio_config,
             preview_export_filter=export_filter, export_lut_for_aces_cct=do_aces_cct_ocio_export
         )
+        if CalibrationStage.EOTF_LUT in stages:
+            # The EOTF LUTs are rewritten in place under the same names, so nothing can be left holding the old LUTs
+            ocio_utils.OcioProcessorCache.evict(ocio_config_output_file)
 
         for led_wall in led_walls:
             if led_wall.is_verification_wall:
                 continue
 
             led_wall.processing_results.ocio_config_output_file = ocio_config_output_file
+            if not bake_luts:
+                led_wall.processing_results.lut_output_file = None
+                continue
+
             if led_wall.calculation_order == constants.CalculationOrder.CO_CS_EOTF:
                 calc_order_string = constants.CalculationOrder.CO_CS_EOTF_STRING
             else:
@@ -570,22 +606,17 @@ class Processing:
             [led_wall_for_ocio_generation]
         )
 
-        converted_sample_buffers = []
-        for img_buf in self.led_wall.processing_results.sample_buffers:
-            output_img_buf = imaging_utils.apply_color_conversion(
-                img_buf, str(input_gamut), working_gamut,
-                color_config=generation_ocio_config_path
-            )
-            converted_sample_buffers.append(output_img_buf)
-
-        converted_reference_buffers = []
+        # The swatches are solid colours, so each set is converted in a single batch
+        converted_sample_buffers = imaging_utils.apply_color_conversion_to_buffers(
+            self.led_wall.processing_results.sample_buffers, str(input_gamut), working_gamut,
+            color_config=generation_ocio_config_path
+        )
 
         target_gamut_only_cs_name, _ = ocio_config_writer.target_gamut_only_cs_metadata(self.led_wall)
-        for img_buf in self.led_wall.processing_results.sample_reference_buffers:
-            output_img_buf = imaging_utils.apply_color_conversion(
-                img_buf, target_gamut_only_cs_name, working_gamut,
-                color_config=generation_ocio_config_path)
-            converted_reference_buffers.append(output_img_buf)
+        converted_reference_buffers = imaging_utils.apply_color_conversion_to_buffers(
+            self.led_wall.processing_results.sample_reference_buffers, target_gamut_only_cs_name, working_gamut,
+            color_config=generation_ocio_config_path
+        )
 
         self.led_wall.processing_results.sample_buffers = converted_sample_buffers
         self.led_wall.processing_results.sample_reference_buffers = converted_reference_buffers
@@ -0,0 +1,217 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Module contains the executors which the patch samplers use to run their work concurrently. The default executor runs
+the work on a bounded pool of threads, the process executor additionally computes the sample values of the image
+sections in a pool of processes, transferring the pixels to them via shared memory
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Iterable, List, Tuple, Union
+
+import numpy as np
+
+from open_vp_cal.core import constants
+from open_vp_cal.imaging import imaging_utils
+
+
+def _sample_shared_memory(name: str, shape: Tuple[int, ...]) -> List[float]:
+    """ Samples the pixels stored in the shared memory block with the given name, run within the worker processes
+
+    Args:
+        name: The name of the shared memory block holding the float pixels
+        shape: The shape of the pixel array within the block
+
+    Returns: The sampled RGB values of the pixels
+    """
+    shared_memory = SharedMemory(name=name)
+    try:
+        pixels = np.ndarray(shape, dtype=np.float32, buffer=shared_memory.buf)
+        result = imaging_utils.sample_np_array(pixels)
+        # The array has to be released before the block can be closed
+        del pixels
+        return result
+    finally:
+        shared_memory.close()
+
+
+class SampleExecutor:
+    """
+    Runs the sampling of the patches on a pool of threads which is shared between all the samplers. The pool is bound
+    to a maximum number of workers, so the number of patches, and therefore frames, in flight is predictable regardless
+    of the number of patches or walls being sampled
+    """
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = constants.SAMPLING_MAX_WORKERS):
+        """ Initializes a SampleExecutor instance.
+
+        Args:
+            max_workers: The maximum number of threads used to sample the patches
+        """
+        self._max_workers = max_workers
+        self._thread_pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self) -> int:
+        """
+        Property for the maximum number of workers.
+        """
+        return self._max_workers
+
+    @classmethod
+    def default(cls) -> "SampleExecutor":
+        """ Returns the executor the samplers use when one is not given to them. The executor is created on first use,
+            setting the OPEN_VP_CAL_SAMPLE_EXECUTOR environment variable to "process" creates a ProcessSampleExecutor
+
+        Returns: The shared default executor
+        """
+        with cls._default_lock:
+            if SampleExecutor._default is None:
+                executor_type = os.environ.get(constants.OPEN_VP_CAL_SAMPLE_EXECUTOR, constants.SAMPLE_EXECUTOR_THREAD)
+                if executor_type == constants.SAMPLE_EXECUTOR_PROCESS:
+                    SampleExecutor._default = ProcessSampleExecutor()
+                else:
+                    SampleExecutor._default = SampleExecutor()
+            return SampleExecutor._default
+
+    @classmethod
+    def set_default(cls, executor: Union["SampleExecutor", None]) -> None:
+        """ Sets the executor the samplers use when one is not given to them, shutting down the previous default
+
+        Args:
+            executor: The executor to use, or None to recreate the default on next use
+        """
+        with cls._default_lock:
+            previous = SampleExecutor._default
+            SampleExecutor._default = executor
+        if previous is not None and previous is not executor:
+            previous.shutdown()
+
+    def thread_pool(self) -> ThreadPoolExecutor:
+        """ Returns the pool of threads the work is submitted to, the pool is created on first use
+
+        Returns: The pool of threads
+        """
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="SamplePatch"
+                )
+            return self._thread_pool
+
+    def map(self, function: Callable, *iterables: Iterable) -> list:
+        """ Runs the function for each of the items in the given iterables on the pool of threads.
+
+        The function must not itself call map on the same executor, as it would wait on workers of the same pool
+
+        Args:
+            function: The function to run
+            *iterables: The arguments to call the function with
+
+        Returns: The results of the function, in the order of the arguments
+        """
+        futures = [self.thread_pool().submit(function, *args) for args in zip(*iterables)]
+        return [future.result() for future in futures]
+
+    def sample_sections(self, sections: List["Oiio.ImageBuf"]) -> List[List[float]]:
+        """ Samples each of the given image sections, returning the clipped mean RGB values of each
+
+        Args:
+            sections: The image sections to sample
+
+        Returns: The sampled RGB values for each of the sections
+        """
+        return [imaging_utils.sample_image(section) for section in sections]
+
+    def shutdown(self) -> None:
+        """ Shuts down the pools of the executor, waiting for any running work to finish
+        """
+        with self._lock:
+            thread_pool, self._thread_pool = self._thread_pool, None
+        if thread_pool is not None:
+            thread_pool.shutdown()
+
+
+class ProcessSampleExecutor(SampleExecutor):
+    """
+    An executor which, in addition to the pool of threads which load the frames, computes the sample values in a pool
+    of processes so the statistics are not bound by the GIL. The pixels of each section are copied once into a shared
+    memory block which the worker process reads directly, rather than being pickled
+    """
+    def __init__(self, max_workers: int = constants.SAMPLING_MAX_WORKERS,
+                 max_processes: Union[int, None] = None):
+        """ Initializes a ProcessSampleExecutor instance.
+
+        Args:
+            max_workers: The maximum number of threads used to load and sample the patches
+            max_processes: The maximum number of processes used to compute the samples, defaults to the cpu count
+        """
+        super().__init__(max_workers=max_workers)
+        self._max_processes = max_processes
+        self._process_pool = None
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        """ Returns the pool of processes the samples are computed in, the pool is created on first use. The processes
+            are spawned rather than forked, as the parent process has threads running which forking is not safe with
+
+        Returns: The pool of processes
+        """
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self._max_processes, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._process_pool
+
+    def sample_sections(self, sections: List["Oiio.ImageBuf"]) -> List[List[float]]:
+        """ Samples each of the given image sections in the pool of processes, returning the clipped mean RGB values
+            of each
+
+        Args:
+            sections: The image sections to sample
+
+        Returns: The sampled RGB values for each of the sections
+        """
+        blocks = []
+        try:
+            futures = []
+            for section in sections:
+                pixels = imaging_utils.image_buf_to_np_array(section)
+                block = SharedMemory(create=True, size=max(pixels.nbytes, 1))
+                blocks.append(block)
+                shared_pixels = np.ndarray(pixels.shape, dtype=np.float32, buffer=block.buf)
+                shared_pixels[:] = pixels
+                del shared_pixels
+                futures.append(self.process_pool().submit(_sample_shared_memory, block.name, pixels.shape))
+            return [future.result() for future in futures]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def shutdown(self) -> None:
+        """ Shuts down the pools of the executor, waiting for any running work to finish
+        """
+        super().shutdown()
+        with self._lock:
+            process_pool, self._process_pool = self._process_pool, None
+        if process_pool is not None:
+            process_pool.shutdown()
@@ -15,18 +15,120 @@ limitations under the License.
 
 Module that contains classes who are responsible for sampling and analysing the patches in the image sequence
 """
-import threading
+import os
+from typing import List, Union
+
+import cv2
 import numpy as np
+from colour.utilities import Structure
 from colour_checker_detection.detection.segmentation import \
-    detect_colour_checkers_segmentation
+    detect_colour_checkers_segmentation, colour_checkers_coordinates_segmentation, adjust_image, \
+    crop_and_level_image_with_rectangle, swatch_masks, SETTINGS_SEGMENTATION_COLORCHECKER_CLASSIC
 
 from open_vp_cal.imaging import imaging_utils
 from open_vp_cal.core.structures import SamplePatchResults
+from open_vp_cal.framework.frame import Frame, FrameDescriptor
 from open_vp_cal.framework.identify_separation import SeparationResults
+from open_vp_cal.framework.sample_executor import SampleExecutor
 from open_vp_cal.led_wall_settings import LedWallSettings
 from open_vp_cal.core import constants
 
 
+class TemporalStack:
+    """
+    Accumulates the pixels of the frames of a patch into a running per pixel mean and sum of squared differences,
+    using Welford's algorithm, so the frames can be streamed through rather than held while the patch is sampled
+    """
+
+    def __init__(self):
+        """ Initializes an empty TemporalStack instance.
+        """
+        self._count = 0
+        self._mean = None
+        self._sum_squares = None
+
+    @property
+    def count(self) -> int:
+        """
+        Property for the number of frames which have been added.
+        """
+        return self._count
+
+    @property
+    def mean(self) -> Union[np.ndarray, None]:
+        """
+        Property for the per pixel mean of the frames which have been added.
+        """
+        return self._mean
+
+    @property
+    def variance(self) -> Union[np.ndarray, None]:
+        """
+        Property for the per pixel variance over time of the frames which have been added.
+        """
+        if not self._count:
+            return None
+        return self._sum_squares / self._count
+
+    def add(self, pixels: np.ndarray) -> None:
+        """ Adds the pixels of a frame to the stack
+
+        Args:
+            pixels: The pixels of the frame, which must be the same shape as any previously added
+        """
+        self._count += 1
+        if self._mean is None:
+            self._mean = np.array(pixels, dtype=np.float64)
+            self._sum_squares = np.zeros_like(self._mean)
+            return
+
+        if pixels.shape != self._mean.shape:
+            raise ValueError(f"Frame shape {pixels.shape} does not match the stack shape {self._mean.shape}")
+
+        delta = pixels - self._mean
+        self._mean += delta / self._count
+        delta *= pixels - self._mean
+        self._sum_squares += delta
+
+    def pooled_mean_and_std(self) -> tuple[np.ndarray, np.ndarray]:
+        """ Computes the mean and standard deviation of each channel over every pixel of every frame of the stack,
+            combining the per pixel means and sums of squared differences, so the frames are not needed
+
+        Returns: The mean and the standard deviation of the red, green and blue channels of the pooled stack
+        """
+        if self._mean is None:
+            raise ValueError("No frames have been added to the stack")
+
+        pixel_means = self._mean.reshape(-1, 3)
+        pooled_mean = pixel_means.mean(axis=0)
+        # The variance of the pooled stack is the mean variance over time of each pixel, plus the variance of the
+        # per pixel means across the image
+        pooled_variance = (self._sum_squares.reshape(-1, 3).mean(axis=0) / self._count
+                           + np.mean((pixel_means - pooled_mean) ** 2, axis=0))
+        return pooled_mean, np.sqrt(pooled_variance)
+
+    def sample(self, sigma: int = 3) -> List[float]:
+        """ Computes the clipped mean RGB values over the whole temporal stack.
+
+            The clipping bounds are derived from the mean and standard deviation of the pooled stack, which include
+            the noise of the frames over time, and the pixels whose mean over time falls outside them are rejected.
+            This rejects the stuck and hot pixels, without clipping the per pixel means against their own spread,
+            which averaging the frames narrows, and which would reject valid pixels as the number of frames grows
+
+        Args:
+            sigma: the multiplier for the standard deviation for the clipping
+
+        Returns: The mean RGB values of the per pixel means of the frames, within the clipping bounds
+        """
+        pooled_mean, pooled_std = self.pooled_mean_and_std()
+        pixel_means = self._mean.reshape(-1, 3)
+        mask = pixel_means >= pooled_mean - sigma * pooled_std
+        mask &= pixel_means <= pooled_mean + sigma * pooled_std
+        with np.errstate(invalid="ignore", divide="ignore"):
+            clipped_means = np.sum(pixel_means, axis=0, where=mask) / np.count_nonzero(mask, axis=0)
+        return clipped_means.tolist()
+
+
 class BaseSamplePatch:
     """
     Base class for sampling a patch, contains functions for identifying a given patch within a sequence and the
@@ -35,12 +137,22 @@ class BaseSamplePatch:
 
     def __init__(self, led_wall_settings: LedWallSettings,
                  separation_results: SeparationResults,
-                 patch: str):
+                 patch: str, executor: Union[SampleExecutor, None] = None):
         self.led_wall = led_wall_settings
         self.separation_results = separation_results
         self.patch = patch
         self.trim_frames = 1  # The num frames we trim from the start and end of the patch, so we avoid multiplexing
         self.required_sample_frames = 3
+        self._executor = executor
+
+    @property
+    def executor(self) -> SampleExecutor:
+        """
+        Property for the executor the sampling is run on, defaults to the shared SampleExecutor.
+        """
+        if self._executor is None:
+            return SampleExecutor.default()
+        return self._executor
 
     def get_num_patches_relative_to_red(self, red_patch_index) -> int:
         """ Returns the number of patches relative to the red patch index, accounting
@@ -81,6 +193,20 @@ class BaseSamplePatch:
             self.trim_frames = trim_frames
         return first_patch_frame, last_patch_frame
 
+    def _frame_descriptor(self, frame: Frame, samples: Union[List[float], None] = None) -> FrameDescriptor:
+        """ Returns the descriptor of a sampled frame, which we store in the results in place of the frame so the
+            decoded pixels are not kept alive by the results
+
+        Args:
+            frame: The frame which was sampled
+            samples: The sampled RGB values of the region of interest of the frame
+
+        Returns: The descriptor of the frame
+        """
+        return FrameDescriptor.from_frame(
+            frame, self.led_wall.sequence_loader.folder_path, roi=self.led_wall.roi, samples=samples
+        )
+
 
 class SamplePatch(BaseSamplePatch):
     """
@@ -89,7 +215,8 @@ class SamplePatch(BaseSamplePatch):
 
     def __init__(self, led_wall_settings: LedWallSettings,
                  separation_results: SeparationResults,
-                 patch: str):
+                 patch: str, executor: Union[SampleExecutor, None] = None,
+                 temporal_stack: Union[bool, None] = None):
         """
         Initialize an instance of SamplePatch.
 
@@ -97,9 +224,24 @@ class SamplePatch(BaseSamplePatch):
             led_wall_settings (LedWallSettings): The LED wall settings we want to sample
             separation_results (SeparationResults): The results of the separation.
             patch (str): The patch to sample.
+            executor (SampleExecutor): The executor to run the sampling on, defaults to the shared executor
+            temporal_stack (bool): Whether to sample the per pixel mean of all the frames of the patch, rather than
+                averaging the samples of each frame, defaults to temporal_stack_enabled
         """
-        super().__init__(led_wall_settings, separation_results, patch)
+        super().__init__(led_wall_settings, separation_results, patch, executor=executor)
         self.sample_results = [None]
+        if temporal_stack is None:
+            temporal_stack = self.temporal_stack_enabled()
+        self.temporal_stack = temporal_stack
+
+    @staticmethod
+    def temporal_stack_enabled() -> bool:
+        """ Returns whether the patches are sampled over the temporal stack of their frames by default. Enabled by
+            setting the OPEN_VP_CAL_TEMPORAL_SAMPLING environment variable to 1
+
+        Returns: True if the patches should be sampled over the temporal stack
+        """
+        return os.environ.get(constants.OPEN_VP_CAL_TEMPORAL_SAMPLING, "0") == "1"
 
     def run(self) -> list:
         """
@@ -136,20 +278,50 @@ class SamplePatch(BaseSamplePatch):
             None
         """
         # We trim a number of frames off either side of the patch to ensure we remove multiplexing
+        if self.temporal_stack:
+            results[idx] = self.analyse_patch_frames_temporal(first_patch_frame, last_patch_frame)
+            return
+
         sample_results = SamplePatchResults()
-        samples = []
+        frames = []
+        sections = []
         for frame_num in range(first_patch_frame + self.trim_frames,
                                (last_patch_frame - self.trim_frames) + 1):
-            frame = self.led_wall.sequence_loader.get_frame(frame_num)
-            section = frame.extract_roi(self.led_wall.roi)
-            mean_color = imaging_utils.sample_image(section)
-
-            samples.append(mean_color)
-            sample_results.frames.append(frame)
+            frame = self.led_wall.sequence_loader.get_frame(frame_num, roi=self.led_wall.roi)
+            sections.append(frame.extract_roi(self.led_wall.roi))
+            frames.append(frame)
+
+        samples = self.executor.sample_sections(sections)
+        sample_results.frames = [
+            self._frame_descriptor(frame, samples=frame_samples) for frame, frame_samples in zip(frames, samples)
+        ]
         sample_results.samples = [sum(channel) / len(channel) for channel in
                                   zip(*samples)]
         results[idx] = sample_results
 
+    def analyse_patch_frames_temporal(self, first_patch_frame: int, last_patch_frame: int) -> SamplePatchResults:
+        """
+        Analyse the frames of the patch as a single temporal stack. The region of interest of each frame is added to
+        a running per pixel mean and the clipped mean is computed once over the result, so the frames are not kept
+        once they have been added.
+
+        Args:
+            first_patch_frame (int): The first frame of the patch.
+            last_patch_frame (int): The last frame of the patch.
+        Returns:
+            SamplePatchResults: The results of the patch sampling.
+        """
+        stack = TemporalStack()
+        sample_results = SamplePatchResults()
+        for frame_num in range(first_patch_frame + self.trim_frames,
+                               (last_patch_frame - self.trim_frames) + 1):
+            frame = self.led_wall.sequence_loader.get_frame(frame_num, roi=self.led_wall.roi)
+            stack.add(imaging_utils.image_buf_to_np_array(frame.extract_roi(self.led_wall.roi))[:, :, :3])
+            sample_results.frames.append(self._frame_descriptor(frame))
+
+        sample_results.samples = stack.sample()
+        return sample_results
+
 
 class SampleRampPatches(SamplePatch):
     """
@@ -158,7 +330,8 @@ class SampleRampPatches(SamplePatch):
 
     def __init__(self, led_wall_settings: LedWallSettings,
                  separation_results: SeparationResults,
-                 patch: str):
+                 patch: str, executor: Union[SampleExecutor, None] = None,
+                 temporal_stack: Union[bool, None] = None):
         """
         Initialize an instance of SampleRampPatches.
 
@@ -167,8 +340,11 @@ class SampleRampPatches(SamplePatch):
             project_settings (ProjectSettings): The settings for the project.
             separation_results (SeparationResults): The results of the separation.
             patch (str): The patch to sample.
+            executor (SampleExecutor): The executor to run the sampling on, defaults to the shared executor
+            temporal_stack (bool): Whether to sample the per pixel mean of all the frames of each patch
         """
-        super().__init__(led_wall_settings, separation_results, patch)
+        super().__init__(led_wall_settings, separation_results, patch, executor=executor,
+                         temporal_stack=temporal_stack)
         self.patch = constants.PATCHES.EOTF_RAMPS
         self.sample_results = []
 
@@ -184,22 +360,19 @@ class SampleRampPatches(SamplePatch):
 
         # We have x number of grey patches and one black frame at the beginning of the ramp
         grey_patches = self.led_wall.num_grey_patches + 1
-        threads = []
         results = [None] * grey_patches
-        for patch_count in range(0, grey_patches):
-            patch_start_frame = first_patch_frame + (
-                        patch_count * self.separation_results.separation)
-            patch_last_frame = patch_start_frame + (
-                        self.separation_results.separation - 1)
-
-            thread = threading.Thread(target=self.analyse_patch_frames, args=(
-                patch_count, results, patch_start_frame, patch_last_frame)
-                                      )
-            thread.start()
-            threads.append(thread)
-
-        for thread in threads:
-            thread.join()
+        patch_counts = range(0, grey_patches)
+        patch_start_frames = [
+            first_patch_frame + (patch_count * self.separation_results.separation) for patch_count in patch_counts
+        ]
+        patch_last_frames = [
+            patch_start_frame + (self.separation_results.separation - 1) for patch_start_frame in patch_start_frames
+        ]
+
+        # Each patch is analysed on the bounded pool of the executor, rather than a thread per patch
+        self.executor.map(
+            self.analyse_patch_frames, patch_counts, [results] * grey_patches, patch_start_frames, patch_last_frames
+        )
         self.sample_results = results
 
 
@@ -209,17 +382,22 @@ class MacBethSample(BaseSamplePatch):
     """
 
     def __init__(self, led_wall_settings: LedWallSettings,
-                 separation_results: SeparationResults):
+                 separation_results: SeparationResults, executor: Union[SampleExecutor, None] = None,
+                 batched_detection: bool = True):
         """
         Initialize an instance of SamplePatch.
 
         Args:
             led_wall_settings (LedWallSettings): The LED wall settings we want to sample
             separation_results (SeparationResults): The results of the separation.
+            executor (SampleExecutor): The executor to run the sampling on, defaults to the shared executor
+            batched_detection (bool): Whether to detect the chart once on the mean of the frames of the patch,
+                falling back to detecting the chart in every frame if no chart is found
         """
         super().__init__(led_wall_settings, separation_results,
-                         constants.PATCHES.MACBETH)
+                         constants.PATCHES.MACBETH, executor=executor)
         self.sample_results = [None]
+        self.batched_detection = batched_detection
 
     def run(self) -> list:
         """
@@ -238,19 +416,18 @@ class MacBethSample(BaseSamplePatch):
         first_patch_frame, last_patch_frame = self.calculate_first_and_last_patch_frame()
         # We trim a number of frames off either side of the patch to ensure we remove multiplexing
         sample_results = SamplePatchResults()
+        frame_nums = range(first_patch_frame + self.trim_frames, (last_patch_frame - self.trim_frames) + 1)
+
         samples = []
-        for frame_num in range(first_patch_frame + self.trim_frames,
-                               (last_patch_frame - self.trim_frames) + 1):
-            frame = self.led_wall.sequence_loader.get_frame(frame_num)
-            section = frame.extract_roi(self.led_wall.roi)
-            sample_results.frames.append(frame)
-            section_np_array = imaging_utils.image_buf_to_np_array(section)
-            for colour_checker_swatches_data in detect_colour_checkers_segmentation(
-                    section_np_array, additional_data=True):
-                swatch_colours, _, _ = (
-                    colour_checker_swatches_data.values)
+        if self.batched_detection:
+            samples = self._detect_swatch_colours_batched(frame_nums, sample_results)
 
-                samples.append(swatch_colours)
+        if not samples:
+            # The detection of each frame is independent, so we detect the charts of the frames on the executor
+            frames = self.executor.map(self._load_frame, frame_nums)
+            for frame_samples in self.executor.map(self._detect_swatch_colours, frames):
+                samples.extend(frame_samples)
+            sample_results.frames = [self._frame_descriptor(frame) for frame in frames]
 
         # Compute the mean for each tuple index across all tuples, if the detection fails and we get nans, then we
         # replace the nans with black patches as these are not used in the calibration directly
@@ -261,3 +438,159 @@ class MacBethSample(BaseSamplePatch):
             list_of_zeros = [[0.0, 0.0, 0.0] for _ in range(24)]
             sample_results.samples = list_of_zeros
         self.sample_results = [sample_results]
+
+    def _load_frame(self, frame_num: int) -> Frame:
+        """ Loads the region of interest of the given frame
+
+        Args:
+            frame_num: The frame number to load
+
+        Returns: The loaded frame
+        """
+        return self.led_wall.sequence_loader.get_frame(frame_num, roi=self.led_wall.roi)
+
+    def _detect_swatch_colours_batched(self, frame_nums: range, sample_results: SamplePatchResults) -> list:
+        """ Detects the macbeth charts once within the mean of the regions of interest of all the frames, which is
+            far cheaper than segmenting every frame, and denoises the image we detect in.
+
+            The frames are streamed into the mean one at a time, the sequence loader reading ahead of us. The chart is
+            levelled and its swatches averaged by linear operations, so the swatch colours of the mean of the frames
+            are the mean of the swatch colours of each frame, for the same chart geometry. As the chart could have
+            moved during the patch, the geometry is only accepted if the swatch colours agree with those detected in
+            the middle frame of the patch
+
+        Args:
+            frame_nums: The frame numbers of the patch
+            sample_results: The results we add the descriptors of the frames to
+
+        Returns: The swatch colours for each of the charts detected, or an empty list if no chart was found, or the
+            swatch colours were not valid
+        """
+        stack = TemporalStack()
+        frame_descriptors = []
+        reference_frame = None
+        for index, frame_num in enumerate(frame_nums):
+            frame = self._load_frame(frame_num)
+            stack.add(imaging_utils.image_buf_to_np_array(frame.extract_roi(self.led_wall.roi))[:, :, :3])
+            frame_descriptors.append(self._frame_descriptor(frame))
+            if index == len(frame_nums) // 2:
+                reference_frame = frame
+
+        if not stack.count:
+            return []
+
+        samples = self._detect_swatch_colours_in_mean(stack.mean.astype(np.float32))
+        if not samples or not np.isfinite(np.array(samples)).all():
+            return []
+
+        if not self._swatch_colours_match(samples, self._detect_swatch_colours(reference_frame)):
+            return []
+
+        sample_results.frames = frame_descriptors
+        return samples
+
+    @staticmethod
+    def _swatch_colours_match(samples: list, reference_samples: list) -> bool:
+        """ Checks the swatch colours detected in the mean of the frames against those detected in a single frame,
+            so a chart which moved during the patch, or was detected in a different place, is not accepted
+
+        Args:
+            samples: The swatch colours for each of the charts detected in the mean of the frames
+            reference_samples: The swatch colours for each of the charts detected in a single frame
+
+        Returns: True if the same number of charts were detected, and their swatch colours agree within the tolerance
+        """
+        if len(samples) != len(reference_samples):
+            return False
+
+        for swatch_colours, reference_swatch_colours in zip(samples, reference_samples):
+            swatch_colours = np.asarray(swatch_colours)
+            reference_swatch_colours = np.asarray(reference_swatch_colours)
+            if swatch_colours.shape != reference_swatch_colours.shape:
+                return False
+
+            difference = np.mean(np.abs(swatch_colours - reference_swatch_colours))
+            if not difference <= constants.MACBETH_DETECTION_TOLERANCE * np.mean(np.abs(reference_swatch_colours)):
+                return False
+        return True
+
+    @staticmethod
+    def _detect_swatch_colours_in_mean(image: np.ndarray) -> list:
+        """ Detects the macbeth charts within a downscaled copy of the given image, at the working width of the
+            detection, and maps the chart rectangles back to the full resolution image to sample the swatches
+
+        Args:
+            image: The full resolution image to detect the charts in
+
+        Returns: The swatch colours for each of the charts detected
+        """
+        settings = Structure(**SETTINGS_SEGMENTATION_COLORCHECKER_CLASSIC)
+        if image.shape[1] < image.shape[0]:
+            # The detection works on landscape images, so we rotate the image as the detection would
+            image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+
+        working_image = adjust_image(image, settings.working_width, cv2.INTER_AREA)
+        scale = image.shape[1] / working_image.shape[1]
+
+        samples = []
+        for rectangle in colour_checkers_coordinates_segmentation(working_image, **settings):
+            colour_checker = crop_and_level_image_with_rectangle(
+                image, cv2.minAreaRect((np.asarray(rectangle) * scale).astype(np.float32)),
+                settings.interpolation_method
+            )
+            if colour_checker.shape[1] < colour_checker.shape[0]:
+                colour_checker = cv2.rotate(colour_checker, cv2.ROTATE_90_CLOCKWISE)
+
+            # The sampled window of each swatch is scaled with the chart, so it covers the same part of the swatch
+            # as the detection samples at its working width, with every full resolution pixel within it
+            masks = swatch_masks(
+                colour_checker.shape[1], colour_checker.shape[0], settings.swatches_horizontal,
+                settings.swatches_vertical, max(2, int(round(constants.MACBETH_SWATCH_SAMPLES * scale)))
+            )
+            swatch_colours = np.array([
+                np.mean(colour_checker[mask[0]:mask[1], mask[2]:mask[3], ...], axis=(0, 1)) for mask in masks
+            ])
+
+            # The chart may be upside down, in which case the achromatic swatches vary more in chromaticity than the
+            # chromatic swatches, and we reverse the swatches as the detection does
+            std_means = []
+            for swatch_slice in [settings.swatches_chromatic_slice, settings.swatches_achromatic_slice]:
+                normalised_swatches = swatch_colours[swatch_slice] / swatch_colours[swatch_slice][..., 1][..., None]
+                std_means.append(np.mean(np.std(normalised_swatches, 0)))
+            if std_means[0] < std_means[1]:
+                swatch_colours = swatch_colours[::-1]
+
+            samples.append(swatch_colours)
+        return samples
+
+    def _detect_swatch_colours(self, frame: Frame) -> list:
+        """ Detects the macbeth charts within the region of interest of the frame, and returns the colours of the
+            swatches of each chart detected
+
+        Args:
+            frame: The frame to detect the charts in
+
+        Returns: The swatch colours for each of the charts detected
+        """
+        return self._detect_swatch_colours_in_array(
+            imaging_utils.image_buf_to_np_array(frame.extract_roi(self.led_wall.roi))
+        )
+
+    @staticmethod
+    def _detect_swatch_colours_in_array(section_np_array: np.ndarray) -> list:
+        """ Detects the macbeth charts within the given image, and returns the colours of the swatches of each chart
+            detected
+
+        Args:
+            section_np_array: The image to detect the charts in
+
+        Returns: The swatch colours for each of the charts detected
+        """
+        samples = []
+        for colour_checker_swatches_data in detect_colour_checkers_segmentation(
+                section_np_array, additional_data=True):
+            swatch_colours, _, _ = (
+                colour_checker_swatches_data.values)
+
+            samples.append(swatch_colours)
+        return samples
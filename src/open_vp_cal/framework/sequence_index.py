@@ -0,0 +1,351 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Module contains the class which indexes the frames of an image sequence on disk, mapping each frame number to its
+file so that frames can be looked up without touching the file system. The index is stored in a sidecar file next to
+the sequence so that re-opening large sequences, or sequences on network shares, does not need to scan the folder
+"""
+import json
+import os
+import re
+import time
+from typing import Dict, List, Union
+
+from open_vp_cal.core import constants
+
+
+class SequenceIndex:
+    """
+    An index of the frames within an image sequence folder, mapping the frame numbers to the file names on disk and
+    recording any missing frames within the range of the sequence
+    """
+    _file_name_pattern = re.compile(r"^(?P<name>.*?)\.(?P<frame>\d+)\.(?P<ext>[^.]+)$")
+
+    def __init__(self, folder_path: str, file_type: str, file_name: str, padding: int, files: Dict[int, str],
+                 folder_mtime_ns: Union[int, None] = None, scanned_ns: Union[int, None] = None):
+        """ Initializes a SequenceIndex instance.
+
+        Args:
+            folder_path: The folder the sequence is stored in
+            file_type: The file extension of the sequence
+            file_name: The name of the sequence without the frame number or extension
+            padding: The amount of padding of the frame numbers in the file names
+            files: A dictionary of the frame numbers to the file names within the folder
+            folder_mtime_ns: The modification time of the folder observed before it was scanned
+            scanned_ns: The time at which the modification time of the folder was observed
+        """
+        self._folder_path = folder_path
+        self._folder_mtime_ns = folder_mtime_ns
+        self._scanned_ns = scanned_ns
+        self._file_type = file_type
+        self._file_name = file_name
+        self._padding = padding
+        self._files = files
+        self._frames = sorted(files)
+
+    @property
+    def folder_path(self) -> str:
+        """
+        Property for folder_path.
+        """
+        return self._folder_path
+
+    @property
+    def file_type(self) -> str:
+        """
+        Property for file_type.
+        """
+        return self._file_type
+
+    @property
+    def file_name(self) -> str:
+        """
+        Property for file_name.
+        """
+        return self._file_name
+
+    @property
+    def padding(self) -> int:
+        """
+        Property for padding.
+        """
+        return self._padding
+
+    @property
+    def frames(self) -> List[int]:
+        """
+        Property for the sorted frame numbers which exist on disk.
+        """
+        return self._frames
+
+    @property
+    def start_frame(self) -> int:
+        """
+        Property for the first frame of the sequence.
+        """
+        return self._frames[0]
+
+    @property
+    def end_frame(self) -> int:
+        """
+        Property for the last frame of the sequence.
+        """
+        return self._frames[-1]
+
+    @property
+    def holes(self) -> List[int]:
+        """
+        Property for the frame numbers within the range of the sequence which are missing on disk.
+        """
+        if not self._frames:
+            return []
+        return [frame for frame in range(self.start_frame, self.end_frame + 1) if frame not in self._files]
+
+    def file_name_for_frame(self, frame: int) -> Union[str, None]:
+        """ Returns the file name of the given frame
+
+        Args:
+            frame: The frame number
+
+        Returns: The file name of the frame, or None if the frame does not exist
+        """
+        return self._files.get(frame)
+
+    def path(self, frame: int) -> Union[str, None]:
+        """ Returns the full path of the given frame
+
+        Args:
+            frame: The frame number
+
+        Returns: The full file path of the frame, or None if the frame does not exist
+        """
+        file_name = self._files.get(frame)
+        if file_name is None:
+            return None
+        return os.path.join(self._folder_path, file_name)
+
+    def __contains__(self, frame: int) -> bool:
+        """ Checks if the frame exists in the sequence
+
+        Args:
+            frame: The frame number to check
+
+        Returns: True if the frame exists on disk
+        """
+        return frame in self._files
+
+    def __len__(self) -> int:
+        """ Returns the number of frames which exist in the sequence
+        """
+        return len(self._files)
+
+    @staticmethod
+    def sidecar_path(folder_path: str) -> str:
+        """ Returns the path of the sidecar file we store the index of the given folder in
+
+        Args:
+            folder_path: The folder of the sequence
+
+        Returns: The path to the sidecar file
+        """
+        return os.path.join(folder_path, constants.SEQUENCE_INDEX_FILE_NAME)
+
+    @staticmethod
+    def sidecar_enabled() -> bool:
+        """ Returns whether the sidecar files are used by default, which can be disabled by setting the
+            OPEN_VP_CAL_SEQUENCE_INDEX_SIDECAR environment variable to 0
+
+        Returns: True if the sidecar files should be read and written
+        """
+        return os.environ.get(constants.OPEN_VP_CAL_SEQUENCE_INDEX_SIDECAR, "1") != "0"
+
+    @staticmethod
+    def mtime_granularity_ns(mtime_ns: int) -> int:
+        """ Returns the timestamp granularity we assume for the file system a modification time was read from. File
+            systems which only store whole seconds, such as FAT or some network shares, may only have a granularity of
+            two seconds
+
+        Args:
+            mtime_ns: The modification time in nanoseconds
+
+        Returns: The granularity of the modification time in nanoseconds
+        """
+        if mtime_ns % 1000000000 == 0:
+            return constants.SEQUENCE_INDEX_MTIME_GRANULARITY_NS
+        return constants.SEQUENCE_INDEX_FINE_MTIME_GRANULARITY_NS
+
+    @classmethod
+    def load(cls, folder_path: str, file_type: str = constants.FileFormats.FF_EXR,
+             use_sidecar: Union[bool, None] = None) -> "SequenceIndex":
+        """ Loads the index for the sequence within the given folder. If there is an up-to-date sidecar file we load
+            the index from it, otherwise we scan the folder and write the sidecar for next time
+
+        Args:
+            folder_path: The folder containing the image sequence
+            file_type: The file extension of the image sequence
+            use_sidecar: Whether to read and write the sidecar file, if None we use the default
+
+        Returns: The index of the sequence
+        """
+        if use_sidecar is None:
+            use_sidecar = cls.sidecar_enabled()
+
+        if use_sidecar:
+            index = cls.from_sidecar(folder_path, file_type)
+            if index is not None:
+                return index
+            cls._create_sidecar(folder_path)
+            cls._wait_for_mtime_granularity(folder_path)
+
+        index = cls.scan(folder_path, file_type)
+        if use_sidecar:
+            index.write_sidecar()
+        return index
+
+    @classmethod
+    def scan(cls, folder_path: str, file_type: str = constants.FileFormats.FF_EXR) -> "SequenceIndex":
+        """ Scans the folder for the frames of the image sequence. If the folder contains more than one sequence, the
+            sequence whose file name sorts first is used
+
+        Args:
+            folder_path: The folder containing the image sequence
+            file_type: The file extension of the image sequence
+
+        Returns: The index of the sequence
+        """
+        # The modification time is read before the folder is scanned, so any file added during the scan changes it
+        scanned_ns = time.time_ns()
+        folder_mtime_ns = os.stat(folder_path).st_mtime_ns
+        sequences = {}
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                match = cls._file_name_pattern.match(entry.name)
+                if not match or match.group("ext") != file_type:
+                    continue
+                sequences.setdefault(match.group("name"), []).append((entry.name, match.group("frame")))
+
+        if not sequences:
+            raise IOError("No frames found in the provided folder.")
+
+        file_name = min(sequences)
+        files = {}
+        padding = 0
+        for name, frame_string in sorted(sequences[file_name]):
+            frame = int(frame_string)
+            if frame in files:
+                continue
+            if not files:
+                padding = len(frame_string)
+            files[frame] = name
+        return cls(
+            folder_path, file_type, file_name, padding, files, folder_mtime_ns=folder_mtime_ns, scanned_ns=scanned_ns
+        )
+
+    @classmethod
+    def _create_sidecar(cls, folder_path: str) -> None:
+        """ Creates the sidecar file in the folder if it does not exist, before the folder is scanned, as creating it
+            modifies the folder. Failing to create the sidecar is not an error
+
+        Args:
+            folder_path: The folder containing the image sequence
+        """
+        try:
+            with open(cls.sidecar_path(folder_path), "a", encoding="utf-8"):
+                pass
+        except OSError:
+            pass
+
+    @classmethod
+    def _wait_for_mtime_granularity(cls, folder_path: str) -> None:
+        """ Waits until a timestamp tick has passed since the folder was last modified, so the index we scan next can
+            be reused from the sidecar the next time the folder is loaded
+
+        Args:
+            folder_path: The folder containing the image sequence
+        """
+        try:
+            folder_mtime_ns = os.stat(folder_path).st_mtime_ns
+        except OSError:
+            return
+        granularity_ns = cls.mtime_granularity_ns(folder_mtime_ns)
+        # The modification time may come from the clock of a file server, so we never wait longer than a single tick
+        wait_ns = min(folder_mtime_ns + granularity_ns - time.time_ns(), granularity_ns)
+        if wait_ns > 0:
+            time.sleep(wait_ns / 1000000000)
+
+    @classmethod
+    def from_sidecar(cls, folder_path: str, file_type: str = constants.FileFormats.FF_EXR
+                     ) -> Union["SequenceIndex", None]:
+        """ Loads the index from the sidecar file in the folder. The sidecar is only used if the modification time of
+            the folder is the one observed before the folder was scanned, as adding, removing or renaming files
+            updates it.
+
+            File systems with a coarse timestamp granularity may not update the modification time for files added
+            within the same tick as the scan, so the sidecar is also ignored unless the folder was scanned at least a
+            tick after it was last modified
+
+        Args:
+            folder_path: The folder containing the image sequence
+            file_type: The file extension of the image sequence
+
+        Returns: The index of the sequence, or None if there is no valid sidecar file
+        """
+        sidecar_path = cls.sidecar_path(folder_path)
+        try:
+            folder_mtime_ns = os.stat(folder_path).st_mtime_ns
+            with open(sidecar_path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+        if (data.get("version") != constants.SEQUENCE_INDEX_VERSION or data.get("file_type") != file_type
+                or data.get("folder_mtime_ns") != folder_mtime_ns):
+            return None
+
+        try:
+            scanned_ns = int(data["scanned_ns"])
+            if scanned_ns - folder_mtime_ns < cls.mtime_granularity_ns(folder_mtime_ns):
+                return None
+            files = {int(frame): name for frame, name in data["files"].items()}
+            return cls(
+                folder_path, file_type, data["file_name"], data["padding"], files, folder_mtime_ns=folder_mtime_ns,
+                scanned_ns=scanned_ns
+            )
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+
+    def write_sidecar(self) -> bool:
+        """ Writes the index to the sidecar file in the folder of the sequence. Failing to write the sidecar, for
+            example on a read only share, is not an error, we simply scan the folder the next time
+
+        Returns: True if the sidecar file was written
+        """
+        data = {
+            "version": constants.SEQUENCE_INDEX_VERSION,
+            "file_type": self._file_type,
+            "file_name": self._file_name,
+            "padding": self._padding,
+            "folder_mtime_ns": self._folder_mtime_ns,
+            "scanned_ns": self._scanned_ns,
+            "files": {str(frame): self._files[frame] for frame in self._frames}
+        }
+        try:
+            # We write the existing file in place, so the folder is only modified when the sidecar is first created,
+            # which load does before the folder is scanned
+            with open(self.sidecar_path(self._folder_path), "w", encoding="utf-8") as handle:
+                json.dump(data, handle)
+        except OSError:
+            return False
+        return True
@@ -19,11 +19,13 @@ for iterating over the frames in the cache
 import re
 import os
 import threading
-
-from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+from typing import Dict, Union, List, Tuple, Hashable
 
 from open_vp_cal.core import constants
 from open_vp_cal.framework.frame import Frame
+from open_vp_cal.framework.frame_cache import FrameCache, FrameCacheStats
+from open_vp_cal.framework.sequence_index import SequenceIndex
 from open_vp_cal.imaging import imaging_utils
 
 
@@ -33,11 +35,21 @@ class FrameRangeException(IOError):
 
 class SequenceLoader:
     """This class is designed to load image sequences."""
+    _prefetch_pool = None
+    _prefetch_pool_lock = threading.Lock()
 
     def __init__(self, led_wall_settings: "LedWallSettings"):
         """Initializes a SequenceLoader instance."""
         self.led_wall_settings = led_wall_settings
-        self.cache = OrderedDict()
+        self.cache = FrameCache()
+        self.prefetch_depth = constants.DEFAULT_PREFETCH_DEPTH
+        self._pending: Dict[Hashable, Future] = {}
+        self._pending_lock = threading.Lock()
+        # The last frame requested by each thread, and the direction and stride it is moving through the sequence
+        # with, as the sampling pool requests the frames of different patches from the same loader concurrently
+        self._read_directions: Dict[int, Tuple[int, int, int]] = {}
+        self._read_directions_lock = threading.Lock()
+        self._sequence_id = 0
         self._current_frame = -1
         self._start_frame = -1
         self._end_frame = -1
@@ -46,6 +58,7 @@ class SequenceLoader:
         self.padding = None
         self.file_type = constants.FileFormats.FF_EXR
         self.frames = []
+        self.sequence_index = None
         self.frame_class = Frame
 
     def set_start_frame(self, frame: int) -> bool:
@@ -99,6 +112,54 @@ class SequenceLoader:
         """
         return self._end_frame
 
+    @property
+    def cache_size_bytes(self) -> int:
+        """
+        Property for the maximum number of bytes the frame caches of all the sequence loaders can hold.
+        """
+        return self.cache.max_bytes
+
+    def set_cache_size_bytes(self, max_bytes: int) -> None:
+        """ Sets the maximum number of bytes the decoded frames in the caches can take up. The budget is shared by
+            the sequence loaders of all the walls, the least recently used frames of any of them are evicted if the
+            caches are currently over the new budget
+
+        Parameters:
+        max_bytes (int): The maximum number of bytes for the frame cache.
+        """
+        self.cache.max_bytes = max_bytes
+
+    @property
+    def cache_stats(self) -> FrameCacheStats:
+        """
+        Property for the hit, miss and eviction statistics of the frame cache.
+        """
+        return self.cache.stats
+
+    @classmethod
+    def prefetch_pool(cls) -> ThreadPoolExecutor:
+        """ Returns the worker pool which is shared between all the sequence loaders to read frames ahead of them
+            being requested, the pool is created on first use and is bound to a maximum number of workers, so the
+            number of decodes in flight is predictable regardless of the number of walls
+
+        Returns: The shared worker pool
+        """
+        with cls._prefetch_pool_lock:
+            if cls._prefetch_pool is None:
+                cls._prefetch_pool = ThreadPoolExecutor(
+                    max_workers=constants.PREFETCH_MAX_WORKERS, thread_name_prefix="SequenceLoaderPrefetch"
+                )
+            return cls._prefetch_pool
+
+    def set_prefetch_depth(self, depth: int) -> None:
+        """ Sets the number of frames we read ahead of the last requested frame, in the direction we are
+            iterating. A depth of 0 disables the read ahead
+
+        Parameters:
+        depth (int): The number of frames to read ahead.
+        """
+        self.prefetch_depth = max(0, depth)
+
     def set_current_frame(self, frame: int) -> tuple[bool, Frame]:
         """
         Sets the current frame and loads it into the cache if it's not already there.
@@ -124,10 +185,8 @@ class SequenceLoader:
             self._current_frame = frame
             frame_changed = True
 
-        if frame not in self.cache:
-            self.cache[frame] = self._load_frame(frame)
-
-        return frame_changed, self.cache[frame]
+        result = self._get_or_load(frame)
+        return frame_changed, result
 
     @staticmethod
     def detect_padding(filename: str) -> int:
@@ -165,19 +224,15 @@ class SequenceLoader:
         file_type (str): The file extension of the image sequence. Defaults to "exr".
 
         """
-        self.cache = OrderedDict()
+        self._cancel_prefetch()
+        self.cache.clear()
         self.folder_path = folder_path
         self.file_type = file_type
-        files = [f for f in os.listdir(folder_path) if f.endswith(file_type)]
-        files.sort()
+        self.sequence_index = SequenceIndex.load(folder_path, file_type)
 
-        self.padding = self.detect_padding(files[0])
-        self.file_name = files[0].split('.')[0]
-
-        self.frames = [int(os.path.splitext(f)[0].split('.')[-1]) for f in files]
-
-        if not self.frames:
-            raise IOError("No frames found in the provided folder.")
+        self.padding = self.sequence_index.padding
+        self.file_name = self.sequence_index.file_name
+        self.frames = self.sequence_index.frames
 
         self.set_end_frame(max(self.frames))
         self.set_start_frame(min(self.frames))
@@ -186,68 +241,342 @@ class SequenceLoader:
 
         self.set_current_frame(self.start_frame)
 
-    def get_frame(self, frame: int) -> Frame:
+    def get_frame(self, frame: int, roi: Union[List[int], None] = None, proxy_factor: int = 1) -> Frame:
         """ Returns the frame from the cache.
 
+        If a region of interest is given, and the full frame is not already in the cache, only the scanlines or tiles
+        covering the region are decoded. The returned frame can be used with extract_roi for the region in the same
+        way as a full frame, but nothing outside the region is available.
+
+        If a proxy factor is given, the frame is a proxy of the full frame downscaled by the factor, which is much
+        cheaper to analyse for detection passes which only need coarse statistics. The region of interest is ignored
+        for proxies, and extract_roi on a proxy frame scales the region to match the proxy.
+
         :param frame: The frame number to get
+        :param roi: The optional region of interest as [left, right, top, bottom] we want to read from the frame
+        :param proxy_factor: The factor to downscale the frame by, 1 for the full resolution frame
         :return: The frame we requested
         """
         if frame < self.start_frame or frame > self.end_frame:
             raise FrameRangeException(f"Frame:{frame} out of range {self.start_frame}-{self.end_frame}")
 
-        if frame not in self.cache:
-            self._load_and_cache(frame)
-        return self.cache[frame]
+        if proxy_factor > 1 or (roi and frame in self.cache):
+            roi = None
+        return self._get_or_load(frame, roi=roi, proxy_factor=proxy_factor)
 
-    def _load_and_cache(self, frame: int) -> None:
-        """ For the given frame, we load it and store it in the cache
+    @staticmethod
+    def _cache_key(frame: int, roi: Union[List[int], None] = None, proxy_factor: int = 1) -> Hashable:
+        """ Returns the key we store the frame under in the cache, full frames are stored by their frame number,
+            frames which only contain a region of interest are stored by their frame number and region, and proxies
+            are stored by their frame number and proxy factor
 
         Args:
-            frame: The frame number to load and cache
+            frame: The frame number
+            roi: The region of interest of the frame if it is not a full frame
+            proxy_factor: The factor the frame is downscaled by if it is a proxy
+
+        Returns: The key for the cache
         """
-        self.cache[frame] = self._load_frame(frame)
+        if proxy_factor > 1:
+            return frame, constants.PROXY, proxy_factor
+        if not roi:
+            return frame
+        return frame, tuple(roi)
 
-    def _cache_frames(self) -> None:
+    def _get_or_load(self, frame: int, roi: Union[List[int], None] = None, proxy_factor: int = 1) -> Frame:
+        """ Returns the frame from the cache, if the frame is currently being read ahead we wait for it, otherwise we
+            load it. Once we have the frame we schedule the read ahead of the frames which follow it, in the direction
+            we are iterating
+
+        Args:
+            frame: The frame number to get
+            roi: The region of interest to read from the frame, or None to read the full frame
+            proxy_factor: The factor to downscale the frame by, 1 for the full resolution frame
+
+        Returns:
+            Frame: The frame we requested
+        """
+        key = self._cache_key(frame, roi, proxy_factor)
+        direction, stride = self._update_direction(frame)
+        result = self.cache.get(key)
+        if result is None:
+            with self._pending_lock:
+                future = self._pending.get(key)
+
+            if future is not None:
+                try:
+                    result = future.result()
+                except CancelledError:
+                    result = None
+            if result is None:
+                result = self._load_and_cache(frame, roi=roi, proxy_factor=proxy_factor)
+
+        self._prefetch(frame, direction, stride, roi=roi, proxy_factor=proxy_factor)
+        return result
+
+    def _update_direction(self, frame: int) -> Tuple[int, int]:
+        """ Tracks the direction and the stride the calling thread is moving through the sequence with, so we read
+            ahead the frames it will request next. Each thread is tracked on its own, so threads requesting different
+            parts of the sequence concurrently do not disturb each other. Jumps larger than the maximum stride are
+            treated as moving one frame at a time
+
+        Args:
+            frame: The frame which has been requested
+
+        Returns: The direction and the stride the calling thread is moving with
         """
-        Loads frames into the cache.
+        thread_id = threading.get_ident()
+        with self._read_directions_lock:
+            last_requested_frame, direction, stride = self._read_directions.get(thread_id, (None, 1, 1))
+            if last_requested_frame is not None and frame != last_requested_frame:
+                step = frame - last_requested_frame
+                direction = 1 if step > 0 else -1
+                stride = abs(step) if abs(step) <= constants.PREFETCH_MAX_STRIDE else 1
+            self._read_directions[thread_id] = (frame, direction, stride)
+        return direction, stride
+
+    def read_direction(self) -> Tuple[int, int]:
+        """ Returns the direction and the stride the calling thread is moving through the sequence with
+
+        Returns: The direction, 1 or -1, and the stride of the calling thread
         """
+        with self._read_directions_lock:
+            _, direction, stride = self._read_directions.get(threading.get_ident(), (None, 1, 1))
+        return direction, stride
 
-        threads = []
-        cache_frames = 50
-        if cache_frames > self.end_frame:
-            cache_frames = self.end_frame
+    def _prefetch(self, frame: int, direction: int, stride: int, roi: Union[List[int], None] = None,
+                  proxy_factor: int = 1) -> None:
+        """ Schedules the frames following the given frame to be read into the cache by the shared worker pool
 
-        for frame in range(self.start_frame, cache_frames + 1):
-            if frame not in self.cache:
-                self.cache[frame] = None
-                thread = threading.Thread(target=self._load_and_cache, args=(frame,), daemon=True)
-                thread.start()
-                threads.append(thread)
+        Args:
+            frame: The frame we want to read ahead from
+            direction: The direction to read ahead in, 1 or -1
+            stride: The number of frames between each frame we read ahead
+            roi: The region of interest to read from the frames, or None to read the full frames
+            proxy_factor: The factor to downscale the frames by, 1 for the full resolution frames
+        """
+        if self.prefetch_depth < 1 or self.sequence_index is None:
+            return
+
+        pool = self.prefetch_pool()
+        for offset in range(1, self.prefetch_depth + 1):
+            prefetch_frame = frame + (offset * direction * stride)
+            if prefetch_frame < self.start_frame or prefetch_frame > self.end_frame:
+                break
+
+            if prefetch_frame not in self.sequence_index:
+                continue
+
+            key = self._cache_key(prefetch_frame, roi, proxy_factor)
+            if key in self.cache or (roi and prefetch_frame in self.cache):
+                continue
+
+            with self._pending_lock:
+                if key in self._pending:
+                    continue
+                future = pool.submit(self._prefetch_frame, prefetch_frame, roi, proxy_factor, self._sequence_id)
+                self._pending[key] = future
+            future.add_done_callback(
+                lambda _, pending_key=key, sequence_id=self._sequence_id: self._prefetch_done(
+                    pending_key, sequence_id)
+            )
+
+    def _prefetch_frame(self, frame: int, roi: Union[List[int], None], proxy_factor: int,
+                        sequence_id: int) -> Union[Frame, None]:
+        """ Runs on the worker pool to load the frame and decode its pixels into the cache, if the sequence has
+            changed since the frame was scheduled then the frame is skipped
 
-        for thread in threads:
-            thread.join()
+        Args:
+            frame: The frame number to load
+            roi: The region of interest to read from the frame, or None to read the full frame
+            proxy_factor: The factor to downscale the frame by, 1 for the full resolution frame
+            sequence_id: The id of the sequence which was loaded when the frame was scheduled
 
-    def _load_frame(self, frame_num: int) -> Frame:
+        Returns:
+            Frame: The loaded frame, or None if the sequence has changed
+        """
+        if sequence_id != self._sequence_id:
+            return None
+        return self._load_and_cache(frame, read_pixels=True, roi=roi, proxy_factor=proxy_factor)
+
+    def _prefetch_done(self, key: Hashable, sequence_id: int) -> None:
+        """ Removes the frame from the pending read ahead frames once its load has finished
+
+        Args:
+            key: The cache key of the frame which has finished loading
+            sequence_id: The id of the sequence which was loaded when the frame was scheduled
+        """
+        with self._pending_lock:
+            if sequence_id == self._sequence_id:
+                self._pending.pop(key, None)
+
+    def _cancel_prefetch(self) -> None:
+        """
+        Cancels any frames waiting to be read ahead, and invalidates any which are in flight
+        """
+        with self._pending_lock:
+            self._sequence_id += 1
+            for future in self._pending.values():
+                future.cancel()
+            self._pending = {}
+        with self._read_directions_lock:
+            self._read_directions = {}
+
+    def _load_and_cache(self, frame: int, read_pixels: bool = False, roi: Union[List[int], None] = None,
+                        proxy_factor: int = 1) -> Frame:
+        """ For the given frame, we load it and store it in the cache
+
+        Args:
+            frame: The frame number to load and cache
+            read_pixels: Whether to decode the pixels of the frame immediately
+            roi: The region of interest to read from the frame, or None to read the full frame
+            proxy_factor: The factor to downscale the frame by, 1 for the full resolution frame
+
+        Returns:
+            Frame: The loaded frame
+        """
+        result = self._load_frame(frame, read_pixels=read_pixels, roi=roi, proxy_factor=proxy_factor)
+        self.cache[self._cache_key(frame, roi, proxy_factor)] = result
+        return result
+
+    def _cache_frames(self) -> None:
+        """
+        Schedules the first frames of the sequence to be read into the cache by the shared worker pool
+        """
+        with self._read_directions_lock:
+            self._read_directions[threading.get_ident()] = (self.start_frame, 1, 1)
+        self._prefetch(self.start_frame - 1, 1, 1)
+
+    def _load_frame(self, frame_num: int, read_pixels: bool = False, roi: Union[List[int], None] = None,
+                    proxy_factor: int = 1) -> Frame:
         """
         Loads a specific frame from the disk.
 
         Parameters:
         frame_num (int): The number of the frame to load.
+        read_pixels (bool): Whether to decode the pixels immediately rather than on first access.
+        roi (List[int]): The region of interest to decode, if not set the full frame is loaded.
+        proxy_factor (int): The factor to downscale the frame by, 1 for the full resolution frame.
 
         Returns:
             Frame: The loaded frame.
         """
-        full_file_name = f"{self.file_name}.{str(frame_num).zfill(self.padding)}.{self.file_type}"
+        full_file_name = None
+        if self.sequence_index is not None:
+            full_file_name = self.sequence_index.file_name_for_frame(frame_num)
+        if full_file_name is None:
+            raise IOError(f"Frame {frame_num} does not exist in the sequence {self.file_name} in {self.folder_path}.")
         full_file_path = os.path.join(self.folder_path, full_file_name)
-        if not os.path.exists(full_file_path):
-            raise IOError(f"File {full_file_path} does not exist.")
 
         frame = self.frame_class(self.led_wall_settings.project_settings)
         frame.frame_num = frame_num
         frame.file_name = full_file_name
-        frame.image_buf = imaging_utils.load_image(full_file_path)
+        if proxy_factor > 1:
+            frame.image_buf = self._load_proxy(frame_num, full_file_path, proxy_factor)
+            frame.proxy_factor = proxy_factor
+        elif roi:
+            frame.image_buf = imaging_utils.load_image_roi(full_file_path, roi)
+            frame.roi = list(roi)
+        else:
+            frame.image_buf = imaging_utils.load_image(full_file_path, read_pixels=read_pixels)
         return frame
 
+    @staticmethod
+    def proxy_cache_enabled() -> bool:
+        """ Returns whether proxies are persisted next to the plates, so they do not need to be rebuilt from the full
+            resolution frames when the sequence is analysed again. Enabled by setting the OPEN_VP_CAL_PROXY_CACHE
+            environment variable to 1
+
+        Returns: True if the proxies should be read from and written to disk
+        """
+        return os.environ.get(constants.OPEN_VP_CAL_PROXY_CACHE, "0") == "1"
+
+    def _proxy_file_path(self, full_file_path: str, proxy_factor: int) -> str:
+        """ Returns the path the proxy of the given frame file is persisted to
+
+        Args:
+            full_file_path: The path to the full resolution frame
+            proxy_factor: The factor the proxy is downscaled by
+
+        Returns: The path of the persisted proxy
+        """
+        base_name = os.path.splitext(os.path.basename(full_file_path))[0]
+        return os.path.join(
+            self.folder_path, constants.PROXY_CACHE_FOLDER_NAME,
+            f"{base_name}.{constants.PROXY}{proxy_factor}.{constants.FileFormats.FF_EXR}"
+        )
+
+    def _load_proxy(self, frame_num: int, full_file_path: str, proxy_factor: int) -> "Oiio.ImageBuf":
+        """ Loads the proxy of the frame downscaled by the given factor. If the proxies are persisted and the proxy
+            on disk is newer than the frame we read it, otherwise we build the proxy from the full resolution frame.
+
+            When building from the full resolution frame, every level of the proxy pyramid is built at the same
+            time, with each level downscaled from the previous one, and the other levels are stored in the cache so
+            the full resolution frame is only read once
+
+        Args:
+            frame_num: The frame number
+            full_file_path: The path to the full resolution frame
+            proxy_factor: The factor to downscale the frame by
+
+        Returns: The proxy image
+        """
+        persist = self.proxy_cache_enabled()
+        proxy_file_path = self._proxy_file_path(full_file_path, proxy_factor)
+        if persist:
+            try:
+                if os.stat(proxy_file_path).st_mtime_ns >= os.stat(full_file_path).st_mtime_ns:
+                    return imaging_utils.load_image(proxy_file_path, read_pixels=True)
+            except (OSError, ValueError):
+                pass
+
+        source_frame = self.cache.get(frame_num)
+        if source_frame is not None:
+            full_image_buf = source_frame.image_buf
+        else:
+            full_image_buf = imaging_utils.load_image(full_file_path, read_pixels=True)
+
+        result = None
+        image_buf, source_factor = full_image_buf, 1
+        for factor in sorted(set(constants.PROXY_FACTORS) | {proxy_factor}):
+            if factor % source_factor:
+                image_buf, source_factor = full_image_buf, 1
+            image_buf = imaging_utils.create_proxy(image_buf, factor // source_factor)
+            source_factor = factor
+            if persist:
+                self._write_proxy(image_buf, self._proxy_file_path(full_file_path, factor))
+
+            if factor == proxy_factor:
+                result = image_buf
+                continue
+
+            key = self._cache_key(frame_num, proxy_factor=factor)
+            if key not in self.cache:
+                frame = self.frame_class(self.led_wall_settings.project_settings)
+                frame.frame_num = frame_num
+                frame.file_name = os.path.basename(full_file_path)
+                frame.image_buf = image_buf
+                frame.proxy_factor = factor
+                self.cache[key] = frame
+        return result
+
+    @staticmethod
+    def _write_proxy(image_buf: "Oiio.ImageBuf", proxy_file_path: str) -> None:
+        """ Writes the proxy to disk, failing to write the proxy, for example on a read only share, is not an error
+
+        Args:
+            image_buf: The proxy image to write
+            proxy_file_path: The path to write the proxy to
+        """
+        temp_file_path = f"{proxy_file_path}.{threading.get_ident()}.tmp.{constants.FileFormats.FF_EXR}"
+        try:
+            os.makedirs(os.path.dirname(proxy_file_path), exist_ok=True)
+            imaging_utils.write_image(image_buf, temp_file_path, "float")
+            os.replace(temp_file_path, proxy_file_path)
+        except (OSError, ValueError):
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+
     def __iter__(self):
         """Makes this class iterable.
 
@@ -20,25 +20,33 @@ import json
 import os
 import uuid
 from datetime import datetime, timezone
-from typing import Dict, Union, TYPE_CHECKING, List, Tuple
+from typing import Callable, Dict, Union, TYPE_CHECKING, List, Tuple
 
 from open_vp_cal.core import constants, ocio_config
 from open_vp_cal.core.ocio_config import OcioConfigWriter
 from open_vp_cal.core.resource_loader import ResourceLoader
-from open_vp_cal.framework.generation import PatchGeneration
+from open_vp_cal.framework.generation import PatchGeneration, export_patterns
 
 if TYPE_CHECKING:
     from open_vp_cal.led_wall_settings import LedWallSettings
     from open_vp_cal.project_settings import ProjectSettings
 
 
-def generate_patterns_for_led_walls(project_settings: 'ProjectSettings', led_walls: List['LedWallSettings']) -> str:
+def generate_patterns_for_led_walls(
+        project_settings: 'ProjectSettings', led_walls: List['LedWallSettings'],
+        max_workers: int = constants.PATTERN_EXPORT_MAX_WORKERS,
+        progress_callback: Callable[[int, int], None] = None) -> str:
     """ For the given list of led walls filter out any walls which are verification walls, then generate the
         calibration patterns for the remaining walls.
 
+        The patches of all the walls are generated concurrently, converting them with the pre calibration ocio config
+        which is exported for all the walls up front
+
     Args:
         project_settings: The project settings with the settings for the pattern generation
         led_walls: A list of led walls we want to generate patters for
+        max_workers: The maximum number of patch images generated at once
+        progress_callback: Called with the number of patch images exported so far and the total number of images
 
     Returns: The ocio config file path which was generated
 
@@ -47,11 +55,17 @@ def generate_patterns_for_led_walls(project_settings: 'ProjectSettings', led_wal
     if not led_walls:
         return ""
 
+    _, ocio_config_path = export_pre_calibration_ocio_config(project_settings, led_walls)
+
+    patch_generators = []
     for led_wall in led_walls:
         patch_generator = PatchGeneration(led_wall)
-        patch_generator.generate_patches(constants.PATCHES.PATCH_ORDER)
+        patch_generator.prepare_generation(generation_ocio_config_path=ocio_config_path)
+        patch_generators.append(patch_generator)
 
-    _, ocio_config_path = export_pre_calibration_ocio_config(project_settings, led_walls)
+    export_patterns(
+        patch_generators, constants.PATCHES.PATCH_ORDER, max_workers=max_workers, progress_callback=progress_callback
+    )
     return ocio_config_path
 
 
@@ -19,11 +19,11 @@ from typing import Union, List, Tuple
 
 import os
 import os.path
+import shutil
 import tempfile
 
 from PySide6 import QtGui
 from PySide6.QtGui import QImage, QPixmap
-import PyOpenColorIO as ocio
 
 try:
     import OpenImageIO as Oiio
@@ -54,13 +54,17 @@ from colour.models import RGB_COLOURSPACE_ACES2065_1
 import numpy as np
 
 from open_vp_cal.core.constants import OIIO_COMPRESSION_ATTRIBUTE, \
-    OIIO_COMPRESSION_NONE, OIIO_BITS_PER_SAMPLE
+    OIIO_COMPRESSION_NONE, OIIO_BITS_PER_SAMPLE, SAMPLE_TILE_PIXELS
 from open_vp_cal.core.resource_loader import ResourceLoader
+from open_vp_cal.core.ocio_utils import OcioProcessorCache
 from open_vp_cal.core import utils
 
 
 def image_buf_to_np_array(image_buf: Oiio.ImageBuf) -> np.array:
-    """ Convert an OIIO ImageBuf to a NumPy array
+    """ Convert an OIIO ImageBuf to a float32 NumPy array of shape (height, width, channels)
+
+    The array returned by get_pixels is used directly rather than being copied again, it is not shared with the image
+    buffer so it can be modified in place, and written back with update_image_buf_from_np_array
 
     Args:
         image_buf: The OIIO ImageBuf to convert
@@ -68,22 +72,9 @@ def image_buf_to_np_array(image_buf: Oiio.ImageBuf) -> np.array:
     Returns: The NumPy array representing the image
 
     """
-    # Load the image using oiio.ImageBuf
-    # Get the image metadata
     spec = image_buf.spec()
-
-    # Get the dimensions and number of channels of the image
-    width = spec.width
-    height = spec.height
-    channels = spec.nchannels
-
-    # Create a NumPy array of the appropriate shape and data type
-    image_np = np.zeros((height, width, channels), dtype=np.float32)
-
-    # Copy pixel data from ImgBuf to NumPy array
-    pixels = image_buf.get_pixels(Oiio.FLOAT)  # Assuming the image is in half precision
-    image_np[:] = np.array(pixels).reshape((height, width, channels))
-    return image_np
+    pixels = image_buf.get_pixels(Oiio.FLOAT)
+    return pixels.reshape((spec.height, spec.width, spec.nchannels))
 
 
 def img_buf_from_numpy_array(np_array: np.array) -> Oiio.ImageBuf:
@@ -104,11 +95,28 @@ def img_buf_from_numpy_array(np_array: np.array) -> Oiio.ImageBuf:
     return image_buf
 
 
-def load_image(file_path) -> Oiio.ImageBuf:
+def update_image_buf_from_np_array(image_buf: Oiio.ImageBuf, np_array: np.array) -> Oiio.ImageBuf:
+    """ Writes the numpy array back into the existing image buffer in place, rather than allocating a new image
+    buffer. The array must have the same shape as the image, as returned from image_buf_to_np_array
+
+    Args:
+        image_buf: The image buffer to write the pixels into
+        np_array: The numpy array of pixels to write
+
+    Returns: The updated image buffer
+
+    """
+    if not image_buf.set_pixels(image_buf.roi, np_array):
+        raise ValueError("Failed to set pixels: " + image_buf.geterror())
+    return image_buf
+
+
+def load_image(file_path, read_pixels: bool = False) -> Oiio.ImageBuf:
     """ Loads an image from the given file path
 
     Args:
         file_path: The file path to load the image from
+        read_pixels: Whether to decode the pixels immediately, rather than lazily on first access
 
     Returns: The image buffer
 
@@ -117,6 +125,74 @@ def load_image(file_path) -> Oiio.ImageBuf:
         raise IOError("File does not exist: " + file_path)
 
     image_buf = Oiio.ImageBuf(file_path)
+    if read_pixels:
+        image_buf.read(force=True)
+    if image_buf.has_error:
+        raise ValueError("Failed to load image buffer: " + image_buf.geterror())
+    return image_buf
+
+
+def load_image_roi(file_path: str, roi_input: list) -> Oiio.ImageBuf:
+    """ Loads only the region of interest from the image at the given file path, only the scanlines or tiles which
+        cover the region are decoded. The region keeps its position within the data window of the returned image
+        buffer, so extract_roi can be used on it in the same way as on the full image
+
+    Args:
+        file_path: The file path to load the image from
+        roi_input: The region of interest to load as [left, right, top, bottom]
+
+    Returns: The image buffer containing only the region of interest
+
+    """
+    if not os.path.exists(file_path):
+        raise IOError("File does not exist: " + file_path)
+
+    image_input = Oiio.ImageInput.open(file_path)
+    if not image_input:
+        raise ValueError("Failed to open image: " + Oiio.geterror())
+
+    try:
+        spec = image_input.spec()
+        x_begin = max(roi_input[0], spec.x)
+        x_end = min(roi_input[1], spec.x + spec.width)
+        y_begin = max(roi_input[2], spec.y)
+        y_end = min(roi_input[3], spec.y + spec.height)
+        if x_begin >= x_end or y_begin >= y_end:
+            raise ValueError(f"Region of interest {roi_input} is outside of the image {file_path}")
+
+        if spec.tile_width and spec.tile_height:
+            # Tiles can only be read on tile boundaries, so we read the tiles covering the roi and crop them after
+            tile_x_begin = spec.x + ((x_begin - spec.x) // spec.tile_width) * spec.tile_width
+            tile_x_end = min(spec.x + spec.width, spec.x + -(-(x_end - spec.x) // spec.tile_width) * spec.tile_width)
+            tile_y_begin = spec.y + ((y_begin - spec.y) // spec.tile_height) * spec.tile_height
+            tile_y_end = min(spec.y + spec.height,
+                             spec.y + -(-(y_end - spec.y) // spec.tile_height) * spec.tile_height)
+            pixels = image_input.read_tiles(
+                0, 0, tile_x_begin, tile_x_end, tile_y_begin, tile_y_end, spec.z, spec.z + max(spec.depth, 1),
+                0, spec.nchannels, Oiio.FLOAT
+            )
+            if pixels is None:
+                raise ValueError("Failed to read image tiles: " + image_input.geterror())
+            pixels = pixels[y_begin - tile_y_begin:y_end - tile_y_begin, x_begin - tile_x_begin:x_end - tile_x_begin]
+        else:
+            pixels = image_input.read_scanlines(0, 0, y_begin, y_end, spec.z, 0, spec.nchannels, Oiio.FLOAT)
+            if pixels is None:
+                raise ValueError("Failed to read image scanlines: " + image_input.geterror())
+            pixels = pixels[:, x_begin - spec.x:x_end - spec.x]
+    finally:
+        image_input.close()
+
+    roi_spec = Oiio.ImageSpec(x_end - x_begin, y_end - y_begin, spec.nchannels, Oiio.FLOAT)
+    roi_spec.x = x_begin
+    roi_spec.y = y_begin
+    roi_spec.full_x = spec.full_x
+    roi_spec.full_y = spec.full_y
+    roi_spec.full_width = spec.full_width
+    roi_spec.full_height = spec.full_height
+    roi_spec.channelnames = spec.channelnames
+
+    image_buf = Oiio.ImageBuf(roi_spec)
+    image_buf.set_pixels(Oiio.ROI(x_begin, x_end, y_begin, y_end), np.ascontiguousarray(pixels))
     if image_buf.has_error:
         raise ValueError("Failed to load image buffer: " + image_buf.geterror())
     return image_buf
@@ -161,6 +237,27 @@ def write_image(image, filename, bit_depth, channel_mapping=None):
     return ""
 
 
+def link_image(source_file: str, destination_file: str) -> str:
+    """ Materialises a copy of an image file which has already been written to disk, without encoding the image again.
+        The destination is hard linked to the source where the file system supports it, otherwise the bytes of the
+        file are copied. Any existing destination file is removed first, so a file it was linked to is not modified
+
+    Args:
+        source_file: The image file which has already been written to disk
+        destination_file: The file path we want the copy of the image at
+
+    Returns: The file path of the copy
+    """
+    if os.path.lexists(destination_file):
+        os.remove(destination_file)
+
+    try:
+        os.link(source_file, destination_file)
+    except OSError:
+        shutil.copyfile(source_file, destination_file)
+    return destination_file
+
+
 def get_oiio_bit_depth(value: Union[int, str]) -> Oiio.BASETYPE:
     """ Gets the correct oiio constant for the given bit depth described as an int
 
@@ -263,7 +360,8 @@ def apply_color_conversion(
         image_buffer: Oiio.ImageBuf,
         from_transform: str,
         to_transform: str,
-        color_config: Union[str, None] = None) -> Oiio.ImageBuf:
+        color_config: Union[str, None] = None,
+        in_place: bool = False) -> Oiio.ImageBuf:
     """ Applies a colour conversion to the given image buffer from and to the given transforms.
     If no colour config is supplied, it uses the pre-installed studio config
 
@@ -272,6 +370,7 @@ def apply_color_conversion(
         from_transform: The transform to convert from
         to_transform: The transform to convert to
         color_config: The colour config to use for the conversion
+        in_place: Whether to write the converted pixels back into the given image buffer rather than a new one
 
     Returns: The converted image buffer
 
@@ -282,10 +381,64 @@ def apply_color_conversion(
     image = image_buf_to_np_array(image_buffer)
     apply_color_converstion_to_np_array(image, from_transform, to_transform,
                                         color_config)
+    if in_place:
+        return update_image_buf_from_np_array(image_buffer, image)
     converted_buffer = img_buf_from_numpy_array(image)
     return converted_buffer
 
 
+def apply_color_conversion_to_buffers(
+        image_buffers: List[Oiio.ImageBuf],
+        from_transform: str,
+        to_transform: str,
+        color_config: Union[str, None] = None) -> List[Oiio.ImageBuf]:
+    """ Applies a colour conversion to all the given image buffers from and to the given transforms.
+
+    Buffers which are filled with a single colour, such as the sample and reference swatches, are converted together
+    as one array of colours, so we run a single conversion however many buffers there are, and then fill new buffers
+    with the converted colours. Any other buffers are converted individually via apply_color_conversion
+
+    Args:
+        image_buffers: The image buffers to convert
+        from_transform: The transform to convert from
+        to_transform: The transform to convert to
+        color_config: The colour config to use for the conversion
+
+    Returns: The converted image buffers, in the same order as the given buffers
+
+    """
+    if not color_config:
+        color_config = ResourceLoader.ocio_config_path()
+
+    converted_buffers = [None] * len(image_buffers)
+    solid_indexes = []
+    solid_colours = []
+    for count, image_buffer in enumerate(image_buffers):
+        colour_value = None
+        if image_buffer.spec().nchannels == 3:
+            colour_value = Oiio.ImageBufAlgo.isConstantColor(image_buffer)
+
+        if colour_value is None:
+            converted_buffers[count] = apply_color_conversion(
+                image_buffer, from_transform, to_transform, color_config=color_config
+            )
+            continue
+
+        solid_indexes.append(count)
+        solid_colours.append(colour_value)
+
+    if solid_colours:
+        colours = np.array(solid_colours, dtype=np.float32).reshape((len(solid_colours), 1, 3))
+        apply_color_converstion_to_np_array(colours, from_transform, to_transform, color_config)
+        for count, colour_value in zip(solid_indexes, colours):
+            spec = image_buffers[count].spec()
+            converted_buffer = Oiio.ImageBuf(Oiio.ImageSpec(spec.width, spec.height, 3, Oiio.FLOAT))
+            Oiio.ImageBufAlgo.fill(converted_buffer, colour_value[0].tolist())
+            converted_buffers[count] = converted_buffer
+
+    return converted_buffers
+
+
 def apply_color_converstion_to_np_array(
         image: np.array,
         from_transform: str,
@@ -306,10 +459,7 @@ def apply_color_converstion_to_np_array(
     if not os.path.exists(color_config):
         raise ValueError("Color config does not exist: " + color_config)
 
-    config = ocio.Config().CreateFromFile(color_config)
-    processor = config.getProcessor(from_transform,
-                                    to_transform)
-    cpu = processor.getDefaultCPUProcessor()
+    cpu = OcioProcessorCache.get_cpu_processor(color_config, from_transform, to_transform)
 
     # Ensure we only have float32 data to work with OCIO
     if image.dtype.name != "float32":
@@ -327,7 +477,8 @@ def apply_display_conversion(
         image_buffer: Oiio.ImageBuf,
         display: str,
         view: str,
-        color_config: Union[str, None] = None) -> Oiio.ImageBuf:
+        color_config: Union[str, None] = None,
+        in_place: bool = False) -> Oiio.ImageBuf:
     """ Applies a given display and view to the image_buffer using the inbuilt ocio config or the one provided
 
     Args:
@@ -335,6 +486,7 @@ def apply_display_conversion(
         display: The display we want to apply
         view: The view for the display we want to apply
         color_config: The colour config to use for the conversion
+        in_place: Whether to write the converted pixels back into the given image buffer rather than a new one
 
     Returns: The converted image buffer
 
@@ -344,6 +496,8 @@ def apply_display_conversion(
 
     image = image_buf_to_np_array(image_buffer)
     apply_display_conversion_to_np_array(image, display, view, color_config)
+    if in_place:
+        return update_image_buf_from_np_array(image_buffer, image)
     converted_buffer = img_buf_from_numpy_array(image)
 
     return converted_buffer
@@ -367,10 +521,7 @@ def apply_display_conversion_to_np_array(
     if not color_config:
         color_config = ResourceLoader.ocio_config_path()
 
-    config = ocio.Config().CreateFromFile(color_config)
-    processor = config.getProcessor(ocio.ROLE_SCENE_LINEAR, display, view,
-                                    ocio.TRANSFORM_DIR_FORWARD)
-    cpu = processor.getDefaultCPUProcessor()
+    cpu = OcioProcessorCache.get_display_cpu_processor(color_config, display, view)
     cpu.applyRGB(image)
 
 
@@ -520,6 +671,46 @@ def resize_image(image: Oiio.ImageBuf, width: int, height: int) -> Oiio.ImageBuf
     return resized_image
 
 
+def create_proxy(image: Oiio.ImageBuf, factor: int) -> Oiio.ImageBuf:
+    """ Creates a proxy of the image which is downscaled by the given factor, with each proxy pixel being the average
+        of the pixels it covers. The data window of the proxy is scaled along with the image
+
+    Args:
+        image: The image to create the proxy from
+        factor: The factor to downscale the image by
+
+    Returns: The downscaled proxy image
+    """
+    spec = image.spec()
+    x_begin = spec.x // factor
+    y_begin = spec.y // factor
+    x_end = -(-(spec.x + spec.width) // factor)
+    y_end = -(-(spec.y + spec.height) // factor)
+
+    proxy_image = Oiio.ImageBuf()
+    res = Oiio.ImageBufAlgo.resize(
+        proxy_image, image, "box", 0, Oiio.ROI(x_begin, x_end, y_begin, y_end, 0, 1, 0, spec.nchannels)
+    )
+    if not res:
+        raise ValueError("Failed to create proxy image buffer: " + proxy_image.geterror())
+    return proxy_image
+
+
+def scale_roi(roi: list, factor: int) -> list:
+    """ Scales the region of interest down by the given factor, so it covers the same area within a proxy image,
+        the region is expanded outwards to whole pixels
+
+    Args:
+        roi: The region of interest to scale as [left, right, top, bottom]
+        factor: The factor the proxy image is downscaled by
+
+    Returns: The scaled region of interest
+    """
+    if factor <= 1:
+        return roi
+    return [roi[0] // factor, -(-roi[1] // factor), roi[2] // factor, -(-roi[3] // factor)]
+
+
 def list_to_roi(roi: list) -> Oiio.ROI:
     """ Converts a list to an Oiio.ROI
 
@@ -748,14 +939,29 @@ def sample_image(img_buf: Oiio.ImageBuf) -> List:
     Returns: The average RGB values of the image
 
     """
-    img_array = image_buf_to_np_array(img_buf)
-    result = [
-        compute_clipped_mean(img_array, 0, sigma=3),
-        compute_clipped_mean(img_array, 1, sigma=3),
-        compute_clipped_mean(img_array, 2, sigma=3),
-    ]
+    roi = img_buf.roi
+    rows = max(1, SAMPLE_TILE_PIXELS // max(1, roi.width))
+
+    def tiles():
+        # Read the image in bands of rows, so we never hold a copy of the whole image
+        for start in range(roi.ybegin, roi.yend, rows):
+            yield img_buf.get_pixels(Oiio.FLOAT, Oiio.ROI(
+                roi.xbegin, roi.xend, start, min(start + rows, roi.yend), roi.zbegin, roi.zend, 0, 3
+            ))
 
-    return result
+    return _compute_clipped_means_of_tiles(tiles, sigma=3)
+
+
+def sample_np_array(img_array: np.array) -> List:
+    """ Samples the given image array and returns the average RGB values based on the clipped mean value
+
+    Args:
+        img_array: The image array to sample
+
+    Returns: The average RGB values of the image
+
+    """
+    return compute_clipped_means(img_array, sigma=3)
 
 
 def get_average_value_above_average(img_buf: Oiio.ImageBuf) -> Tuple[
@@ -866,6 +1072,83 @@ def detect_green(values: np.array, colour_space: str = "ACES2065-1") -> bool:
     return False
 
 
+def compute_clipped_means(image: np.array, sigma: int = 3, tile_pixels: int = SAMPLE_TILE_PIXELS) -> List[float]:
+    """ Computes the mean of the red, green and blue channels after clipping the outliers using standard deviation,
+        equivalent to calling compute_clipped_mean for each channel.
+
+        All the channels are computed together, in bands of rows of the image, using masked reductions rather than
+        gathering the clipped pixels, so the temporary memory is bound by the size of a band and not the image
+
+    Args:
+        image: The image we want to get clipped means from
+        sigma: the multiplier for the standard deviation for the clipping
+        tile_pixels: the number of pixels in each band of rows we process at once
+
+    Returns: The average value of each channel after clipping the outliers
+
+    """
+    rows = max(1, tile_pixels // max(1, image.shape[1]))
+
+    def tiles():
+        for start in range(0, image.shape[0], rows):
+            yield image[start:start + rows, :, :3]
+
+    return _compute_clipped_means_of_tiles(tiles, sigma=sigma)
+
+
+def _compute_clipped_means_of_tiles(tiles, sigma: int = 3) -> List[float]:
+    """ Computes the clipped mean of the red, green and blue channels of an image provided in tiles of rows. The
+        tiles are iterated twice, first to compute the mean and standard deviation, combining the statistics of each
+        tile, then to compute the mean of the pixels within the clipping bounds
+
+    Args:
+        tiles: A callable returning an iterator over the (rows, width, 3) tiles of the image
+        sigma: the multiplier for the standard deviation for the clipping
+
+    Returns: The average value of each channel after clipping the outliers
+
+    """
+    def channel_tiles():
+        # Each tile is laid out per channel, so every reduction runs over contiguous memory for all the channels
+        for tile in tiles():
+            if tile.size:
+                yield np.ascontiguousarray(tile.reshape(-1, 3).T)
+
+    count = 0
+    mean_val = np.zeros(3)
+    sum_squares = np.zeros(3)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for tile in channel_tiles():
+            tile_count = tile.shape[1]
+            tile_mean = tile.mean(axis=1)
+            deviations = tile - tile_mean[:, None]
+            tile_sum_squares = np.einsum("ij,ij->i", deviations, deviations)
+
+            # Combine the statistics of the tile with those of the previous tiles
+            total = count + tile_count
+            delta = tile_mean - mean_val
+            mean_val = mean_val + delta * (tile_count / total)
+            sum_squares = sum_squares + tile_sum_squares + delta ** 2 * (count * tile_count / total)
+            count = total
+
+        if not count:
+            return [float("nan")] * 3
+
+        std_dev = np.sqrt(sum_squares / count)
+        lower_bound = (mean_val - sigma * std_dev).astype(np.float32)[:, None]
+        upper_bound = (mean_val + sigma * std_dev).astype(np.float32)[:, None]
+
+        clipped_sum = np.zeros(3)
+        clipped_count = np.zeros(3)
+        for tile in channel_tiles():
+            mask = tile >= lower_bound
+            mask &= tile <= upper_bound
+            clipped_sum += np.sum(tile, axis=1, where=mask)
+            clipped_count += np.count_nonzero(mask, axis=1)
+
+        return (clipped_sum / clipped_count).tolist()
+
+
 def compute_clipped_mean(image: np.array, channel_idx: int, sigma: int = 3):
     """ Computes the mean of the given channel after clipping the outliers using standard deviation
 
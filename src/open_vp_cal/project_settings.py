@@ -23,7 +23,7 @@ from pathlib import Path
 from typing import Dict, List
 
 import open_vp_cal
-from open_vp_cal.core import constants
+from open_vp_cal.core import constants, utils
 from open_vp_cal.led_wall_settings import LedWallSettings
 
 
@@ -90,6 +90,7 @@ class ProjectSettings:
             value: The dictionary for the custom primaries
         """
         self._project_settings[constants.ProjectSettingsKeys.PROJECT_CUSTOM_PRIMARIES] = value
+        utils.ColourSpaceCache.clear_colour_spaces()
 
     def add_custom_primary(self, name: str, primaries: List[float]):
         """ Adds a custom primary to the project
@@ -102,6 +103,7 @@ class ProjectSettings:
             raise ValueError(f'Custom primary {name} already exists')
 
         self._project_settings[constants.ProjectSettingsKeys.PROJECT_CUSTOM_PRIMARIES][name] = primaries
+        utils.ColourSpaceCache.clear_colour_spaces()
 
     @property
     def file_format(self) -> constants.FileFormats:
@@ -253,7 +253,7 @@ class SwatchViewer(QWidget):
                             exposure_scaling_factor = led_wall.processing_results.pre_calibration_results[
                                 constants.Results.EXPOSURE_SCALING_FACTOR]
 
-                    sp_np = sp_np / exposure_scaling_factor
+                    sp_np /= exposure_scaling_factor
 
                     if apply_white_balance_checked and led_wall.processing_results:
                         white_balance_matrix = None
@@ -275,19 +275,19 @@ class SwatchViewer(QWidget):
                                 camera_conversion_cat = constants.CAT.CAT_BRADFORD
 
                             # Convert the samples from working to camera native gamut
-                            sp_np = colour.RGB_to_RGB(
-                                sp_np, working_cs, native_camera_gamut_cs, camera_conversion_cat
-                            )
+                            sp_np = ca.vector_dot(core_utils.ColourSpaceCache.matrix_RGB_to_RGB(
+                                working_cs, native_camera_gamut_cs, camera_conversion_cat
+                            ), sp_np)
 
                             # Apply the white balance matrix
-                            sp_np = [ca.vector_dot(white_balance_matrix, m) for m in sp_np]
+                            sp_np = ca.vector_dot(white_balance_matrix, sp_np)
 
                             # Convert the samples from camera native gamut to working
-                            sp_np = colour.RGB_to_RGB(
-                                sp_np, native_camera_gamut_cs, working_cs, camera_conversion_cat
-                            )
+                            sp_np = ca.vector_dot(core_utils.ColourSpaceCache.matrix_RGB_to_RGB(
+                                native_camera_gamut_cs, working_cs, camera_conversion_cat
+                            ), sp_np)
 
-                    sp_np = sp_np.astype(np.float32)
+                    sp_np = np.asarray(sp_np, dtype=np.float32)
 
                     # Calibration Is Applied
                     if led_wall.processing_results:
@@ -308,12 +308,12 @@ class SwatchViewer(QWidget):
                         rf_np /= (led_wall.target_max_lum_nits * 0.01)
 
                     # Expose up the array linearly
-                    sp_np_exposed = sp_np * (2.0 ** exposure_slider_value)
-                    rf_np_exposed = rf_np * (2.0 ** exposure_slider_value)
+                    sp_np *= (2.0 ** exposure_slider_value)
+                    rf_np *= (2.0 ** exposure_slider_value)
 
                     # Convert back to an image buffer and convert to srgb for display
-                    exposed_sp_buffer = imaging_utils.img_buf_from_numpy_array(sp_np_exposed)
-                    exposed_rf_buffer = imaging_utils.img_buf_from_numpy_array(rf_np_exposed)
+                    exposed_sp_buffer = imaging_utils.img_buf_from_numpy_array(sp_np)
+                    exposed_rf_buffer = imaging_utils.img_buf_from_numpy_array(rf_np)
 
                     sample_buffers_processed.append(exposed_sp_buffer)
                     reference_buffers_processed.append(exposed_rf_buffer)
@@ -330,7 +330,7 @@ class SwatchViewer(QWidget):
 
                 # Convert To Display
                 exposed_display_buffer = imaging_utils.apply_display_conversion(
-                    sample_swatch_nested, display_transform, view_transform
+                    sample_swatch_nested, display_transform, view_transform, in_place=True
                 )
 
                 # Add Text Label Above Each Strip
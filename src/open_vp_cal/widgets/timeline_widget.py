@@ -199,9 +199,11 @@ class TimelineLoader(SequenceLoader):
         SequenceLoader.__init__(self, led_wall_settings)
         self.frame_class = PixMapFrame
 
-    def _load_and_cache(self, frame):
-        super()._load_and_cache(frame)
-        self.cache[frame].load_pixmap()
+    def _load_and_cache(self, frame, read_pixels=False, roi=None, proxy_factor=1):
+        result = super()._load_and_cache(frame, read_pixels=read_pixels, roi=roi, proxy_factor=proxy_factor)
+        if not roi and proxy_factor <= 1:
+            result.load_pixmap()
+        return result
 
 
 class TimelineWidget(LockableWidget):
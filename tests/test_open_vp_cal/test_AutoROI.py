@@ -0,0 +1,154 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import logging
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+from open_vp_cal.core.utils import clamp
+from open_vp_cal.framework.auto_roi import AutoROI, AutoROIResults
+from open_vp_cal.imaging import imaging_utils
+
+# The benchmarks only report their timings, and are skipped unless this environment variable is set to 1
+RUN_BENCHMARKS = os.environ.get("OPEN_VP_CAL_BENCHMARKS", "0") == "1"
+
+
+def reference_detect_roi_pixels(image_buf) -> AutoROIResults:
+    """ The original per pixel implementation of the roi detection, which the vectorised detection must match
+    """
+    results = AutoROIResults()
+    pixel_buffer = 5
+    detection_threshold = 1.7
+    for y_pos in range(image_buf.spec().height):
+        for x_pos in range(image_buf.spec().width):
+            pixel = image_buf.getpixel(x_pos, y_pos)
+            red = clamp(pixel[0], 0, sys.float_info.max)
+            green = clamp(pixel[1], 0, sys.float_info.max)
+            blue = clamp(pixel[2], 0, sys.float_info.max)
+
+            if red > results.red_value:
+                if red > max(green, blue) * detection_threshold:
+                    results.red_pixel = (x_pos + pixel_buffer, y_pos + pixel_buffer)
+                    results.red_value = red
+
+            if green > results.green_value:
+                if green > max(red, blue) * detection_threshold:
+                    results.green_pixel = (x_pos - pixel_buffer, y_pos + pixel_buffer)
+                    results.green_value = green
+
+            if blue > results.blue_value:
+                if blue > max(red, green) * detection_threshold:
+                    results.blue_pixel = (x_pos + pixel_buffer, y_pos - pixel_buffer)
+                    results.blue_value = blue
+
+            white = (red + green + blue) / 3
+            if white > results.white_value:
+                results.white_pixel = (x_pos - pixel_buffer, y_pos - pixel_buffer)
+                results.white_value = white
+    return results
+
+
+class TestAutoROI(unittest.TestCase):
+    @staticmethod
+    def create_roi_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+        """ Creates a noisy image with a red, green, blue and white marker in each corner of the roi
+        """
+        rng = np.random.default_rng(seed)
+        pixels = rng.random((height, width, 3), dtype=np.float32) * 0.2
+        pixels[height // 8, width // 8] = [4.0, 0.5, 0.5]
+        pixels[height // 8, width - width // 8] = [0.5, 4.0, 0.5]
+        pixels[height - height // 8, width // 8] = [0.5, 0.5, 4.0]
+        pixels[height - height // 8, width - width // 8] = [5.0, 5.0, 5.0]
+        return pixels
+
+    def assert_results_equal(self, expected: AutoROIResults, actual: AutoROIResults):
+        for name in ["red", "green", "blue", "white"]:
+            self.assertEqual(getattr(expected, f"{name}_pixel"), getattr(actual, f"{name}_pixel"), name)
+            self.assertEqual(getattr(expected, f"{name}_value"), getattr(actual, f"{name}_value"), name)
+        self.assertEqual(expected.roi, actual.roi)
+
+    def test_detect_roi_pixels_matches_reference(self):
+        image_buf = imaging_utils.img_buf_from_numpy_array(self.create_roi_image(96, 54))
+        expected = reference_detect_roi_pixels(image_buf)
+        actual = AutoROI.detect_roi_pixels(image_buf)
+        self.assert_results_equal(expected, actual)
+        self.assertEqual(actual.roi, [17, 79, 11, 43])
+
+    def test_detect_roi_pixels_ties_and_invalid_values(self):
+        pixels = np.zeros((40, 30, 3), dtype=np.float32)
+        pixels[5, 3] = [2.0, 0.0, 0.0]
+        pixels[7, 1] = [2.0, 0.0, 0.0]
+        pixels[9, 9] = [np.nan, 1.0, -3.0]
+        pixels[12, 4] = [np.inf, 0.0, 0.0]
+        pixels[30, 20] = [-np.inf, np.inf, np.inf]
+        pixels[35, 25] = [0.0, 0.0, 1.0]
+
+        image_buf = imaging_utils.img_buf_from_numpy_array(pixels)
+        self.assert_results_equal(reference_detect_roi_pixels(image_buf), AutoROI.detect_roi_pixels(image_buf))
+
+    def test_detect_roi_pixels_across_bands(self):
+        band_height = AutoROI.band_height
+        try:
+            AutoROI.band_height = 7
+            for seed in range(3):
+                pixels = self.create_roi_image(48, 40, seed=seed)
+                pixels[20, 5] = pixels[5, 6]
+                image_buf = imaging_utils.img_buf_from_numpy_array(pixels)
+                self.assert_results_equal(
+                    reference_detect_roi_pixels(image_buf), AutoROI.detect_roi_pixels(image_buf)
+                )
+        finally:
+            AutoROI.band_height = band_height
+
+    def test_detect_roi_pixels_no_colour_detected(self):
+        image_buf = imaging_utils.img_buf_from_numpy_array(np.full((10, 10, 3), 0.5, dtype=np.float32))
+        results = AutoROI.detect_roi_pixels(image_buf)
+        self.assert_results_equal(reference_detect_roi_pixels(image_buf), results)
+        self.assertIsNone(results.red_pixel)
+        self.assertFalse(results.is_valid)
+
+    def test_detect_roi_pixels_matches_reference_large(self):
+        image_buf = imaging_utils.img_buf_from_numpy_array(self.create_roi_image(480, 270))
+        self.assert_results_equal(reference_detect_roi_pixels(image_buf), AutoROI.detect_roi_pixels(image_buf))
+
+    @unittest.skipUnless(RUN_BENCHMARKS, "Set OPEN_VP_CAL_BENCHMARKS=1 to run the benchmarks")
+    def test_benchmark_detect_roi_pixels(self):
+        image_buf = imaging_utils.img_buf_from_numpy_array(self.create_roi_image(480, 270))
+
+        start = time.perf_counter()
+        expected = reference_detect_roi_pixels(image_buf)
+        reference_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = AutoROI.detect_roi_pixels(image_buf)
+        vectorised_duration = time.perf_counter() - start
+
+        logging.getLogger(__name__).info(
+            "AutoROI 480x270: per pixel %.3fs, vectorised %.4fs, speedup %.0fx",
+            reference_duration, vectorised_duration, reference_duration / vectorised_duration
+        )
+        self.assert_results_equal(expected, actual)
+
+    def test_detect_roi_pixels_on_proxy(self):
+        image_buf = imaging_utils.img_buf_from_numpy_array(self.create_roi_image(256, 144))
+        expected = AutoROI.detect_roi_pixels(image_buf)
+        proxy_results = AutoROI.detect_roi_pixels(imaging_utils.create_proxy(image_buf, 4), scale=4)
+        self.assertTrue(proxy_results.is_valid)
+        for expected_edge, proxy_edge in zip(expected.roi, proxy_results.roi):
+            self.assertLessEqual(abs(expected_edge - proxy_edge), 4)
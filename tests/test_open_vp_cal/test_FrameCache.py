@@ -0,0 +1,114 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+
+import OpenImageIO as oiio
+
+from open_vp_cal.core import constants
+from open_vp_cal.framework.frame import Frame
+from open_vp_cal.framework.frame_cache import FrameCache, FrameCacheBudget
+from test_open_vp_cal.test_utils import TestBase
+
+
+class TestFrameCache(TestBase):
+    def create_frame(self, frame_num: int) -> Frame:
+        """ Creates a 10x10 RGB half float frame which is 600 bytes in size
+        """
+        frame = Frame(self.project_settings)
+        frame.frame_num = frame_num
+        frame.image_buf = oiio.ImageBuf(oiio.ImageSpec(10, 10, 3, oiio.HALF))
+        return frame
+
+    def test_frame_size_bytes(self):
+        self.assertEqual(FrameCache.frame_size_bytes(self.create_frame(0)), 600)
+        self.assertEqual(FrameCache.frame_size_bytes(None), 0)
+
+    def test_eviction(self):
+        cache = FrameCache(max_bytes=1800)
+        for frame_num in range(3):
+            cache[frame_num] = self.create_frame(frame_num)
+        self.assertEqual(cache.current_bytes, 1800)
+        self.assertEqual(cache.stats.evictions, 0)
+
+        # Touch frame 0 so that frame 1 becomes the least recently used
+        self.assertIsNotNone(cache.get(0))
+        cache[3] = self.create_frame(3)
+
+        self.assertNotIn(1, cache)
+        self.assertIn(0, cache)
+        self.assertIn(3, cache)
+        self.assertEqual(cache.current_bytes, 1800)
+        self.assertEqual(cache.stats.evictions, 1)
+        self.assertEqual(cache.stats.evicted_bytes, 600)
+
+    def test_hits_and_misses(self):
+        cache = FrameCache(max_bytes=1800)
+        cache[0] = self.create_frame(0)
+        cache.get(0)
+        cache.get(1)
+        with self.assertRaises(KeyError):
+            _ = cache[2]
+        self.assertEqual(cache.stats.hits, 1)
+        self.assertEqual(cache.stats.misses, 2)
+
+    def test_most_recent_frame_kept_when_over_budget(self):
+        cache = FrameCache(max_bytes=100)
+        cache[0] = self.create_frame(0)
+        cache[1] = self.create_frame(1)
+        self.assertEqual(len(cache), 1)
+        self.assertIn(1, cache)
+
+    def test_reduce_max_bytes(self):
+        cache = FrameCache(max_bytes=1800)
+        for frame_num in range(3):
+            cache[frame_num] = self.create_frame(frame_num)
+        cache.max_bytes = 600
+        self.assertEqual(len(cache), 1)
+        self.assertIn(2, cache)
+        self.assertEqual(cache.current_bytes, 600)
+
+    def test_default_max_bytes_from_environment(self):
+        os.environ[constants.OPEN_VP_CAL_FRAME_CACHE_MB] = "2"
+        try:
+            self.assertEqual(FrameCacheBudget().max_bytes, 2 * 1024 * 1024)
+        finally:
+            del os.environ[constants.OPEN_VP_CAL_FRAME_CACHE_MB]
+
+    def test_shared_budget(self):
+        budget = FrameCacheBudget(max_bytes=1800)
+        caches = [FrameCache(budget=budget), FrameCache(budget=budget)]
+        caches[0][0] = self.create_frame(0)
+        caches[1][0] = self.create_frame(0)
+        caches[0][1] = self.create_frame(1)
+        self.assertEqual(budget.current_bytes, 1800)
+
+        # Touch the first frame of the second cache, so the first frame of the first cache is the least recently used
+        # across both caches, and is evicted by a frame added to the second cache
+        self.assertIsNotNone(caches[1].get(0))
+        caches[1][1] = self.create_frame(1)
+        self.assertNotIn(0, caches[0])
+        self.assertEqual(caches[0].stats.evictions, 1)
+        self.assertEqual([len(cache) for cache in caches], [1, 2])
+        self.assertEqual(budget.current_bytes, 1800)
+
+        # The frames of a cache are released from the budget once it is garbage collected
+        del caches[1]
+        self.assertEqual(budget.current_bytes, 600)
+
+    def test_default_budget_shared_by_process(self):
+        self.assertIs(FrameCache().budget, FrameCacheBudget.shared())
+        self.assertIs(FrameCache().budget, FrameCache().budget)
+        self.assertIsNot(FrameCache(max_bytes=600).budget, FrameCacheBudget.shared())
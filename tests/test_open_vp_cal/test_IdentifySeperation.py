@@ -14,9 +14,17 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from test_open_vp_cal.test_utils import TestProcessorBase
+import os
+from unittest import mock
 
-from open_vp_cal.framework.identify_separation import IdentifySeparation
+import numpy as np
+from scipy.signal import find_peaks
+
+from test_open_vp_cal.test_utils import TestProcessorBase, TestBase
+
+from open_vp_cal.core import constants
+from open_vp_cal.framework.identify_separation import IdentifySeparation, PeakDetector
+from open_vp_cal.imaging import imaging_utils
 
 
 class TestIdentifySeparation(TestProcessorBase):
@@ -27,3 +35,63 @@ class TestIdentifySeparation(TestProcessorBase):
         self.assertEqual(results.first_green_frame.frame_num, 78)
         self.assertEqual(results.separation, 5)
 
+
+class TestPeakDetector(TestBase):
+    def test_matches_find_peaks(self):
+        rng = np.random.default_rng(0)
+        # Rounding the values gives us flat topped peaks as well as single value peaks
+        values = np.round(rng.random(500) * 4).tolist()
+        peak_detector = PeakDetector(height=1)
+        for idx, value in enumerate(values):
+            peaks = peak_detector.add(value)
+            expected, _ = find_peaks(np.array(values[:idx + 1]), height=1)
+            self.assertEqual(peaks, expected.tolist())
+
+
+class TestIdentifySeparationCoarseToFine(TestBase):
+    def setUp(self):
+        super(TestIdentifySeparationCoarseToFine, self).setUp()
+        sequence_folder = os.path.join(self.get_test_output_folder(), "separation_sequence")
+        os.makedirs(sequence_folder)
+        patches = [([0.25, 0.25, 0.25], 150), ([1, 0.05, 0.05], 5), ([0.05, 1, 0.05], 5), ([0.05, 0.05, 1], 5),
+                   ([0.25, 0.25, 0.25], 5), ([1, 1, 1], 30)]
+        frame_num = 0
+        for colour, num_frames in patches:
+            image_buf = imaging_utils.new_image(32, 18, colour)
+            for _ in range(num_frames):
+                imaging_utils.write_image(
+                    image_buf, os.path.join(sequence_folder, f"separation.{frame_num:04d}.exr"), "half"
+                )
+                frame_num += 1
+
+        self.led_wall.roi = [0, 32, 0, 18]
+        self.led_wall.sequence_loader.set_prefetch_depth(0)
+        self.led_wall.sequence_loader.load_sequence(sequence_folder)
+
+    def run_separation(self, coarse_step: int):
+        sequence_loader = self.led_wall.sequence_loader
+        sequence_loader.cache.clear()
+        sequence_loader.set_current_frame(sequence_loader.start_frame)
+        with mock.patch.object(sequence_loader, "_load_frame", wraps=sequence_loader._load_frame) as load_frame:
+            results = IdentifySeparation(self.led_wall, coarse_step=coarse_step).run()
+        return results, load_frame.call_count
+
+    def test_coarse_to_fine_matches_linear_search(self):
+        linear_results, linear_loads = self.run_separation(1)
+        self.assertEqual(linear_results.first_red_frame.frame_num, 150)
+        self.assertEqual(linear_results.first_green_frame.frame_num, 155)
+
+        results, loads = self.run_separation(4)
+        self.assertEqual(results.first_red_frame.frame_num, 150)
+        self.assertEqual(results.first_green_frame.frame_num, 155)
+        self.assertEqual(results.separation, 5)
+        self.assertLess(loads, linear_loads / 2)
+
+    def test_coarse_to_fine_with_proxies(self):
+        sequence_loader = self.led_wall.sequence_loader
+        results = IdentifySeparation(self.led_wall, coarse_step=4, proxy_factor=4).run()
+        self.assertEqual(results.first_red_frame.frame_num, 150)
+        self.assertEqual(results.first_green_frame.frame_num, 155)
+        # Only the frames at the peaks are read at full resolution
+        self.assertIn((152, constants.PROXY, 4), sequence_loader.cache)
+        self.assertNotIn(152, sequence_loader.cache)
@@ -0,0 +1,85 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import threading
+from unittest import mock
+
+from open_vp_cal.application_base import OpenVPCalBase
+from open_vp_cal.core import constants
+from open_vp_cal.framework.processing import SeparationException
+from test_open_vp_cal.test_utils import TestBase
+
+
+class FakeProcessing:
+    """ Records the order the processing steps are run in for each wall
+    """
+    events = []
+    sampling_barrier = None
+
+    def __init__(self, led_wall):
+        self.led_wall = led_wall
+
+    def run_sampling(self, generate_swatches=True):
+        # Every wall must be sampling at the same time to pass the barrier
+        FakeProcessing.sampling_barrier.wait(timeout=5)
+        FakeProcessing.events.append(("sample", self.led_wall.name, generate_swatches))
+        if self.led_wall.name == "fail":
+            raise SeparationException("Separation failed")
+
+    def generate_sample_swatches(self):
+        FakeProcessing.events.append(("swatches", self.led_wall.name))
+
+    def analyse(self):
+        FakeProcessing.events.append(("analyse", self.led_wall.name))
+
+
+class TestOpenVPCalBase(TestBase):
+    def setUp(self):
+        super(TestOpenVPCalBase, self).setUp()
+        FakeProcessing.events = []
+        self.reference_wall = self.add_led_wall("reference")
+        self.matched_wall = self.add_led_wall("matched")
+        self.matched_wall.match_reference_wall = True
+        self.matched_wall.reference_wall = self.reference_wall
+
+    def add_led_wall(self, name):
+        led_wall = self.project_settings.add_led_wall(name)
+        led_wall.native_camera_gamut = constants.CameraColourSpace.ARRI_WIDE_GAMUT_4
+        return led_wall
+
+    def analyse(self, led_walls):
+        FakeProcessing.sampling_barrier = threading.Barrier(len(led_walls))
+        with mock.patch("open_vp_cal.application_base.Processing", FakeProcessing):
+            return OpenVPCalBase().analyse(led_walls)
+
+    def test_analyse_samples_concurrently_then_analyses_in_reference_order(self):
+        self.assertTrue(self.analyse([self.matched_wall, self.reference_wall]))
+
+        sample_events = FakeProcessing.events[:2]
+        self.assertCountEqual(sample_events, [("sample", "matched", False), ("sample", "reference", False)])
+        self.assertEqual(FakeProcessing.events[2:], [
+            ("swatches", "reference"), ("analyse", "reference"),
+            ("swatches", "matched"), ("analyse", "matched"),
+        ])
+
+    def test_analyse_separation_failure(self):
+        failing_wall = self.add_led_wall("fail")
+        base = OpenVPCalBase()
+        FakeProcessing.sampling_barrier = threading.Barrier(2)
+        with mock.patch("open_vp_cal.application_base.Processing", FakeProcessing):
+            self.assertFalse(base.analyse([self.reference_wall, failing_wall]))
+
+        self.assertEqual(base.error_messages(), ["fail\nSeparation failed"])
+        self.assertNotIn("analyse", [event[0] for event in FakeProcessing.events])
@@ -0,0 +1,63 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+
+import numpy as np
+
+from open_vp_cal.framework.pattern_cache import PatternCache
+from test_open_vp_cal.test_utils import TestBase
+
+
+class TestPatternCache(TestBase):
+    def test_key(self):
+        inputs = {"patch_name": "RED_PRIMARY", "patch_values": [0.18, 0.0, 0.0], "resolution": (3840, 2160)}
+        self.assertEqual(PatternCache.key(inputs), PatternCache.key(dict(reversed(list(inputs.items())))))
+        self.assertEqual(PatternCache.key(inputs), PatternCache.key(dict(inputs, patch_values=np.array([0.18, 0, 0]))))
+        self.assertNotEqual(PatternCache.key(inputs), PatternCache.key(dict(inputs, patch_values=[0.18, 0.0, 1e-9])))
+
+    def test_store_and_get(self):
+        cache = PatternCache(os.path.join(self.get_test_output_folder(), "pattern_cache"))
+        key = PatternCache.key({"patch_name": "RED_PRIMARY"})
+        self.assertIsNone(cache.get(key, "exr"))
+
+        file_path = os.path.join(self.get_test_output_folder(), "frame.exr")
+        with open(file_path, "wb") as handle:
+            handle.write(b"pattern")
+        cache.store(key, file_path, "exr")
+
+        cached_file_path = cache.get(key, "exr")
+        self.assertEqual(cached_file_path, cache.file_path(key, "exr"))
+        self.assertIsNone(cache.get(key, "dpx"))
+        with open(cached_file_path, "rb") as handle:
+            self.assertEqual(handle.read(), b"pattern")
+        self.assertEqual(os.listdir(cache.folder_path), [os.path.basename(cached_file_path)])
+
+    def test_prune(self):
+        cache = PatternCache(os.path.join(self.get_test_output_folder(), "pattern_cache"), max_bytes=20)
+        keys = [PatternCache.key({"patch_name": str(index)}) for index in range(4)]
+        for index, key in enumerate(keys):
+            file_path = os.path.join(self.get_test_output_folder(), f"frame{index}.exr")
+            with open(file_path, "wb") as handle:
+                handle.write(b"0123456789")
+            cache.store(key, file_path, "exr")
+            os.utime(cache.file_path(key, "exr"), ns=(index, index))
+
+        # Using an entry makes it the most recently used, so the oldest unreferenced entries are pruned first
+        self.assertIsNotNone(cache.get(keys[1], "exr"))
+        cache.prune([keys[0]])
+        self.assertEqual(
+            sorted(os.listdir(cache.folder_path)), sorted(f"{key}.exr" for key in [keys[0], keys[1]])
+        )
@@ -0,0 +1,86 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from open_vp_cal.core import constants
+from open_vp_cal.framework.sample_executor import SampleExecutor, ProcessSampleExecutor
+from open_vp_cal.imaging import imaging_utils
+
+
+class TestSampleExecutor(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.sections = [
+            imaging_utils.img_buf_from_numpy_array(rng.random((16, 24, 3), dtype=np.float32) + count)
+            for count in range(4)
+        ]
+        self.expected = [imaging_utils.sample_image(section) for section in self.sections]
+
+    def tearDown(self):
+        SampleExecutor.set_default(None)
+
+    def test_map_preserves_order(self):
+        executor = SampleExecutor(max_workers=3)
+        try:
+            self.assertEqual(executor.map(lambda a, b: a * b, range(10), range(10)), [x * x for x in range(10)])
+        finally:
+            executor.shutdown()
+
+    def test_map_is_bounded(self):
+        executor = SampleExecutor(max_workers=2)
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def work(_):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        try:
+            executor.map(work, range(12))
+        finally:
+            executor.shutdown()
+        self.assertEqual(running[1], 2)
+
+    def test_sample_sections(self):
+        self.assertEqual(SampleExecutor().sample_sections(self.sections), self.expected)
+
+    def test_process_sample_sections(self):
+        executor = ProcessSampleExecutor(max_workers=2, max_processes=2)
+        try:
+            results = executor.sample_sections(self.sections)
+        finally:
+            executor.shutdown()
+        np.testing.assert_allclose(results, self.expected)
+
+    def test_default(self):
+        SampleExecutor.set_default(None)
+        with mock.patch.dict(os.environ, {constants.OPEN_VP_CAL_SAMPLE_EXECUTOR: constants.SAMPLE_EXECUTOR_PROCESS}):
+            self.assertIsInstance(SampleExecutor.default(), ProcessSampleExecutor)
+        self.assertIs(SampleExecutor.default(), SampleExecutor.default())
+
+        executor = SampleExecutor(max_workers=1)
+        SampleExecutor.set_default(executor)
+        self.assertIs(SampleExecutor.default(), executor)
@@ -15,13 +15,21 @@ limitations under the License.
 """
 
 import os
-from test_open_vp_cal.test_utils import TestProcessorBase
+import unittest
+from unittest import mock
+
+import colour
+import numpy as np
+
+from test_open_vp_cal.test_utils import TestProcessorBase, TestBase
 
 
 from open_vp_cal.framework.identify_separation import SeparationResults
-from open_vp_cal.framework.sample_patch import SamplePatch, SampleRampPatches
-from open_vp_cal.framework.frame import Frame
+from open_vp_cal.framework.sample_executor import SampleExecutor
+from open_vp_cal.framework.sample_patch import SamplePatch, SampleRampPatches, TemporalStack, MacBethSample
+from open_vp_cal.framework.frame import Frame, FrameDescriptor
 from open_vp_cal.core import constants
+from open_vp_cal.imaging import imaging_utils
 
 
 class TestSamplePatch(TestProcessorBase):
@@ -57,7 +65,7 @@ class TestSamplePatch(TestProcessorBase):
                     os.makedirs(output_folder)
 
                 output_path = os.path.join(output_folder, frame.file_name.replace(".exr", ".png"))
-                frame.image_buf.write(
+                frame.load_image_buf().write(
                     output_path
                 )
         return results
@@ -152,3 +160,205 @@ class TestSampleRampPatches(TestSamplePatch):
     def test_samples(self):
         self.check_samples()
 
+
+class TestSampleRampPatchesExecutor(TestBase):
+    def setUp(self):
+        super(TestSampleRampPatchesExecutor, self).setUp()
+        self.separation = 3
+        red_frame_num = 6
+        first_ramp_patch = (constants.PATCHES.get_patch_index(constants.PATCHES.EOTF_RAMPS) -
+                            constants.PATCHES.get_patch_index(constants.PATCHES.RED_PRIMARY_DESATURATED))
+        self.first_ramp_frame = red_frame_num + first_ramp_patch * self.separation
+        num_frames = self.first_ramp_frame + (self.led_wall.num_grey_patches + 1) * self.separation
+
+        sequence_folder = os.path.join(self.get_test_output_folder(), "ramp_sequence")
+        os.makedirs(sequence_folder)
+        for frame_num in range(num_frames):
+            value = self.patch_value(frame_num)
+            imaging_utils.write_image(
+                imaging_utils.new_image(8, 8, [value, value * 0.5, value * 0.25]),
+                os.path.join(sequence_folder, f"ramp.{frame_num:04d}.exr"), "float"
+            )
+        self.led_wall.roi = [0, 8, 0, 8]
+        self.led_wall.sequence_loader.load_sequence(sequence_folder)
+
+        self.separation_results = SeparationResults()
+        self.separation_results.first_red_frame = Frame(self.led_wall.project_settings)
+        self.separation_results.first_red_frame.frame_num = red_frame_num
+        self.separation_results.first_green_frame = Frame(self.led_wall.project_settings)
+        self.separation_results.first_green_frame.frame_num = red_frame_num + self.separation
+
+    def patch_value(self, frame_num: int) -> float:
+        return 0.01 * (frame_num // self.separation + 1)
+
+    def test_samples_on_executor(self):
+        executor = SampleExecutor(max_workers=2)
+        try:
+            results = SampleRampPatches(
+                self.led_wall, self.separation_results, constants.PATCHES.EOTF_RAMPS, executor=executor
+            ).run()
+        finally:
+            executor.shutdown()
+
+        self.assertEqual(len(results), self.led_wall.num_grey_patches + 1)
+        for patch_count, result in enumerate(results):
+            value = self.patch_value(self.first_ramp_frame + patch_count * self.separation)
+            self.assertEqual(len(result.frames), 1)
+            descriptor = result.frames[0]
+            self.assertIsInstance(descriptor, FrameDescriptor)
+            self.assertEqual(descriptor.frame_num, self.first_ramp_frame + patch_count * self.separation + 1)
+            self.assertEqual(descriptor.roi, self.led_wall.roi)
+            self.assertEqual(descriptor.samples, result.samples)
+            np.testing.assert_array_equal(
+                imaging_utils.image_buf_to_np_array(descriptor.load_image_buf()),
+                imaging_utils.image_buf_to_np_array(
+                    descriptor.load(self.led_wall.sequence_loader).extract_roi(descriptor.roi))
+            )
+            for expected, actual in zip([value, value * 0.5, value * 0.25], result.samples):
+                self.assertAlmostEqual(expected, actual, places=6)
+
+    def test_samples_temporal_stack(self):
+        results = SampleRampPatches(
+            self.led_wall, self.separation_results, constants.PATCHES.EOTF_RAMPS, temporal_stack=True
+        ).run()
+
+        self.assertEqual(len(results), self.led_wall.num_grey_patches + 1)
+        for patch_count, result in enumerate(results):
+            value = self.patch_value(self.first_ramp_frame + patch_count * self.separation)
+            self.assertEqual(len(result.frames), 1)
+            self.assertIsNone(result.frames[0].samples)
+            for expected, actual in zip([value, value * 0.5, value * 0.25], result.samples):
+                self.assertAlmostEqual(expected, actual, places=6)
+
+    def test_macbeth_detects_once_on_mean(self):
+        swatch_colours = np.full((24, 3), 0.5)
+        detection = mock.Mock(values=(swatch_colours, None, None))
+        with mock.patch.object(MacBethSample, "_detect_swatch_colours_in_mean",
+                               return_value=[swatch_colours]) as detect_in_mean, \
+                mock.patch("open_vp_cal.framework.sample_patch.detect_colour_checkers_segmentation",
+                           return_value=[detection]) as detect:
+            results = MacBethSample(self.led_wall, self.separation_results).run()
+
+        detect_in_mean.assert_called_once()
+        # The geometry of the mean is checked against a single full resolution frame
+        detect.assert_called_once()
+        value = self.patch_value(results[0].frames[0].frame_num)
+        np.testing.assert_allclose(detect_in_mean.call_args[0][0][0, 0], [value, value * 0.5, value * 0.25],
+                                   rtol=1e-6)
+        self.assertEqual(results[0].samples, swatch_colours.tolist())
+        self.assertIsInstance(results[0].frames[0], FrameDescriptor)
+
+    def test_macbeth_falls_back_to_per_frame_detection(self):
+        swatch_colours = np.full((24, 3), 0.5)
+        detection = mock.Mock(values=(swatch_colours, None, None))
+        with mock.patch.object(MacBethSample, "_detect_swatch_colours_in_mean", return_value=[]), \
+                mock.patch("open_vp_cal.framework.sample_patch.detect_colour_checkers_segmentation",
+                           return_value=[detection]) as detect:
+            results = MacBethSample(self.led_wall, self.separation_results).run()
+
+        detect.assert_called_once()
+        self.assertEqual(results[0].samples, swatch_colours.tolist())
+
+    def test_macbeth_falls_back_when_geometry_does_not_match(self):
+        swatch_colours = np.full((24, 3), 0.5)
+        detection = mock.Mock(values=(swatch_colours, None, None))
+        with mock.patch.object(MacBethSample, "_detect_swatch_colours_in_mean",
+                               return_value=[np.full((24, 3), 0.2)]), \
+                mock.patch("open_vp_cal.framework.sample_patch.detect_colour_checkers_segmentation",
+                           return_value=[detection]) as detect:
+            results = MacBethSample(self.led_wall, self.separation_results).run()
+
+        # Once for the reference frame, and once for each frame of the per frame detection
+        self.assertEqual(detect.call_count, 1 + len(results[0].frames))
+        self.assertEqual(results[0].samples, swatch_colours.tolist())
+
+
+class TestMacBethDetection(unittest.TestCase):
+    def setUp(self):
+        colour_checker = colour.CCS_COLOURCHECKERS["ColorChecker24 - After November 2014"]
+        self.swatch_colours = np.clip(colour.XYZ_to_sRGB(
+            colour.xyY_to_XYZ(np.array(list(colour_checker.data.values()))), apply_cctf_encoding=False
+        ), 0, 1)
+        self.image = self.chart_image(1920, 1080)
+
+    def chart_image(self, width: int, height: int, offset: int = 0) -> np.ndarray:
+        image = np.full((height, width, 3), 0.02, dtype=np.float32)
+        swatch_size = width // 12
+        gap = swatch_size // 8
+        for index, swatch_colour in enumerate(self.swatch_colours):
+            row, column = divmod(index, 6)
+            x = width // 4 + offset + column * (swatch_size + gap)
+            y = height // 6 + row * (swatch_size + gap)
+            image[y:y + swatch_size, x:x + swatch_size] = swatch_colour
+        return image
+
+    def test_detects_downscaled_and_samples_full_resolution(self):
+        samples = MacBethSample._detect_swatch_colours_in_mean(self.image)
+        self.assertEqual(len(samples), 1)
+        np.testing.assert_allclose(samples[0], self.swatch_colours, atol=1e-5)
+
+        reference_samples = MacBethSample._detect_swatch_colours_in_array(self.image)
+        self.assertTrue(MacBethSample._swatch_colours_match(samples, reference_samples))
+
+    def test_moving_chart_is_not_accepted(self):
+        moved_image = self.chart_image(1920, 1080, offset=200)
+        mean_image = (self.image + moved_image) / 2
+        samples = MacBethSample._detect_swatch_colours_in_mean(mean_image)
+        reference_samples = MacBethSample._detect_swatch_colours_in_array(moved_image)
+        self.assertFalse(MacBethSample._swatch_colours_match(samples, reference_samples))
+
+
+class TestTemporalStack(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frames = [rng.normal(0.5, 0.1, (6, 8, 3)).astype(np.float32) for _ in range(5)]
+
+    def test_mean_and_variance(self):
+        stack = TemporalStack()
+        for frame in self.frames:
+            stack.add(frame)
+
+        self.assertEqual(stack.count, 5)
+        np.testing.assert_allclose(stack.mean, np.mean(self.frames, axis=0), rtol=1e-6)
+        np.testing.assert_allclose(stack.variance, np.var(self.frames, axis=0), rtol=1e-5)
+
+        pooled = np.array(self.frames, dtype=np.float64).reshape(-1, 3)
+        pooled_mean, pooled_std = stack.pooled_mean_and_std()
+        np.testing.assert_allclose(pooled_mean, pooled.mean(axis=0), rtol=1e-6)
+        np.testing.assert_allclose(pooled_std, pooled.std(axis=0), rtol=1e-5)
+
+    def test_sample_clips_against_pooled_stack(self):
+        stack = TemporalStack()
+        for frame in self.frames:
+            frame = frame.copy()
+            frame[0, 0] = 10.0
+            stack.add(frame)
+
+        pooled = np.array([frame for frame in self.frames], dtype=np.float64)
+        pooled[:, 0, 0] = 10.0
+        pooled_mean = pooled.reshape(-1, 3).mean(axis=0)
+        pooled_std = pooled.reshape(-1, 3).std(axis=0)
+        pixel_means = pooled.mean(axis=0).reshape(-1, 3)
+        expected = []
+        for channel in range(3):
+            values = pixel_means[:, channel]
+            inside = values[np.abs(values - pooled_mean[channel]) <= 3 * pooled_std[channel]]
+            expected.append(inside.mean())
+
+        # The hot pixel is rejected, and every other pixel is kept, as their means lie well within the noise of
+        # the frames, where clipping the per pixel means against their own spread would reject some of them
+        samples = stack.sample()
+        np.testing.assert_allclose(samples, expected, rtol=1e-9)
+        np.testing.assert_allclose(samples, pixel_means[1:].mean(axis=0), rtol=1e-9)
+
+    def test_empty_stack(self):
+        stack = TemporalStack()
+        self.assertIsNone(stack.variance)
+        with self.assertRaises(ValueError):
+            stack.sample()
+
+    def test_mismatched_frame(self):
+        stack = TemporalStack()
+        stack.add(self.frames[0])
+        with self.assertRaises(ValueError):
+            stack.add(self.frames[1][:4])
@@ -0,0 +1,136 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+import os
+from unittest import mock
+
+from open_vp_cal.framework.sequence_index import SequenceIndex
+from test_open_vp_cal.test_utils import TestBase
+
+
+class TestSequenceIndex(TestBase):
+    def setUp(self):
+        super(TestSequenceIndex, self).setUp()
+        self.sequence_folder = os.path.join(self.get_test_output_folder(), "index_sequence")
+        os.makedirs(self.sequence_folder)
+        for frame_num in [10, 11, 12, 14, 15, 18]:
+            self.touch(f"plate.{frame_num:05d}.exr")
+        self.touch("plate.00013.dpx")
+        self.touch("readme.txt")
+
+    def touch(self, file_name: str) -> None:
+        with open(os.path.join(self.sequence_folder, file_name), "w", encoding="utf-8"):
+            pass
+
+    def test_scan(self):
+        index = SequenceIndex.scan(self.sequence_folder, "exr")
+        self.assertEqual(index.file_name, "plate")
+        self.assertEqual(index.padding, 5)
+        self.assertEqual(index.frames, [10, 11, 12, 14, 15, 18])
+        self.assertEqual(index.start_frame, 10)
+        self.assertEqual(index.end_frame, 18)
+        self.assertEqual(index.holes, [13, 16, 17])
+        self.assertEqual(index.path(14), os.path.join(self.sequence_folder, "plate.00014.exr"))
+        self.assertIsNone(index.path(13))
+        self.assertNotIn(13, index)
+        self.assertEqual(len(index), 6)
+
+    def test_scan_empty_folder(self):
+        empty_folder = os.path.join(self.get_test_output_folder(), "empty_sequence")
+        os.makedirs(empty_folder)
+        with self.assertRaises(IOError):
+            SequenceIndex.scan(empty_folder, "exr")
+
+    def test_scan_multiple_sequences(self):
+        self.touch("another.0001.exr")
+        index = SequenceIndex.scan(self.sequence_folder, "exr")
+        self.assertEqual(index.file_name, "another")
+        self.assertEqual(index.frames, [1])
+        self.assertEqual(index.padding, 4)
+
+    def set_sidecar_scan_time(self, folder_mtime_ns: int, scanned_ns: int) -> None:
+        """ Sets the modification time of the folder and the time the sidecar records the folder was scanned at
+        """
+        sidecar_path = SequenceIndex.sidecar_path(self.sequence_folder)
+        with open(sidecar_path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        data["folder_mtime_ns"] = folder_mtime_ns
+        data["scanned_ns"] = scanned_ns
+        with open(sidecar_path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle)
+        os.utime(self.sequence_folder, ns=(folder_mtime_ns, folder_mtime_ns))
+
+    def test_sidecar_reused(self):
+        index = SequenceIndex.load(self.sequence_folder, "exr", use_sidecar=True)
+        self.assertTrue(os.path.exists(SequenceIndex.sidecar_path(self.sequence_folder)))
+
+        with mock.patch.object(SequenceIndex, "scan") as scan:
+            reloaded = SequenceIndex.load(self.sequence_folder, "exr", use_sidecar=True)
+            scan.assert_not_called()
+        self.assertEqual(reloaded.frames, index.frames)
+        self.assertEqual(reloaded.holes, index.holes)
+        self.assertEqual(reloaded.path(18), index.path(18))
+
+    def test_sidecar_ignored_for_other_file_type(self):
+        SequenceIndex.load(self.sequence_folder, "exr", use_sidecar=True)
+        self.assertIsNone(SequenceIndex.from_sidecar(self.sequence_folder, "dpx"))
+
+    def test_sidecar_invalidated_by_new_frame(self):
+        SequenceIndex.load(self.sequence_folder, "exr", use_sidecar=True)
+        folder_mtime = os.stat(self.sequence_folder).st_mtime_ns
+        self.touch("plate.00013.exr")
+        os.utime(self.sequence_folder, ns=(folder_mtime + 1, folder_mtime + 1))
+
+        index = SequenceIndex.load(self.sequence_folder, "exr", use_sidecar=True)
+        self.assertEqual(index.holes, [16, 17])
+        self.assertEqual(SequenceIndex.from_sidecar(self.sequence_folder, "exr").holes, [16, 17])
+
+    def test_sidecar_invalidated_by_frame_added_during_scan(self):
+        SequenceIndex._create_sidecar(self.sequence_folder)
+        index = SequenceIndex.scan(self.sequence_folder, "exr")
+        self.touch("plate.00013.exr")
+        index.write_sidecar()
+        self.assertIsNone(SequenceIndex.from_sidecar(self.sequence_folder, "exr"))
+
+    def test_sidecar_ignored_within_timestamp_granularity(self):
+        SequenceIndex.load(self.sequence_folder, "exr", use_sidecar=True)
+        folder_mtime = 1700000000 * 1000000000
+        self.set_sidecar_scan_time(folder_mtime, folder_mtime + 1000000000)
+        self.assertIsNone(SequenceIndex.from_sidecar(self.sequence_folder, "exr"))
+        self.set_sidecar_scan_time(folder_mtime, folder_mtime + 2000000000)
+        self.assertIsNotNone(SequenceIndex.from_sidecar(self.sequence_folder, "exr"))
+
+        folder_mtime += 123456789
+        self.set_sidecar_scan_time(folder_mtime, folder_mtime + 1000000)
+        self.assertIsNone(SequenceIndex.from_sidecar(self.sequence_folder, "exr"))
+        self.set_sidecar_scan_time(folder_mtime, folder_mtime + 20000000)
+        self.assertIsNotNone(SequenceIndex.from_sidecar(self.sequence_folder, "exr"))
+
+    def test_load_waits_for_timestamp_granularity(self):
+        SequenceIndex.load(self.sequence_folder, "exr", use_sidecar=True)
+        folder_mtime = os.stat(self.sequence_folder).st_mtime_ns
+        index = SequenceIndex.from_sidecar(self.sequence_folder, "exr")
+        self.assertIsNotNone(index)
+        self.assertGreaterEqual(index._scanned_ns - folder_mtime, SequenceIndex.mtime_granularity_ns(folder_mtime))
+
+    def test_sidecar_disabled(self):
+        SequenceIndex.load(self.sequence_folder, "exr")
+        self.assertFalse(os.path.exists(SequenceIndex.sidecar_path(self.sequence_folder)))
+
+    def test_unwritable_sidecar(self):
+        with mock.patch("builtins.open", side_effect=PermissionError):
+            index = SequenceIndex.scan(self.sequence_folder, "exr")
+            self.assertFalse(index.write_sidecar())
@@ -13,10 +13,16 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-from test_open_vp_cal.test_utils import TestProcessorBase
+from test_open_vp_cal.test_utils import TestProcessorBase, TestBase
 
+from open_vp_cal.core import constants
 from open_vp_cal.framework.sequence_loader import FrameRangeException
+from open_vp_cal.imaging import imaging_utils
 
 
 class TestSequenceLoader(TestProcessorBase):
@@ -70,3 +76,139 @@ class TestSequenceLoader(TestProcessorBase):
         self.assertEqual(self.led_wall.sequence_loader.detect_padding('test.png'), 0)
 
 
+
+
+class TestSequenceLoaderPrefetch(TestBase):
+    def setUp(self):
+        super(TestSequenceLoaderPrefetch, self).setUp()
+        self.sequence_folder = os.path.join(self.get_test_output_folder(), "prefetch_sequence")
+        os.makedirs(self.sequence_folder)
+        for frame_num in range(20):
+            image_buf = imaging_utils.new_image(16, 9, [frame_num / 20.0, 0, 0])
+            imaging_utils.write_image(
+                image_buf, os.path.join(self.sequence_folder, f"prefetch.{frame_num:04d}.exr"), "half"
+            )
+        self.sequence_loader = self.led_wall.sequence_loader
+        self.sequence_loader.set_prefetch_depth(4)
+
+    def wait_for_prefetch(self):
+        for future in list(self.sequence_loader._pending.values()):
+            future.result()
+
+    def test_load_sequence_prefetches_first_frames(self):
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        self.wait_for_prefetch()
+        for frame_num in range(5):
+            self.assertIn(frame_num, self.sequence_loader.cache)
+        self.assertNotIn(10, self.sequence_loader.cache)
+
+    def test_prefetch_follows_direction(self):
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        self.sequence_loader.get_frame(15)
+        self.sequence_loader.get_frame(14)
+        self.wait_for_prefetch()
+        for frame_num in range(10, 14):
+            self.assertIn(frame_num, self.sequence_loader.cache)
+        self.assertEqual(self.sequence_loader.read_direction(), (-1, 1))
+
+    def test_prefetch_direction_tracked_per_thread(self):
+        self.sequence_loader.set_prefetch_depth(0)
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        self.sequence_loader.set_prefetch_depth(2)
+        barrier = threading.Barrier(2)
+
+        def read_frames(frame_nums):
+            directions = []
+            for frame_num in frame_nums:
+                barrier.wait()
+                self.sequence_loader.get_frame(frame_num)
+                directions.append(self.sequence_loader.read_direction())
+            return directions
+
+        # Two threads interleave their requests, one reading forwards and one backwards through the sequence
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            forwards = executor.submit(read_frames, [2, 3, 4])
+            backwards = executor.submit(read_frames, [17, 16, 15])
+            self.assertEqual(forwards.result()[1:], [(1, 1), (1, 1)])
+            self.assertEqual(backwards.result()[1:], [(-1, 1), (-1, 1)])
+        self.wait_for_prefetch()
+        for frame_num in [5, 6, 13, 14]:
+            self.assertIn(frame_num, self.sequence_loader.cache)
+
+    def test_prefetch_disabled(self):
+        self.sequence_loader.set_prefetch_depth(0)
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        self.assertEqual(len(self.sequence_loader.cache), 1)
+
+    def test_iteration_with_prefetch(self):
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        frames = [frame.frame_num for frame in self.sequence_loader]
+        self.assertEqual(frames, list(range(20)))
+
+    def test_get_frame_roi(self):
+        self.sequence_loader.set_prefetch_depth(0)
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        roi = [2, 10, 1, 5]
+        frame = self.sequence_loader.get_frame(12, roi=roi)
+        self.assertEqual(frame.roi, roi)
+        self.assertEqual(frame.image_buf.spec().width, 8)
+        self.assertEqual(frame.image_buf.spec().height, 4)
+        self.assertIn((12, tuple(roi)), self.sequence_loader.cache)
+        self.assertNotIn(12, self.sequence_loader.cache)
+        self.assertAlmostEqual(imaging_utils.sample_image(frame.extract_roi(roi))[0], 0.6, places=3)
+
+    def test_get_frame_roi_uses_cached_full_frame(self):
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        full_frame = self.sequence_loader.get_frame(0)
+        self.assertIs(self.sequence_loader.get_frame(0, roi=[2, 10, 1, 5]), full_frame)
+
+    def test_sequence_with_holes(self):
+        os.remove(os.path.join(self.sequence_folder, "prefetch.0005.exr"))
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        self.assertEqual(self.sequence_loader.sequence_index.holes, [5])
+        self.sequence_loader.get_frame(3)
+        self.sequence_loader.get_frame(4)
+        self.wait_for_prefetch()
+        self.assertIn(7, self.sequence_loader.cache)
+        self.assertNotIn(5, self.sequence_loader.cache)
+        with self.assertRaises(IOError):
+            self.sequence_loader.get_frame(5)
+
+    def test_prefetch_follows_stride(self):
+        self.sequence_loader.set_prefetch_depth(0)
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        self.sequence_loader.set_prefetch_depth(3)
+        self.sequence_loader.get_frame(3)
+        self.wait_for_prefetch()
+        for frame_num in [6, 9, 12]:
+            self.assertIn(frame_num, self.sequence_loader.cache)
+        for frame_num in [4, 5, 7]:
+            self.assertNotIn(frame_num, self.sequence_loader.cache)
+
+    def test_get_frame_proxy(self):
+        self.sequence_loader.set_prefetch_depth(0)
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        frame = self.sequence_loader.get_frame(12, proxy_factor=4)
+        self.assertEqual(frame.proxy_factor, 4)
+        self.assertEqual(frame.image_buf.spec().width, 4)
+        self.assertEqual(frame.image_buf.spec().height, 3)
+        self.assertIn((12, constants.PROXY, 4), self.sequence_loader.cache)
+        self.assertIn((12, constants.PROXY, 16), self.sequence_loader.cache)
+        self.assertAlmostEqual(imaging_utils.sample_image(frame.extract_roi([0, 16, 0, 8]))[0], 0.6, places=3)
+
+    def test_persisted_proxy(self):
+        self.sequence_loader.set_prefetch_depth(0)
+        self.sequence_loader.load_sequence(self.sequence_folder)
+        os.environ[constants.OPEN_VP_CAL_PROXY_CACHE] = "1"
+        try:
+            self.sequence_loader.get_frame(3, proxy_factor=4)
+            proxy_folder = os.path.join(self.sequence_folder, constants.PROXY_CACHE_FOLDER_NAME)
+            self.assertEqual(sorted(os.listdir(proxy_folder)), ["prefetch.0003.proxy16.exr", "prefetch.0003.proxy4.exr"])
+
+            self.sequence_loader.cache.clear()
+            with mock.patch.object(imaging_utils, "create_proxy") as create_proxy:
+                frame = self.sequence_loader.get_frame(3, proxy_factor=4)
+                create_proxy.assert_not_called()
+            self.assertEqual(frame.image_buf.spec().width, 4)
+        finally:
+            del os.environ[constants.OPEN_VP_CAL_PROXY_CACHE]
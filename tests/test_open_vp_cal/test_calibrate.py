@@ -0,0 +1,272 @@
+"""
+Copyright 2024 Netflix Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+import os
+import unittest
+from unittest import mock
+
+import colour
+import numpy as np
+
+from open_vp_cal.core import calibrate, calibration_batch, constants
+from open_vp_cal.core.constants import Results, CalibrationStage
+
+
+def load_samples():
+    results_folder = os.path.join(
+        os.path.dirname(__file__), "resources", "Sample_Project2_ROE_Wall1_CS_EOTF", "export", "results"
+    )
+    with open(os.path.join(results_folder, "ROE_CS_EOTF_samples.json"), encoding="utf-8") as handle:
+        measured_samples = json.load(handle)
+    with open(os.path.join(results_folder, "ROE_CS_EOTF_reference_samples.json"), encoding="utf-8") as handle:
+        reference_samples = json.load(handle)
+    return measured_samples, reference_samples
+
+
+BASE_PARAMETERS = {
+    "input_plate_gamut": constants.ColourSpace.CS_ACES,
+    "native_camera_gamut": constants.CameraColourSpace.RED_WIDE_GAMUT,
+    "target_gamut": constants.ColourSpace.CS_BT2020,
+    "target_to_screen_cat": constants.CAT.CAT_CAT02,
+    "reference_to_target_cat": constants.CAT.CAT_BRADFORD,
+    "target_max_lum_nits": 1000,
+    "target_EOTF": constants.EOTF.EOTF_ST2084
+}
+
+
+class TestVectorisedCalculations(unittest.TestCase):
+    def test_colourspace_max_distances(self):
+        source_cs = colour.RGB_COLOURSPACES[constants.ColourSpace.CS_BT2020]
+        destination_cs = colour.RGB_COLOURSPACES[constants.ColourSpace.CS_SRGB]
+        primaries = colour.RGB_to_RGB(np.identity(3), source_cs, destination_cs, constants.CAT.CAT_BRADFORD)
+        achromatic_values = np.array([calibrate.achromatic(rgb, 0.1) for rgb in primaries])
+        expected = np.amax((achromatic_values - primaries) / achromatic_values, axis=0)
+
+        np.testing.assert_array_equal(
+            calibrate.colourspace_max_distances(source_cs, destination_cs, constants.CAT.CAT_BRADFORD, 0.1),
+            expected
+        )
+
+    def test_calculate_eotf_linearity(self):
+        eotf_ramp = np.array([[0.1, 0.2, 0.3], [0.5, 0.5, 0.4], [1.0, 1.1, 0.9]])
+        self.assertEqual(
+            calibrate.calculate_eotf_linearity([0.0, 0.5, 1.0], eotf_ramp),
+            [[0.1, 0.2, 0.3], [1.0, 1.0, 0.8], [1.0, 1.1, 0.9]]
+        )
+
+    def test_eotf_correction_calculation(self):
+        grey_ramp_screen = np.array([[0.1, 0.12, 0.09], [-0.1, 0.5, 0.4], [1.0, 1.1, 0.9]])
+        signals = np.repeat(np.array([[0.1], [0.5], [1.0]]), 3, axis=1)
+
+        lut_r, lut_g, lut_b = calibrate.eotf_correction_calculation(
+            grey_ramp_screen, signals, [1.0, 25.0, np.nan], avoid_clipping=False
+        )
+
+        # Patches over the deltaE threshold are dropped, negative screen values are clamped to zero
+        np.testing.assert_array_equal(lut_r, [[0.0, 0.0], [0.1, 0.1], [1.0, 1.0]])
+        np.testing.assert_array_equal(lut_g, [[0.0, 0.0], [0.12, 0.1], [1.1, 1.0]])
+        np.testing.assert_array_equal(lut_b, [[0.0, 0.0], [0.09, 0.1], [0.9, 1.0]])
+
+    def test_run_returns_serializable_results(self):
+        measured_samples, reference_samples = load_samples()
+        for calculation_order in constants.CalculationOrder.CO_ALL:
+            results = calibrate.run(
+                measured_samples, reference_samples, calculation_order=calculation_order, **BASE_PARAMETERS
+            )
+            json.dumps(results)
+            self.assertEqual(len(results[Results.PRE_EOTF_RAMPS]), len(results[Results.REFERENCE_EOTF_RAMP]))
+            self.assertEqual(len(results[Results.EOTF_LINEARITY]), len(results[Results.PRE_EOTF_RAMPS]))
+            self.assertEqual(len(results[Results.MEASURED_MAX_LUM_NITS]), 3)
+            self.assertEqual(len(results[Results.POST_DELTA_E_MACBETH]), len(results[Results.DELTA_E_MACBETH]))
+
+
+class TestCalibrationBatch(unittest.TestCase):
+    def setUp(self):
+        self.measured_samples, self.reference_samples = load_samples()
+
+    def test_parameter_grid(self):
+        parameter_sets = calibration_batch.calibration_parameter_grid(
+            BASE_PARAMETERS, calculation_order=constants.CalculationOrder.CO_ALL,
+            target_to_screen_cat=[constants.CAT.CAT_CAT02, constants.CAT.CAT_BRADFORD, constants.CAT.CAT_NONE]
+        )
+        self.assertEqual(len(parameter_sets), 6)
+        self.assertEqual(parameter_sets[0]["target_gamut"], constants.ColourSpace.CS_BT2020)
+        self.assertEqual(
+            {(p["calculation_order"], p["target_to_screen_cat"]) for p in parameter_sets},
+            {(order, cat) for order in constants.CalculationOrder.CO_ALL
+             for cat in [constants.CAT.CAT_CAT02, constants.CAT.CAT_BRADFORD, constants.CAT.CAT_NONE]}
+        )
+
+    def test_batch_matches_run(self):
+        parameter_sets = calibration_batch.calibration_parameter_grid(
+            BASE_PARAMETERS, calculation_order=constants.CalculationOrder.CO_ALL,
+            enable_EOTF_correction=[True, False], gamut_compression_shadow_rolloff=[0.004, 0.1]
+        )
+        variants = calibration_batch.run_batch(self.measured_samples, self.reference_samples, parameter_sets, max_workers=4)
+
+        self.assertEqual(len(variants), len(parameter_sets))
+        delta_es = [variant.delta_e for variant in variants]
+        self.assertEqual(delta_es, sorted(delta_es))
+        for variant in variants:
+            self.assertIsNone(variant.error)
+            expected = calibrate.run(self.measured_samples, self.reference_samples, **variant.parameters)
+            self.assertEqual(json.dumps(variant.results), json.dumps(expected))
+            self.assertEqual(variant.delta_e, np.mean(expected[Results.POST_DELTA_E_MACBETH]))
+
+    def test_post_delta_e_measures_the_calibration(self):
+        parameter_sets = calibration_batch.calibration_parameter_grid(
+            BASE_PARAMETERS, calculation_order=constants.CalculationOrder.CO_ALL,
+            enable_EOTF_correction=[True, False], enable_gamut_compression=[True, False]
+        )
+        variants = calibration_batch.run_batch(self.measured_samples, self.reference_samples, parameter_sets)
+        delta_es = {
+            (variant.parameters["calculation_order"], variant.parameters["enable_EOTF_correction"],
+             variant.parameters["enable_gamut_compression"]): variant.delta_e
+            for variant in variants
+        }
+        pre_delta_e = np.mean(variants[0].results[Results.DELTA_E_MACBETH])
+
+        # Disabling the EOTF correction still applies the target to screen matrix
+        for calculation_order in constants.CalculationOrder.CO_ALL:
+            for enable_gamut_compression in [True, False]:
+                self.assertNotEqual(delta_es[(calculation_order, False, enable_gamut_compression)], pre_delta_e)
+                self.assertNotEqual(
+                    delta_es[(calculation_order, True, enable_gamut_compression)],
+                    delta_es[(calculation_order, False, enable_gamut_compression)]
+                )
+
+        self.assertNotEqual(
+            delta_es[(constants.CalculationOrder.CO_CS_EOTF, True, True)],
+            delta_es[(constants.CalculationOrder.CO_EOTF_CS, True, True)]
+        )
+        self.assertNotEqual(
+            delta_es[(constants.CalculationOrder.CO_EOTF_CS, True, True)],
+            delta_es[(constants.CalculationOrder.CO_EOTF_CS, True, False)]
+        )
+
+    def test_apply_calibration_to_samples(self):
+        samples = np.array([[0.1, 0.2, 0.3], [1.0, 0.5, 0.25]])
+        matrix = np.array([[1.1, -0.1, 0.0], [0.0, 1.0, 0.0], [0.0, 0.05, 0.95]])
+        lut = np.array([[0.0, 0.0], [2.0, 1.0]])
+        parameters = dict(
+            target_to_screen_matrix=matrix, lut_r=lut, lut_g=lut, lut_b=lut,
+            enable_gamut_compression=False, max_distances=[1.0, 1.0, 1.0]
+        )
+
+        np.testing.assert_allclose(
+            calibrate.apply_calibration_to_samples(
+                samples, calculation_order=constants.CalculationOrder.CO_CS_EOTF, enable_EOTF_correction=False,
+                **parameters),
+            samples @ matrix.T
+        )
+        np.testing.assert_allclose(
+            calibrate.apply_calibration_to_samples(
+                samples, calculation_order=constants.CalculationOrder.CO_CS_EOTF, enable_EOTF_correction=True,
+                **parameters),
+            (samples @ matrix.T) * 0.5
+        )
+        np.testing.assert_allclose(
+            calibrate.apply_calibration_to_samples(
+                samples, calculation_order=constants.CalculationOrder.CO_EOTF_CS, enable_EOTF_correction=True,
+                **parameters),
+            (samples * 0.5) @ matrix.T
+        )
+
+        # The gamut compression pulls the out of gamut samples towards the achromatic axis
+        out_of_gamut = np.array([[1.0, -0.2, 0.1]])
+        compressed = calibrate.apply_calibration_to_samples(
+            out_of_gamut, calculation_order=constants.CalculationOrder.CO_CS_EOTF, enable_EOTF_correction=False,
+            **dict(parameters, target_to_screen_matrix=np.identity(3), enable_gamut_compression=True)
+        )
+        self.assertGreater(compressed[0, 1], out_of_gamut[0, 1])
+
+    def test_failed_variants_ranked_last(self):
+        parameter_sets = [
+            dict(BASE_PARAMETERS, reference_wall_external_white_balance_matrix=np.identity(3).tolist()),
+            BASE_PARAMETERS
+        ]
+        variants = calibration_batch.run_batch(self.measured_samples, self.reference_samples, parameter_sets)
+
+        self.assertIsNone(variants[0].error)
+        self.assertIs(variants[0].parameters, BASE_PARAMETERS)
+        self.assertIsInstance(variants[1].error, ValueError)
+        self.assertIsNone(variants[1].results)
+        self.assertIsNone(variants[1].delta_e)
+
+
+class TestIncrementalCalibration(unittest.TestCase):
+    def setUp(self):
+        measured_samples, reference_samples = load_samples()
+        self.parameters = dict(
+            BASE_PARAMETERS, measured_samples=measured_samples, reference_samples=reference_samples
+        )
+        self.results, _ = calibrate.recalibrate(self.parameters)
+
+    def test_invalidated_stages(self):
+        self.assertEqual(calibrate.invalidated_stages(None, self.parameters), CalibrationStage.ALL)
+        self.assertEqual(calibrate.invalidated_stages(self.parameters, dict(self.parameters)), [])
+        self.assertEqual(
+            calibrate.invalidated_stages(self.parameters, dict(self.parameters, enable_gamut_compression=False)),
+            [CalibrationStage.DELTA_E, CalibrationStage.EXPORT]
+        )
+        self.assertEqual(
+            calibrate.invalidated_stages(
+                self.parameters,
+                dict(self.parameters, enable_gamut_compression=False, gamut_compression_shadow_rolloff=0.1)
+            ),
+            [CalibrationStage.MAX_DISTANCES, CalibrationStage.DELTA_E, CalibrationStage.EXPORT]
+        )
+        self.assertEqual(
+            calibrate.invalidated_stages(self.parameters, dict(self.parameters, avoid_clipping=False)),
+            CalibrationStage.ALL[1:]
+        )
+        self.assertEqual(
+            calibrate.invalidated_stages(
+                self.parameters, dict(self.parameters, reference_wall_external_white_balance_matrix=np.identity(3))
+            ),
+            CalibrationStage.ALL
+        )
+
+    def test_recalibrate_matches_run(self):
+        for changes in [
+            {"gamut_compression_shadow_rolloff": 2.0},
+            {"enable_gamut_compression": False},
+            {"avoid_clipping": False},
+            {"calculation_order": constants.CalculationOrder.CO_CS_EOTF},
+        ]:
+            parameters = dict(self.parameters, **changes)
+            results, stages = calibrate.recalibrate(
+                parameters, previous_parameters=self.parameters, previous_results=self.results
+            )
+            self.assertEqual(stages, calibrate.invalidated_stages(self.parameters, parameters))
+            self.assertEqual(json.dumps(results), json.dumps(calibrate.run(**parameters)))
+
+    def test_recalibrate_unchanged(self):
+        results, stages = calibrate.recalibrate(
+            dict(self.parameters), previous_parameters=self.parameters, previous_results=self.results
+        )
+        self.assertIs(results, self.results)
+        self.assertEqual(stages, [])
+
+    def test_recalibrate_max_distances_only(self):
+        parameters = dict(self.parameters, gamut_compression_shadow_rolloff=2.0)
+        with mock.patch.object(calibrate, "run") as run:
+            results, _ = calibrate.recalibrate(
+                parameters, previous_parameters=self.parameters, previous_results=self.results
+            )
+        run.assert_not_called()
+        self.assertNotEqual(results[Results.MAX_DISTANCES], self.results[Results.MAX_DISTANCES])
+        self.assertEqual(results[Results.TARGET_TO_SCREEN_MATRIX], self.results[Results.TARGET_TO_SCREEN_MATRIX])
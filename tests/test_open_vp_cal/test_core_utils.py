@@ -16,11 +16,14 @@ limitations under the License.
 
 import os
 import unittest
+from unittest import mock
 
 import OpenImageIO as Oiio
+import colour
+import numpy as np
 
 import open_vp_cal.imaging.imaging_utils
-from open_vp_cal.core import utils
+from open_vp_cal.core import utils, constants
 from open_vp_cal.led_wall_settings import LedWallSettings
 from test_open_vp_cal.test_utils import TestBase
 
@@ -103,4 +106,60 @@ class TestConversionFunctions(TestBase):
         self.assertEqual(expected_maximum_extended, maximum_extended)
 
 
-
+class TestColourSpaceCache(TestBase):
+    def setUp(self):
+        super(TestColourSpaceCache, self).setUp()
+        utils.ColourSpaceCache.clear()
+        self.custom_primaries = [[0.7, 0.3], [0.17, 0.8], [0.13, 0.05], [0.3127, 0.329]]
+
+    def tearDown(self):
+        super(TestColourSpaceCache, self).tearDown()
+        utils.ColourSpaceCache.clear()
+
+    def test_custom_colour_space_reused(self):
+        colour_space = utils.get_custom_colour_space_from_primaries_and_wp("custom", self.custom_primaries)
+        self.assertIs(utils.get_custom_colour_space_from_primaries_and_wp("custom", self.custom_primaries),
+                      colour_space)
+        np.testing.assert_array_equal(colour_space.primaries, self.custom_primaries[:3])
+        np.testing.assert_array_equal(colour_space.whitepoint, self.custom_primaries[-1])
+
+        changed_primaries = [[0.68, 0.32]] + self.custom_primaries[1:]
+        changed = utils.get_custom_colour_space_from_primaries_and_wp("custom", changed_primaries)
+        self.assertIsNot(changed, colour_space)
+        np.testing.assert_array_equal(changed.primaries, changed_primaries[:3])
+
+    def test_custom_primaries_change_clears_colour_spaces(self):
+        self.project_settings.project_custom_primaries = {"custom": self.custom_primaries}
+        led_wall = self.project_settings.add_led_wall("custom_wall")
+        led_wall.target_gamut = "custom"
+        colour_space = utils.get_target_colourspace_for_led_wall(led_wall)
+        self.assertIs(utils.get_target_colourspace_for_led_wall(led_wall), colour_space)
+
+        self.project_settings.add_custom_primary("other", self.custom_primaries)
+        self.assertIsNot(utils.get_target_colourspace_for_led_wall(led_wall), colour_space)
+
+    def test_matrix_RGB_to_RGB(self):
+        source_cs = colour.RGB_COLOURSPACES[constants.ColourSpace.CS_BT2020]
+        destination_cs = utils.get_custom_colour_space_from_primaries_and_wp("custom", self.custom_primaries)
+        for cat in [constants.CAT.CAT_BRADFORD, None]:
+            expected = colour.matrix_RGB_to_RGB(source_cs, destination_cs, cat)
+            matrix = utils.ColourSpaceCache.matrix_RGB_to_RGB(source_cs, destination_cs, cat)
+            np.testing.assert_array_equal(matrix, expected)
+
+            # The cached matrix is not affected by changes to the returned copy
+            matrix[0, 0] = 0
+            np.testing.assert_array_equal(
+                utils.ColourSpaceCache.matrix_RGB_to_RGB(source_cs, destination_cs, cat), expected
+            )
+
+    def test_matrix_eviction(self):
+        source_cs = colour.RGB_COLOURSPACES[constants.ColourSpace.CS_BT2020]
+        destinations = [
+            utils.get_custom_colour_space_from_primaries_and_wp(
+                f"custom_{i}", [[0.7 - i * 0.01, 0.3]] + self.custom_primaries[1:])
+            for i in range(3)
+        ]
+        with mock.patch.object(utils.ColourSpaceCache, "max_matrices", 2):
+            for destination_cs in destinations:
+                utils.ColourSpaceCache.matrix_RGB_to_RGB(source_cs, destination_cs)
+            self.assertEqual(len(utils.ColourSpaceCache._matrices), 2)
@@ -15,14 +15,26 @@ limitations under the License.
 """
 
 import os
+import shutil
+from unittest import mock
 from test_open_vp_cal.test_utils import TestBase
 
+import numpy as np
+import OpenImageIO as Oiio
+
 import open_vp_cal
-from open_vp_cal.framework.generation import PatchGeneration
+from open_vp_cal.framework.generation import PatchGeneration, export_patterns
 from open_vp_cal.core import constants
+from open_vp_cal.imaging import imaging_utils
 
 
 class TestGeneration(TestBase):
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(
+            os.path.join(self.get_test_output_folder(), constants.PATTERN_CACHE_FOLDER_NAME), ignore_errors=True
+        )
+
     def test_generation(self):
         """Test The Calibration Pattern Generation"""
         # We force the version so that the slate always gets the same version to bake into the image
@@ -51,3 +63,153 @@ class TestGeneration(TestBase):
 
             comparison_image = os.path.join(reference_root_folder, base_name)
             self.compare_image_files(comparison_image, file_path, self.project_settings.file_format)
+
+    def test_generation_links_frames_of_patch(self):
+        self.project_settings.frames_per_patch = 3
+        patch_generator = PatchGeneration(self.led_wall)
+        file_paths = patch_generator.generate_patches(
+            [constants.PATCHES.RED_PRIMARY, constants.PATCHES.GREEN_PRIMARY]
+        )
+        self.assertEqual(len(file_paths), 6)
+        self.assertEqual(len(set(file_paths)), 6)
+        self.assert_frames_of_patches_match(file_paths, 3)
+        red_primary = Oiio.ImageBuf(file_paths[0])
+        red_primary.read(force=True)
+
+        # Exporting again in a different order must not modify the frames the previous frames were linked to
+        file_paths = patch_generator.generate_patches(
+            [constants.PATCHES.GREEN_PRIMARY, constants.PATCHES.RED_PRIMARY]
+        )
+        self.assert_frames_of_patches_match(file_paths, 3)
+        self.compare_image_buffers(
+            red_primary, Oiio.ImageBuf(file_paths[3]), self.project_settings.file_format
+        )
+
+    def test_generation_at_output_resolution(self):
+        self.project_settings.resolution_width = 1920
+        self.project_settings.resolution_height = 1080
+        patch_generator = PatchGeneration(self.led_wall)
+        with mock.patch.object(imaging_utils, "resize_image", wraps=imaging_utils.resize_image) as resize_image:
+            file_paths = patch_generator.generate_patches(
+                [constants.PATCHES.RED_PRIMARY, constants.PATCHES.DISTORT_AND_ROI]
+            )
+
+        # Only the patch laid out for the design raster is resized
+        self.assertEqual(resize_image.call_count, 1)
+        self.assertEqual(patch_generator.output_generator.patch_size, (500, 500))
+        for file_path in file_paths:
+            spec = Oiio.ImageBuf(file_path).spec()
+            self.assertEqual((spec.width, spec.height), (1920, 1080))
+
+        # The patch is centred with the same coverage of the wall it had once resized, with no filtered edges
+        red_primary = imaging_utils.image_buf_to_np_array(Oiio.ImageBuf(file_paths[0]))
+        patch_pixels = np.argwhere(red_primary[:, :, 0] > 0)
+        self.assertEqual(patch_pixels.min(axis=0).tolist(), [290, 710])
+        self.assertEqual(patch_pixels.max(axis=0).tolist(), [789, 1209])
+        self.assertEqual(len(np.unique(red_primary[290:790, 710:1210, 0])), 1)
+
+    def test_solid_frames_match_generated_patches(self):
+        self.led_wall.num_grey_patches = 3
+        patch_generator = PatchGeneration(self.led_wall)
+        patch_generator.prepare_generation()
+        patch_names = [constants.PATCHES.RED_PRIMARY_DESATURATED, constants.PATCHES.MAX_WHITE,
+                       constants.PATCHES.FLAT_FIELD, constants.PATCHES.EOTF_RAMPS]
+        for file_format in [constants.FileFormats.FF_EXR, self.project_settings.file_format]:
+            self.project_settings.file_format = file_format
+            for patch_name in patch_names:
+                for patch_values in patch_generator.get_patch_image_values(patch_name):
+                    colour = patch_generator.get_solid_patch_colour(patch_name, patch_values)
+                    self.assertIsNotNone(colour)
+                    expected = patch_generator.generate_patch(patch_name, patch_values=patch_values)[0]
+                    if file_format != constants.FileFormats.FF_EXR:
+                        expected = patch_generator.apply_color_convert(expected)
+                    np.testing.assert_array_equal(
+                        imaging_utils.image_buf_to_np_array(patch_generator.generate_solid_frame(patch_name, colour)),
+                        imaging_utils.image_buf_to_np_array(expected)
+                    )
+
+        self.assertIsNone(patch_generator.get_solid_patch_colour(constants.PATCHES.MACBETH, 1.5))
+
+    def test_pattern_cache_reuses_unchanged_patches(self):
+        patch_names = [constants.PATCHES.RED_PRIMARY, constants.PATCHES.MACBETH]
+        patch_generator = PatchGeneration(self.led_wall)
+        file_paths = patch_generator.generate_patches(patch_names)
+        first_export = []
+        for file_path in file_paths:
+            with open(file_path, "rb") as handle:
+                first_export.append(handle.read())
+
+        # Changing the number of frames does not change the images, so none of them are written again
+        self.project_settings.frames_per_patch = 2
+        with mock.patch.object(PatchGeneration, "write_to_disk") as write_to_disk:
+            file_paths = patch_generator.generate_patches(patch_names)
+        write_to_disk.assert_not_called()
+        self.assertEqual(len(file_paths), 4)
+        self.assert_frames_of_patches_match(file_paths, 2)
+        for file_path, expected in zip(file_paths[::2], first_export):
+            with open(file_path, "rb") as handle:
+                self.assertEqual(handle.read(), expected)
+
+        # The colour of the patches depends on the peak luminance, so both are generated again, and with no room in
+        # the cache the images of the previous export are pruned
+        self.led_wall.target_max_lum_nits = 1500
+        with mock.patch.object(
+                PatchGeneration, "write_to_disk", autospec=True, side_effect=PatchGeneration.write_to_disk
+        ) as write_to_disk, mock.patch.dict(os.environ, {constants.OPEN_VP_CAL_PATTERN_CACHE_MB: "0"}):
+            patch_generator.generate_patches(patch_names)
+        self.assertEqual(write_to_disk.call_count, 2)
+        self.assertEqual(
+            sorted(os.listdir(patch_generator.pattern_cache.folder_path)),
+            sorted(f"{patch_generator.get_pattern_cache_key(patch_name, values)}.{self.project_settings.file_format}"
+                   for patch_name in patch_names for values in patch_generator.get_patch_image_values(patch_name))
+        )
+        self.assertFalse(patch_generator.pattern_cache.folder_path.startswith(self.project_settings.export_folder))
+
+        with mock.patch.dict(os.environ, {constants.OPEN_VP_CAL_PATTERN_CACHE: "0"}):
+            patch_generator.prepare_generation()
+        self.assertIsNone(patch_generator.pattern_cache)
+
+    def assert_frames_of_patches_match(self, file_paths, frames_per_patch):
+        patches = []
+        for index, file_path in enumerate(file_paths):
+            with open(file_path, "rb") as handle:
+                data = handle.read()
+            if index % frames_per_patch:
+                self.assertEqual(data, patches[-1])
+            else:
+                patches.append(data)
+        self.assertEqual(len(set(patches)), len(patches))
+
+    def test_export_patterns_for_walls(self):
+        self.project_settings.frames_per_patch = 2
+        self.led_wall.num_grey_patches = 3
+        second_wall = self.project_settings.copy_led_wall(self.led_wall.name, "Wall2")
+        second_wall.num_grey_patches = 2
+        patch_names = [constants.PATCHES.RED_PRIMARY, constants.PATCHES.EOTF_RAMPS]
+
+        patch_generators = []
+        for led_wall in [self.led_wall, second_wall]:
+            patch_generator = PatchGeneration(led_wall)
+            patch_generator.prepare_generation()
+            patch_generators.append(patch_generator)
+
+        progress = []
+        results = export_patterns(
+            patch_generators, patch_names, max_workers=4,
+            progress_callback=lambda completed, total: progress.append((completed, total))
+        )
+
+        num_images = [1 + len(patch_generator.get_patch_image_values(constants.PATCHES.EOTF_RAMPS))
+                      for patch_generator in patch_generators]
+        self.assertEqual(progress, [(completed, sum(num_images)) for completed in range(1, sum(num_images) + 1)])
+        for patch_generator, file_paths, images in zip(patch_generators, results, num_images):
+            self.assertEqual(
+                [os.path.basename(file_path) for file_path in file_paths],
+                [f"{patch_generator.base_name}.{str(frame).zfill(6)}.{self.project_settings.file_format}"
+                 for frame in range(images * 2)]
+            )
+            self.assert_frames_of_patches_match(file_paths, 2)
+
+        # The frames are the same as exporting each of the images in order on a single thread
+        serial_results = export_patterns(patch_generators, patch_names, max_workers=1)
+        self.assertEqual(serial_results, results)
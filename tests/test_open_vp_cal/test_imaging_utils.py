@@ -15,8 +15,11 @@ limitations under the License.
 """
 
 import os
+from unittest import mock
 
-from test_open_vp_cal.test_utils import TestProject
+import numpy as np
+
+from test_open_vp_cal.test_utils import TestProject, TestBase
 from open_vp_cal.imaging import imaging_utils
 
 
@@ -34,4 +37,168 @@ class TestProjectExternalWhite(TestProject):
 
     def get_sample_project_plates(self):
         result = super().get_sample_project_plates()
-        return os.path.join(result, "A102_C015_1027M2_001.R3D")
\ No newline at end of file
+        return os.path.join(result, "A102_C015_1027M2_001.R3D")
+
+
+class TestLoadImageRoi(TestBase):
+    def setUp(self):
+        super(TestLoadImageRoi, self).setUp()
+        pixels = np.random.default_rng(0).random((36, 64, 3), dtype=np.float32)
+        self.image_buf = imaging_utils.img_buf_from_numpy_array(pixels)
+        self.file_path = os.path.join(self.get_test_output_folder(), "roi_image.exr")
+        imaging_utils.write_image(self.image_buf, self.file_path, "float")
+
+    def test_load_image_roi_matches_extract_roi(self):
+        roi = [10, 40, 5, 20]
+        expected = imaging_utils.image_buf_to_np_array(
+            imaging_utils.extract_roi(imaging_utils.load_image(self.file_path), roi))
+        roi_buf = imaging_utils.load_image_roi(self.file_path, roi)
+        self.assertEqual(roi_buf.spec().width, 30)
+        self.assertEqual(roi_buf.spec().height, 15)
+
+        result = imaging_utils.image_buf_to_np_array(imaging_utils.extract_roi(roi_buf, roi))
+        np.testing.assert_array_equal(expected, result)
+
+    def test_load_image_roi_clamped_to_image(self):
+        roi_buf = imaging_utils.load_image_roi(self.file_path, [50, 100, 30, 60])
+        self.assertEqual(roi_buf.spec().width, 14)
+        self.assertEqual(roi_buf.spec().height, 6)
+
+    def test_load_image_roi_outside_image(self):
+        with self.assertRaises(ValueError):
+            imaging_utils.load_image_roi(self.file_path, [100, 120, 0, 10])
+
+
+class TestProxy(TestBase):
+    def test_create_proxy(self):
+        pixels = np.random.default_rng(0).random((36, 64, 3), dtype=np.float32)
+        proxy = imaging_utils.create_proxy(imaging_utils.img_buf_from_numpy_array(pixels), 4)
+        self.assertEqual(proxy.spec().width, 16)
+        self.assertEqual(proxy.spec().height, 9)
+
+        expected = pixels.reshape(9, 4, 16, 4, 3).mean(axis=(1, 3))
+        np.testing.assert_allclose(imaging_utils.image_buf_to_np_array(proxy), expected, atol=1e-6)
+
+    def test_scale_roi(self):
+        self.assertEqual(imaging_utils.scale_roi([10, 41, 5, 20], 4), [2, 11, 1, 5])
+        self.assertEqual(imaging_utils.scale_roi([10, 41, 5, 20], 1), [10, 41, 5, 20])
+
+
+class TestNumpyBridge(TestBase):
+    def setUp(self):
+        super(TestNumpyBridge, self).setUp()
+        self.pixels = np.random.default_rng(0).random((12, 20, 3), dtype=np.float32)
+        self.image_buf = imaging_utils.img_buf_from_numpy_array(self.pixels)
+
+    def test_round_trip(self):
+        result = imaging_utils.image_buf_to_np_array(self.image_buf)
+        self.assertEqual(result.dtype, np.float32)
+        self.assertEqual(result.shape, (12, 20, 3))
+        self.assertTrue(result.flags.writeable)
+        np.testing.assert_array_equal(self.pixels, result)
+
+    def test_array_not_shared_with_image_buf(self):
+        result = imaging_utils.image_buf_to_np_array(self.image_buf)
+        result *= 2.0
+        np.testing.assert_array_equal(self.pixels, imaging_utils.image_buf_to_np_array(self.image_buf))
+
+    def test_update_image_buf_from_np_array(self):
+        result = imaging_utils.image_buf_to_np_array(self.image_buf)
+        result *= 2.0
+        updated = imaging_utils.update_image_buf_from_np_array(self.image_buf, result)
+        self.assertIs(updated, self.image_buf)
+        np.testing.assert_array_equal(self.pixels * 2.0, imaging_utils.image_buf_to_np_array(self.image_buf))
+
+    def test_apply_color_conversion_in_place(self):
+        expected = imaging_utils.apply_color_conversion(
+            self.image_buf, "ACES2065-1", "ACEScg")
+        result = imaging_utils.apply_color_conversion(
+            self.image_buf, "ACES2065-1", "ACEScg", in_place=True)
+        self.assertIs(result, self.image_buf)
+        np.testing.assert_allclose(
+            imaging_utils.image_buf_to_np_array(expected), imaging_utils.image_buf_to_np_array(result))
+
+
+class TestApplyColorConversionToBuffers(TestBase):
+    def test_matches_individual_conversion(self):
+        rng = np.random.default_rng(0)
+        image_buffers = []
+        for count in range(6):
+            if count == 3:
+                pixels = rng.random((8, 10, 3), dtype=np.float32)
+            else:
+                pixels = np.empty((8, 10, 3), dtype=np.float32)
+                pixels[:] = rng.random(3, dtype=np.float32) * 10
+            image_buffers.append(imaging_utils.img_buf_from_numpy_array(pixels))
+
+        results = imaging_utils.apply_color_conversion_to_buffers(image_buffers, "ACES2065-1", "ACEScg")
+        self.assertEqual(len(results), len(image_buffers))
+        for image_buffer, result in zip(image_buffers, results):
+            expected = imaging_utils.apply_color_conversion(image_buffer, "ACES2065-1", "ACEScg")
+            self.assertEqual(result.spec().width, 10)
+            self.assertEqual(result.spec().height, 8)
+            np.testing.assert_allclose(
+                imaging_utils.image_buf_to_np_array(expected), imaging_utils.image_buf_to_np_array(result),
+                rtol=1e-6)
+
+    def test_empty(self):
+        self.assertEqual(imaging_utils.apply_color_conversion_to_buffers([], "ACES2065-1", "ACEScg"), [])
+
+
+class TestClippedMeans(TestBase):
+    def setUp(self):
+        super(TestClippedMeans, self).setUp()
+        rng = np.random.default_rng(0)
+        self.pixels = rng.normal(0.5, 0.05, (90, 160, 3)).astype(np.float32)
+        self.pixels[rng.random((90, 160)) < 0.01] = [20.0, -5.0, 8.0]
+
+    def expected(self, pixels):
+        return [imaging_utils.compute_clipped_mean(pixels, channel, sigma=3) for channel in range(3)]
+
+    def test_compute_clipped_means_matches_per_channel(self):
+        expected = self.expected(self.pixels)
+        for tile_pixels in [1, 160 * 7, imaging_utils.SAMPLE_TILE_PIXELS]:
+            np.testing.assert_allclose(
+                imaging_utils.compute_clipped_means(self.pixels, tile_pixels=tile_pixels), expected, rtol=1e-5)
+
+    def test_sample_image_in_tiles(self):
+        image_buf = imaging_utils.img_buf_from_numpy_array(self.pixels)
+        with mock.patch.object(imaging_utils, "SAMPLE_TILE_PIXELS", 160 * 13):
+            np.testing.assert_allclose(imaging_utils.sample_image(image_buf), self.expected(self.pixels), rtol=1e-5)
+
+    def test_sample_image_ignores_alpha(self):
+        pixels = np.dstack([self.pixels, np.ones((90, 160, 1), dtype=np.float32)])
+        image_buf = imaging_utils.img_buf_from_numpy_array(pixels)
+        np.testing.assert_allclose(imaging_utils.sample_image(image_buf), self.expected(self.pixels), rtol=1e-5)
+
+    def test_constant_image(self):
+        pixels = np.full((4, 4, 3), 0.25, dtype=np.float32)
+        self.assertEqual(imaging_utils.compute_clipped_means(pixels), [0.25, 0.25, 0.25])
+
+    def test_full_resolution_image(self):
+        pixels = np.random.default_rng(1).random((1080, 1920, 3), dtype=np.float32)
+        np.testing.assert_allclose(imaging_utils.compute_clipped_means(pixels), self.expected(pixels), rtol=1e-5)
+
+
+class TestLinkImage(TestBase):
+    def setUp(self):
+        super().setUp()
+        self.source_file = os.path.join(self.get_test_output_folder(), "source.exr")
+        self.destination_file = os.path.join(self.get_test_output_folder(), "destination.exr")
+        with open(self.source_file, "wb") as handle:
+            handle.write(b"source")
+
+    def test_link_replaces_existing_file(self):
+        with open(self.destination_file, "wb") as handle:
+            handle.write(b"destination")
+
+        self.assertEqual(imaging_utils.link_image(self.source_file, self.destination_file), self.destination_file)
+        self.assertTrue(os.path.samefile(self.source_file, self.destination_file))
+
+    def test_copy_when_links_unsupported(self):
+        with mock.patch.object(imaging_utils.os, "link", side_effect=OSError):
+            imaging_utils.link_image(self.source_file, self.destination_file)
+
+        self.assertFalse(os.path.samefile(self.source_file, self.destination_file))
+        with open(self.destination_file, "rb") as handle:
+            self.assertEqual(handle.read(), b"source")
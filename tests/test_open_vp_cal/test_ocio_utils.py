@@ -15,12 +15,18 @@ limitations under the License.
 """
 
 import json
+import shutil
 import tempfile
 
+import numpy as np
+import PyOpenColorIO as ocio
+
 from open_vp_cal.core import constants, utils
 from open_vp_cal.main import run_cli
 from open_vp_cal.project_settings import ProjectSettings
-from test_open_vp_cal.test_utils import TestProject
+from open_vp_cal.core.resource_loader import ResourceLoader
+from open_vp_cal.imaging import imaging_utils
+from test_open_vp_cal.test_utils import TestProject, TestBase
 
 import os
 
@@ -147,3 +153,80 @@ class TestCalibrate(TestProject):
             if led_wall.is_verification_wall:
                 continue
             self.files_are_equal(expected_file, led_wall.processing_results.ocio_config_output_file)
+
+
+class TestOcioProcessorCache(TestBase):
+    def setUp(self):
+        super().setUp()
+        ocio_utils.OcioProcessorCache.clear()
+        self.config_path = os.path.join(self.get_test_output_folder(), "config.ocio")
+        shutil.copy(ResourceLoader.ocio_config_path(), self.config_path)
+
+    def tearDown(self):
+        ocio_utils.OcioProcessorCache.clear()
+        super().tearDown()
+
+    def test_processor_reused(self):
+        cache = ocio_utils.OcioProcessorCache
+        processor = cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScg")
+        self.assertIs(processor, cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScg"))
+        self.assertIsNot(processor, cache.get_cpu_processor(self.config_path, "ACEScg", "ACES2065-1"))
+        self.assertIs(cache.get_config(self.config_path), cache.get_config(self.config_path))
+
+    def test_modified_config_reloaded(self):
+        cache = ocio_utils.OcioProcessorCache
+        config = cache.get_config(self.config_path)
+        processor = cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScg")
+        mtime = os.stat(self.config_path).st_mtime_ns + 1000000000
+        os.utime(self.config_path, ns=(mtime, mtime))
+        self.assertIsNot(config, cache.get_config(self.config_path))
+        self.assertIsNot(processor, cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScg"))
+
+    def test_evict_config(self):
+        cache = ocio_utils.OcioProcessorCache
+        other_config_path = os.path.join(self.get_test_output_folder(), "other_config.ocio")
+        shutil.copy(self.config_path, other_config_path)
+        config = cache.get_config(self.config_path)
+        processor = cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScg")
+        other_processor = cache.get_cpu_processor(other_config_path, "ACES2065-1", "ACEScg")
+
+        cache.evict(self.config_path)
+        self.assertIsNot(config, cache.get_config(self.config_path))
+        self.assertIsNot(processor, cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScg"))
+        self.assertIs(other_processor, cache.get_cpu_processor(other_config_path, "ACES2065-1", "ACEScg"))
+
+    def test_eviction(self):
+        cache = ocio_utils.OcioProcessorCache
+        max_processors = cache.max_processors
+        try:
+            cache.max_processors = 2
+            cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScg")
+            cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScct")
+            cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScg")
+            cache.get_cpu_processor(self.config_path, "ACES2065-1", "ACEScc")
+            self.assertEqual(
+                [key[-1] for key in cache._processors], ["ACEScg", "ACEScc"]
+            )
+        finally:
+            cache.max_processors = max_processors
+
+    def test_cached_conversion_matches_config(self):
+        config = ocio.Config.CreateFromFile(self.config_path)
+        display = config.getDefaultDisplay()
+        view = config.getDefaultView(display)
+        pixels = np.random.default_rng(0).random((4, 4, 3), dtype=np.float32)
+
+        expected = pixels.copy()
+        config.getProcessor("ACES2065-1", "ACEScg").getDefaultCPUProcessor().applyRGB(expected)
+        for _ in range(2):
+            result = pixels.copy()
+            imaging_utils.apply_color_converstion_to_np_array(result, "ACES2065-1", "ACEScg", self.config_path)
+            np.testing.assert_array_equal(expected, result)
+
+        expected = pixels.copy()
+        config.getProcessor(
+            ocio.ROLE_SCENE_LINEAR, display, view, ocio.TRANSFORM_DIR_FORWARD
+        ).getDefaultCPUProcessor().applyRGB(expected)
+        result = pixels.copy()
+        imaging_utils.apply_display_conversion_to_np_array(result, display, view, self.config_path)
+        np.testing.assert_array_equal(expected, result)
@@ -13,9 +13,20 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import json
+import os
+from unittest import mock
 
+import numpy as np
+import PyOpenColorIO as ocio
+
+from open_vp_cal.core import calibrate, ocio_utils
+from open_vp_cal.core import constants
+from open_vp_cal.core.constants import Results
+from open_vp_cal.core.structures import ProcessingResults
 from open_vp_cal.framework.processing import Processing
-from test_open_vp_cal.test_utils import TestProject
+from open_vp_cal.project_settings import ProjectSettings
+from test_open_vp_cal.test_utils import TestProject, TestUtils
 
 
 class Test_Processing(TestProject):
@@ -37,3 +48,72 @@ class Test_Processing(TestProject):
 
         self.assertNotEqual(sample_bufs_stitched, None)
         self.assertNotEqual(sample_reference_bufs_stitched, None)
+
+
+class Test_ProcessingCalibrate(TestUtils):
+    def setUp(self):
+        super().setUp()
+        project_folder = os.path.join(self.get_test_resources_folder(), "Sample_Project2_ROE_Wall1_CS_EOTF")
+        project_settings = ProjectSettings.from_json(os.path.join(project_folder, "project_settings.json"))
+        self.led_wall = project_settings.led_walls[0]
+
+        results_folder = os.path.join(project_folder, "export", "results")
+        processing_results = ProcessingResults()
+        with open(os.path.join(results_folder, "ROE_CS_EOTF_samples.json"), encoding="utf-8") as handle:
+            processing_results.samples = json.load(handle)
+        with open(os.path.join(results_folder, "ROE_CS_EOTF_reference_samples.json"), encoding="utf-8") as handle:
+            processing_results.reference_samples = json.load(handle)
+        self.led_wall.processing_results = processing_results
+
+    def test_calibrate_only_recomputes_changed_stages(self):
+        results = Processing(self.led_wall).calibrate()
+        preview_export_folder = results.preview_export_folder
+        self.assertTrue(os.path.exists(results.ocio_config_output_file))
+        self.assertIsNone(results.lut_output_file)
+
+        self.led_wall.shadow_rolloff = 2.0
+        with mock.patch.object(calibrate, "run") as run, \
+                mock.patch.object(ocio_utils, "write_eotf_lut_pq") as write_eotf_lut_pq:
+            results = Processing(self.led_wall).calibrate()
+        run.assert_not_called()
+        write_eotf_lut_pq.assert_not_called()
+
+        self.assertEqual(results.preview_export_folder, preview_export_folder)
+        self.assertEqual(
+            json.dumps(results.calibration_results), json.dumps(calibrate.run(**results.calibration_parameters))
+        )
+        with open(results.calibration_results_file, encoding="utf-8") as handle:
+            self.assertEqual(
+                json.load(handle)[Results.MAX_DISTANCES], results.calibration_results[Results.MAX_DISTANCES]
+            )
+
+    def preview_calibration(self) -> dict:
+        """ Converts some pixels through each of the calibration colour spaces of the preview config, as the preview
+            does
+        """
+        results = Processing(self.led_wall).calibrate()
+        config = ocio_utils.OcioProcessorCache.get_config(results.ocio_config_output_file)
+        previews = {}
+        for colour_space in config.getColorSpaceNames():
+            if self.led_wall.name not in colour_space:
+                continue
+            pixels = np.array([[0.18, 0.18, 0.18], [0.5, 0.2, 0.1], [1.0, 1.0, 1.0]], dtype=np.float32)
+            ocio_utils.OcioProcessorCache.get_cpu_processor(
+                results.ocio_config_output_file, constants.ColourSpace.CS_ACES, colour_space
+            ).applyRGB(pixels)
+            previews[colour_space] = pixels
+        return previews
+
+    def test_preview_picks_up_rewritten_eotf_luts(self):
+        self.preview_calibration()
+        self.led_wall.target_to_screen_cat = constants.CAT.CAT_BRADFORD \
+            if self.led_wall.target_to_screen_cat != constants.CAT.CAT_BRADFORD else constants.CAT.CAT_CAT02
+        previews = self.preview_calibration()
+        self.assertTrue(previews)
+
+        # Loading the rewritten config and LUTs from scratch gives the same preview
+        ocio.ClearAllCaches()
+        ocio_utils.OcioProcessorCache.clear()
+        expected_previews = self.preview_calibration()
+        for colour_space, pixels in previews.items():
+            np.testing.assert_array_equal(pixels, expected_previews[colour_space])
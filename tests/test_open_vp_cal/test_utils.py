@@ -33,6 +33,7 @@ class TestUtils(unittest.TestCase):
     def setUp(self):
         super(TestUtils, self).setUp()
         os.environ[constants.OPEN_VP_CAL_UNIT_TESTING] = "1"
+        os.environ[constants.OPEN_VP_CAL_SEQUENCE_INDEX_SIDECAR] = "0"
 
         test_output_folder = self.get_test_output_folder()
         if os.path.exists(test_output_folder):
@@ -43,6 +44,7 @@ class TestUtils(unittest.TestCase):
     def tearDown(self):
         super(TestUtils, self).tearDown()
         del os.environ[constants.OPEN_VP_CAL_UNIT_TESTING]
+        del os.environ[constants.OPEN_VP_CAL_SEQUENCE_INDEX_SIDECAR]
 
     @classmethod
     def get_folder_for_this_file(cls):